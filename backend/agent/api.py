@@ -20,12 +20,14 @@ from services.billing import check_billing_status, can_use_model
 from utils.config import config
 from sandbox.sandbox import create_sandbox, delete_sandbox, get_or_start_sandbox
 from services.llm import make_llm_api_call
-from run_agent_background import run_agent_background, _cleanup_redis_response_list, update_agent_run_status
+from run_agent_background import run_agent_background, update_agent_run_status
+from agent import run_registry, run_stream
+from agent.stream_hub import RunStreamHub
 from utils.constants import MODEL_NAME_ALIASES
 from flags.flags import is_enabled
 
 from .config_helper import extract_agent_config, build_unified_config, extract_tools_for_agent_run, get_mcp_configs
-from .versioning.version_service import get_version_service
+from .versioning.version_service import get_version_service, get_tool_summary
 from .versioning.api import router as version_router, initialize as initialize_versioning
 
 # Helper for version service
@@ -38,6 +40,8 @@ router.include_router(version_router)
 
 db = None
 instance_id = None # Global instance ID for this backend instance
+# Shares upstream Redis reads between all SSE viewers of a run in this process
+stream_hub = RunStreamHub(max_viewer_queue_size=config.AGENT_RUN_VIEWER_QUEUE_SIZE)
 
 # TTL for Redis response lists (24 hours)
 REDIS_RESPONSE_LIST_TTL = 3600 * 24
@@ -164,24 +168,19 @@ async def cleanup():
     # Use the instance_id to find and clean up this instance's keys
     try:
         if instance_id: # Ensure instance_id is set
-            running_keys = await redis.keys(f"active_run:{instance_id}:*")
-            logger.info(f"Found {len(running_keys)} running agent runs for instance {instance_id} to clean up")
-
-            for key in running_keys:
-                # Key format: active_run:{instance_id}:{agent_run_id}
-                parts = key.split(":")
-                if len(parts) == 3:
-                    agent_run_id = parts[2]
-                    await stop_agent_run(agent_run_id, error_message=f"Instance {instance_id} shutting down")
-                else:
-                    logger.warning(f"Unexpected key format found: {key}")
+            running_run_ids = await run_registry.get_instance_runs(instance_id)
+            logger.info(f"Found {len(running_run_ids)} running agent runs for instance {instance_id} to clean up")
+
+            for agent_run_id in running_run_ids:
+                await stop_agent_run(agent_run_id, error_message=f"Instance {instance_id} shutting down")
         else:
             logger.warning("Instance ID not set, cannot clean up instance-specific agent runs.")
 
     except Exception as e:
         logger.error(f"Failed to clean up running agent runs: {str(e)}")
 
-    # Close Redis connection
+    # Stop shared stream reads and close Redis connection
+    await stream_hub.close()
     await redis.close()
     logger.info("Completed cleanup of agent API resources")
 
@@ -191,21 +190,8 @@ async def stop_agent_run(agent_run_id: str, error_message: Optional[str] = None)
     client = await db.client
     final_status = "failed" if error_message else "stopped"
 
-    # Attempt to fetch final responses from Redis
-    response_list_key = f"agent_run:{agent_run_id}:responses"
-    all_responses = []
-    try:
-        all_responses_json = await redis.lrange(response_list_key, 0, -1)
-        all_responses = [json.loads(r) for r in all_responses_json]
-        logger.info(f"Fetched {len(all_responses)} responses from Redis for DB update on stop/fail: {agent_run_id}")
-    except Exception as e:
-        logger.error(f"Failed to fetch responses from Redis for {agent_run_id} during stop/fail: {e}")
-        # Try fetching from DB as a fallback? Or proceed without responses? Proceeding without for now.
-
-    # Update the agent run status in the database
-    update_success = await update_agent_run_status(
-        client, agent_run_id, final_status, error=error_message, responses=all_responses
-    )
+    # The worker archives the run's responses when it picks up the STOP signal, then sets a TTL on them
+    update_success = await update_agent_run_status(client, agent_run_id, final_status, error=error_message)
 
     if not update_success:
         logger.error(f"Failed to update database status for stopped/failed run {agent_run_id}")
@@ -220,25 +206,16 @@ async def stop_agent_run(agent_run_id: str, error_message: Optional[str] = None)
 
     # Find all instances handling this agent run and send STOP to instance-specific channels
     try:
-        instance_keys = await redis.keys(f"active_run:*:{agent_run_id}")
-        logger.debug(f"Found {len(instance_keys)} active instance keys for agent run {agent_run_id}")
-
-        for key in instance_keys:
-            # Key format: active_run:{instance_id}:{agent_run_id}
-            parts = key.split(":")
-            if len(parts) == 3:
-                instance_id_from_key = parts[1]
-                instance_control_channel = f"agent_run:{agent_run_id}:control:{instance_id_from_key}"
-                try:
-                    await redis.publish(instance_control_channel, "STOP")
-                    logger.debug(f"Published STOP signal to instance channel {instance_control_channel}")
-                except Exception as e:
-                    logger.warning(f"Failed to publish STOP signal to instance channel {instance_control_channel}: {str(e)}")
-            else:
-                 logger.warning(f"Unexpected key format found: {key}")
+        run_instance_ids = await run_registry.get_run_instances(agent_run_id)
+        logger.debug(f"Found {len(run_instance_ids)} active instances for agent run {agent_run_id}")
 
-        # Clean up the response list immediately on stop/fail
-        await _cleanup_redis_response_list(agent_run_id)
+        for run_instance_id in run_instance_ids:
+            instance_control_channel = f"agent_run:{agent_run_id}:control:{run_instance_id}"
+            try:
+                await redis.publish(instance_control_channel, "STOP")
+                logger.debug(f"Published STOP signal to instance channel {instance_control_channel}")
+            except Exception as e:
+                logger.warning(f"Failed to publish STOP signal to instance channel {instance_control_channel}: {str(e)}")
 
     except Exception as e:
         logger.error(f"Failed to find or signal active instances for {agent_run_id}: {str(e)}")
@@ -442,11 +419,10 @@ async def start_agent(
     logger.info(f"Created new agent run: {agent_run_id}")
 
     # Register this run in Redis with TTL using instance ID
-    instance_key = f"active_run:{instance_id}:{agent_run_id}"
     try:
-        await redis.set(instance_key, "running", ex=redis.REDIS_KEY_TTL)
+        await run_registry.register_run(instance_id, agent_run_id)
     except Exception as e:
-        logger.warning(f"Failed to register agent run in Redis ({instance_key}): {str(e)}")
+        logger.warning(f"Failed to register agent run {agent_run_id} in Redis: {str(e)}")
 
     request_id = structlog.contextvars.get_contextvars().get('request_id')
 
@@ -641,149 +617,108 @@ async def get_thread_agent(thread_id: str, user_id: str = Depends(get_current_us
 async def stream_agent_run(
     agent_run_id: str,
     token: Optional[str] = None,
+    from_id: Optional[str] = Query(None, alias="from", description="Send only responses after this event ID"),
     request: Request = None
 ):
-    """Stream the responses of an agent run using Redis Lists and Pub/Sub."""
+    """Stream the responses of an agent run using Redis Streams and Pub/Sub.
+
+    Every response frame carries its stream ID as the SSE event ID. Reconnecting
+    clients resume after the Last-Event-ID header or the `from` parameter.
+    """
     logger.info(f"Starting stream for agent run: {agent_run_id}")
     client = await db.client
 
     user_id = await get_user_id_from_stream_auth(request, token)
     agent_run_data = await get_agent_run_with_access_check(client, agent_run_id, user_id)
 
+    last_event_id = from_id or (request.headers.get("last-event-id") if request else None)
+    if last_event_id is not None and not run_stream.is_valid_id(last_event_id):
+        raise HTTPException(status_code=400, detail="Invalid event ID")
+
     structlog.contextvars.bind_contextvars(
         agent_run_id=agent_run_id,
         user_id=user_id,
+        thread_id=agent_run_data['thread_id'],
     )
 
-    response_list_key = f"agent_run:{agent_run_id}:responses"
-    response_channel = f"agent_run:{agent_run_id}:new_response"
-    control_channel = f"agent_run:{agent_run_id}:control" # Global control channel
-
     async def stream_generator():
-        logger.debug(f"Streaming responses for {agent_run_id} using Redis list {response_list_key} and channel {response_channel}")
-        last_processed_index = -1
-        pubsub_response = None
-        pubsub_control = None
-        listener_task = None
+        logger.debug(f"Streaming responses for {agent_run_id} from Redis stream {run_stream.response_stream_key(agent_run_id)}")
+        reader = run_stream.ResponseStreamReader(agent_run_id, last_event_id)
+        sent_id = last_event_id # ID of the last response the client has
+        viewer = None
         terminate_stream = False
         initial_yield_complete = False
 
+        def format_responses(responses):
+            """Format responses not yet sent as SSE frames, stopping after a terminal status."""
+            nonlocal terminate_stream, sent_id
+            frames = []
+            for entry in responses:
+                if not run_stream.is_after(entry.id, sent_id):
+                    continue # Already sent by an earlier read
+                sent_id = reader.last_id = entry.id
+                # Frames are stored SSE-encoded; only the id line is added
+                frames.append(f"id: {entry.id}\n{entry.frame}")
+                # Check if this response signals completion from its header
+                if entry.type == 'status' and entry.status in ['completed', 'failed', 'stopped']:
+                    logger.info(f"Detected run completion via status message in stream: {entry.status}")
+                    terminate_stream = True
+                    break # Stop processing further new responses
+            return frames
+
         try:
-            # 1. Fetch and yield initial responses from Redis list
-            initial_responses_json = await redis.lrange(response_list_key, 0, -1)
-            initial_responses = []
-            if initial_responses_json:
-                initial_responses = [json.loads(r) for r in initial_responses_json]
-                logger.debug(f"Sending {len(initial_responses)} initial responses for {agent_run_id}")
-                for response in initial_responses:
-                    yield f"data: {json.dumps(response)}\n\n"
-                last_processed_index = len(initial_responses) - 1
+            # 1. Fetch and yield the responses after the client's last event from the Redis stream
+            await reader.open()
+            initial_frames = format_responses(await reader.read())
+            if initial_frames:
+                logger.debug(f"Sending {len(initial_frames)} initial responses for {agent_run_id} (after {last_event_id})")
+                for frame in initial_frames:
+                    yield frame
             initial_yield_complete = True
+            if terminate_stream:
+                return
 
-            # 2. Check run status *after* yielding initial data
-            run_status = await client.table('agent_runs').select('status', 'thread_id').eq("id", agent_run_id).maybe_single().execute()
-            current_status = run_status.data.get('status') if run_status.data else None
+            # 2. Check run status *after* yielding initial data; the worker mirrors it to Redis
+            current_status = await run_stream.get_run_status(agent_run_id)
+            if current_status is None:
+                run_status = await client.table('agent_runs').select('status').eq("id", agent_run_id).maybe_single().execute()
+                current_status = run_status.data.get('status') if run_status.data else None
 
             if current_status != 'running':
                 logger.info(f"Agent run {agent_run_id} is not running (status: {current_status}). Ending stream.")
                 yield f"data: {json.dumps({'type': 'status', 'status': 'completed'})}\n\n"
                 return
-          
-            structlog.contextvars.bind_contextvars(
-                thread_id=run_status.data.get('thread_id'),
-            )
-
-            # 3. Set up Pub/Sub listeners for new responses and control signals
-            pubsub_response = await redis.create_pubsub()
-            await pubsub_response.subscribe(response_channel)
-            logger.debug(f"Subscribed to response channel: {response_channel}")
 
-            pubsub_control = await redis.create_pubsub()
-            await pubsub_control.subscribe(control_channel)
-            logger.debug(f"Subscribed to control channel: {control_channel}")
+            # 3. Join the process-wide hub for new responses and control signals, then
+            # catch up on anything written before the hub's reads reached this viewer
+            viewer = await stream_hub.subscribe(agent_run_id, reader.last_id)
+            for frame in format_responses(await reader.read()):
+                yield frame
 
-            # Queue to communicate between listeners and the main generator loop
-            message_queue = asyncio.Queue()
-
-            async def listen_messages():
-                response_reader = pubsub_response.listen()
-                control_reader = pubsub_control.listen()
-                tasks = [asyncio.create_task(response_reader.__anext__()), asyncio.create_task(control_reader.__anext__())]
-
-                while not terminate_stream:
-                    done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
-                    for task in done:
-                        try:
-                            message = task.result()
-                            if message and isinstance(message, dict) and message.get("type") == "message":
-                                channel = message.get("channel")
-                                data = message.get("data")
-                                if isinstance(data, bytes): data = data.decode('utf-8')
-
-                                if channel == response_channel and data == "new":
-                                    await message_queue.put({"type": "new_response"})
-                                elif channel == control_channel and data in ["STOP", "END_STREAM", "ERROR"]:
-                                    logger.info(f"Received control signal '{data}' for {agent_run_id}")
-                                    await message_queue.put({"type": "control", "data": data})
-                                    return # Stop listening on control signal
-
-                        except StopAsyncIteration:
-                            logger.warning(f"Listener {task} stopped.")
-                            # Decide how to handle listener stopping, maybe terminate?
-                            await message_queue.put({"type": "error", "data": "Listener stopped unexpectedly"})
-                            return
-                        except Exception as e:
-                            logger.error(f"Error in listener for {agent_run_id}: {e}")
-                            await message_queue.put({"type": "error", "data": "Listener failed"})
-                            return
-                        finally:
-                            # Reschedule the completed listener task
-                            if task in tasks:
-                                tasks.remove(task)
-                                if message and isinstance(message, dict) and message.get("channel") == response_channel:
-                                     tasks.append(asyncio.create_task(response_reader.__anext__()))
-                                elif message and isinstance(message, dict) and message.get("channel") == control_channel:
-                                     tasks.append(asyncio.create_task(control_reader.__anext__()))
-
-                # Cancel pending listener tasks on exit
-                for p_task in pending: p_task.cancel()
-                for task in tasks: task.cancel()
-
-
-            listener_task = asyncio.create_task(listen_messages())
-
-            # 4. Main loop to process messages from the queue
+            # 4. Main loop to process output fanned out by the hub
             while not terminate_stream:
                 try:
-                    queue_item = await message_queue.get()
-
-                    if queue_item["type"] == "new_response":
-                        # Fetch new responses from Redis list starting after the last processed index
-                        new_start_index = last_processed_index + 1
-                        new_responses_json = await redis.lrange(response_list_key, new_start_index, -1)
-
-                        if new_responses_json:
-                            new_responses = [json.loads(r) for r in new_responses_json]
-                            num_new = len(new_responses)
-                            # logger.debug(f"Received {num_new} new responses for {agent_run_id} (index {new_start_index} onwards)")
-                            for response in new_responses:
-                                yield f"data: {json.dumps(response)}\n\n"
-                                # Check if this response signals completion
-                                if response.get('type') == 'status' and response.get('status') in ['completed', 'failed', 'stopped']:
-                                    logger.info(f"Detected run completion via status message in stream: {response.get('status')}")
-                                    terminate_stream = True
-                                    break # Stop processing further new responses
-                            last_processed_index += num_new
+                    if viewer.lagged:
+                        # Batches were dropped while this client was slow; re-read them
+                        viewer.lagged = False
+                        for frame in format_responses(await reader.read()):
+                            yield frame
                         if terminate_stream: break
 
-                    elif queue_item["type"] == "control":
-                        control_signal = queue_item["data"]
+                    item_type, data = await viewer.get()
+
+                    if item_type == "responses":
+                        for frame in format_responses(data):
+                            yield frame
+                        if terminate_stream: break
+
+                    elif item_type == "control":
                         terminate_stream = True # Stop the stream on any control signal
-                        yield f"data: {json.dumps({'type': 'status', 'status': control_signal})}\n\n"
+                        yield f"data: {json.dumps({'type': 'status', 'status': data})}\n\n"
                         break
 
-                    elif queue_item["type"] == "error":
-                        logger.error(f"Listener error for {agent_run_id}: {queue_item['data']}")
+                    elif item_type == "error":
+                        logger.error(f"Listener error for {agent_run_id}: {data}")
                         terminate_stream = True
                         yield f"data: {json.dumps({'type': 'status', 'status': 'error'})}\n\n"
                         break
@@ -805,22 +740,9 @@ async def stream_agent_run(
                  yield f"data: {json.dumps({'type': 'status', 'status': 'error', 'message': f'Failed to start stream: {e}'})}\n\n"
         finally:
             terminate_stream = True
-            # Graceful shutdown order: unsubscribe → close → cancel
-            if pubsub_response: await pubsub_response.unsubscribe(response_channel)
-            if pubsub_control: await pubsub_control.unsubscribe(control_channel)
-            if pubsub_response: await pubsub_response.close()
-            if pubsub_control: await pubsub_control.close()
-
-            if listener_task:
-                listener_task.cancel()
-                try:
-                    await listener_task  # Reap inner tasks & swallow their errors
-                except asyncio.CancelledError:
-                    pass
-                except Exception as e:
-                    logger.debug(f"listener_task ended with: {e}")
-            # Wait briefly for tasks to cancel
-            await asyncio.sleep(0.1)
+            if viewer:
+                await stream_hub.unsubscribe(viewer)
+            await reader.close()
             logger.debug(f"Streaming cleanup complete for agent run: {agent_run_id}")
 
     return StreamingResponse(stream_generator(), media_type="text/event-stream", headers={
@@ -1172,11 +1094,10 @@ async def initiate_agent_with_files(
         )
 
         # Register run in Redis
-        instance_key = f"active_run:{instance_id}:{agent_run_id}"
         try:
-            await redis.set(instance_key, "running", ex=redis.REDIS_KEY_TTL)
+            await run_registry.register_run(instance_id, agent_run_id)
         except Exception as e:
-            logger.warning(f"Failed to register agent run in Redis ({instance_key}): {str(e)}")
+            logger.warning(f"Failed to register agent run {agent_run_id} in Redis: {str(e)}")
 
         request_id = structlog.contextvars.get_contextvars().get('request_id')
 
@@ -1228,8 +1149,10 @@ async def get_agents(
         # Calculate offset
         offset = (page - 1) * limit
         
-        # Start building the query
-        query = client.table('agents').select('*', count='exact').eq("account_id", user_id)
+        # Start building the query; current versions are joined in the same request
+        query = client.table('agents').select(
+            '*, current_version:agent_versions!current_version_id(*)', count='exact'
+        ).eq("account_id", user_id)
         
         # Apply search filter
         if search:
@@ -1240,27 +1163,28 @@ async def get_agents(
         if has_default is not None:
             query = query.eq("is_default", has_default)
         
-        # For MCP and AgentPress tools filtering, we'll need to do post-processing
-        # since Supabase doesn't have great JSON array/object filtering
+        # Tool filters use the summary columns kept in sync with the current version
+        if has_mcp_tools is not None:
+            query = query.gt("mcp_tools_count", 0) if has_mcp_tools else query.eq("mcp_tools_count", 0)
+        if has_agentpress_tools is not None:
+            query = query.gt("agentpress_tools_count", 0) if has_agentpress_tools else query.eq("agentpress_tools_count", 0)
+        if tools:
+            tools_filter = [tool.strip() for tool in tools.split(',') if tool.strip()]
+            if tools_filter:
+                # Agents having any of the requested tools
+                query = query.ov("tool_names", tools_filter)
         
         # Apply sorting
-        if sort_by == "name":
-            query = query.order("name", desc=(sort_order == "desc"))
-        elif sort_by == "updated_at":
-            query = query.order("updated_at", desc=(sort_order == "desc"))
-        elif sort_by == "created_at":
-            query = query.order("created_at", desc=(sort_order == "desc"))
+        if sort_by in ("name", "updated_at", "created_at", "tools_count"):
+            query = query.order(sort_by, desc=(sort_order == "desc"))
         else:
             # Default to created_at
             query = query.order("created_at", desc=(sort_order == "desc"))
         
-        # Execute query to get total count first
-        count_result = await query.execute()
-        total_count = count_result.count
-        
-        # Now get the actual data with pagination
+        # Get the page and the total count in one request
         query = query.range(offset, offset + limit - 1)
         agents_result = await query.execute()
+        total_count = agents_result.count or 0
         
         if not agents_result.data:
             logger.info(f"No agents found for user: {user_id}")
@@ -1269,111 +1193,23 @@ async def get_agents(
                 "pagination": {
                     "page": page,
                     "limit": limit,
-                    "total": 0,
-                    "pages": 0
+                    "total": total_count,
+                    "pages": (total_count + limit - 1) // limit
                 }
             }
         
-        # Post-process for tool filtering and tools_count sorting
         agents_data = agents_result.data
         
-        # First, fetch version data for all agents to ensure we have correct tool info
         agent_version_map = {}
+        version_service = await _get_version_service()
         for agent in agents_data:
-            if agent.get('current_version_id'):
+            version_row = agent.pop('current_version', None)
+            if version_row:
                 try:
-                    version_service = await _get_version_service()
-
-                    version_obj = await version_service.get_version(
-                        agent_id=agent['agent_id'],
-                        version_id=agent['current_version_id'],
-                        user_id=user_id
-                    )
-                    version_dict = version_obj.to_dict()
-                    agent_version_map[agent['agent_id']] = version_dict
+                    agent_version_map[agent['agent_id']] = version_service._version_from_db_row(version_row).to_dict()
                 except Exception as e:
                     logger.warning(f"Failed to get version data for agent {agent['agent_id']}: {e}")
         
-        # Apply tool-based filters using version data
-        if has_mcp_tools is not None or has_agentpress_tools is not None or tools:
-            filtered_agents = []
-            tools_filter = []
-            if tools:
-                tools_filter = [tool.strip() for tool in tools.split(',') if tool.strip()]
-            
-            for agent in agents_data:
-                # Get version data if available and extract configuration
-                version_data = agent_version_map.get(agent['agent_id'])
-                from agent.config_helper import extract_agent_config
-                agent_config = extract_agent_config(agent, version_data)
-                
-                configured_mcps = agent_config['configured_mcps']
-                agentpress_tools = agent_config['agentpress_tools']
-                
-                # Check MCP tools filter
-                if has_mcp_tools is not None:
-                    has_mcp = bool(configured_mcps and len(configured_mcps) > 0)
-                    if has_mcp_tools != has_mcp:
-                        continue
-                
-                # Check AgentPress tools filter
-                if has_agentpress_tools is not None:
-                    has_enabled_tools = any(
-                        tool_data and isinstance(tool_data, dict) and tool_data.get('enabled', False)
-                        for tool_data in agentpress_tools.values()
-                    )
-                    if has_agentpress_tools != has_enabled_tools:
-                        continue
-                
-                # Check specific tools filter
-                if tools_filter:
-                    agent_tools = set()
-                    # Add MCP tools
-                    for mcp in configured_mcps:
-                        if isinstance(mcp, dict) and 'name' in mcp:
-                            agent_tools.add(f"mcp:{mcp['name']}")
-                    
-                    # Add enabled AgentPress tools
-                    for tool_name, tool_data in agentpress_tools.items():
-                        if tool_data and isinstance(tool_data, dict) and tool_data.get('enabled', False):
-                            agent_tools.add(f"agentpress:{tool_name}")
-                    
-                    # Check if any of the requested tools are present
-                    if not any(tool in agent_tools for tool in tools_filter):
-                        continue
-                
-                filtered_agents.append(agent)
-            
-            agents_data = filtered_agents
-        
-        # Handle tools_count sorting (post-processing required)
-        if sort_by == "tools_count":
-            def get_tools_count(agent):
-                # Get version data if available
-                version_data = agent_version_map.get(agent['agent_id'])
-                
-                # Use version data for tools if available, otherwise fallback to agent data
-                if version_data:
-                    configured_mcps = version_data.get('configured_mcps', [])
-                    agentpress_tools = version_data.get('agentpress_tools', {})
-                else:
-                    configured_mcps = agent.get('configured_mcps', [])
-                    agentpress_tools = agent.get('agentpress_tools', {})
-                
-                mcp_count = len(configured_mcps)
-                agentpress_count = sum(
-                    1 for tool_data in agentpress_tools.values()
-                    if tool_data and isinstance(tool_data, dict) and tool_data.get('enabled', False)
-                )
-                return mcp_count + agentpress_count
-            
-            agents_data.sort(key=get_tools_count, reverse=(sort_order == "desc"))
-        
-        # Apply pagination to filtered results if we did post-processing
-        if has_mcp_tools is not None or has_agentpress_tools is not None or tools or sort_by == "tools_count":
-            total_count = len(agents_data)
-            agents_data = agents_data[offset:offset + limit]
-        
         # Format the response
         agent_list = []
         for agent in agents_data:
@@ -1802,7 +1638,8 @@ async def update_agent(
                     
                     await client.table('agents').update({
                         'current_version_id': version_id,
-                        'version_count': 1
+                        'version_count': 1,
+                        **get_tool_summary(initial_version_data["configured_mcps"], initial_version_data["agentpress_tools"])
                     }).eq('agent_id', agent_id).execute()
                     current_version_data = initial_version_data
                     logger.info(f"Created initial version for agent {agent_id}")
@@ -14,6 +14,7 @@ from flags.flags import is_enabled
 from agent.agent_builder_prompt import get_agent_builder_prompt
 from agentpress.thread_manager import ThreadManager
 from agentpress.response_processor import ProcessorConfig
+from agentpress.message import get_frame_content, get_frame_metadata
 from agent.tools.sb_shell_tool import SandboxShellTool
 from agent.tools.sb_files_tool import SandboxFilesTool
 from agent.tools.sb_browser_tool import SandboxBrowserTool
@@ -49,6 +50,7 @@ class AgentConfig:
     trace: Optional[StatefulTraceClient] = None
     is_agent_builder: Optional[bool] = False
     target_agent_id: Optional[str] = None
+    stop_event: Optional[asyncio.Event] = None
 
 
 class ToolManager:
@@ -290,7 +292,7 @@ class MessageManager:
     async def build_temporary_message(self) -> Optional[dict]:
         temp_message_content_list = []
 
-        latest_browser_state_msg = await self.client.table('messages').select('*').eq('thread_id', self.thread_id).eq('type', 'browser_state').order('created_at', desc=True).limit(1).execute()
+        latest_browser_state_msg = await self.client.table('messages').select('content').eq('thread_id', self.thread_id).eq('type', 'browser_state').order('created_at', desc=True).limit(1).execute()
         if latest_browser_state_msg.data and len(latest_browser_state_msg.data) > 0:
             try:
                 browser_content = latest_browser_state_msg.data[0]["content"]
@@ -329,7 +331,7 @@ class MessageManager:
             except Exception as e:
                 logger.error(f"Error parsing browser state: {e}")
 
-        latest_image_context_msg = await self.client.table('messages').select('*').eq('thread_id', self.thread_id).eq('type', 'image_context').order('created_at', desc=True).limit(1).execute()
+        latest_image_context_msg = await self.client.table('messages').select('message_id, content').eq('thread_id', self.thread_id).eq('type', 'image_context').order('created_at', desc=True).limit(1).execute()
         if latest_image_context_msg.data and len(latest_image_context_msg.data) > 0:
             try:
                 image_context_content = latest_image_context_msg.data[0]["content"] if isinstance(latest_image_context_msg.data[0]["content"], dict) else json.loads(latest_image_context_msg.data[0]["content"])
@@ -361,6 +363,14 @@ class MessageManager:
 class AgentRunner:
     def __init__(self, config: AgentConfig):
         self.config = config
+        self.thread_manager: Optional[ThreadManager] = None
+
+    async def close(self):
+        if self.thread_manager:
+            try:
+                await self.thread_manager.close()
+            except Exception as e:
+                logger.error(f"Failed to write out queued messages for thread {self.config.thread_id}: {str(e)}")
     
     async def setup(self):
         if not self.config.trace:
@@ -370,7 +380,8 @@ class AgentRunner:
             trace=self.config.trace, 
             is_agent_builder=self.config.is_agent_builder or False, 
             target_agent_id=self.config.target_agent_id, 
-            agent_config=self.config.agent_config
+            agent_config=self.config.agent_config,
+            stop_event=self.config.stop_event
         )
         
         self.client = await self.thread_manager.db.client
@@ -448,7 +459,7 @@ class AgentRunner:
         iteration_count = 0
         continue_execution = True
 
-        latest_user_message = await self.client.table('messages').select('*').eq('thread_id', self.config.thread_id).eq('type', 'user').order('created_at', desc=True).limit(1).execute()
+        latest_user_message = await self.client.table('messages').select('content').eq('thread_id', self.config.thread_id).eq('type', 'user').order('created_at', desc=True).limit(1).execute()
         if latest_user_message.data and len(latest_user_message.data) > 0:
             data = latest_user_message.data[0]['content']
             if isinstance(data, str):
@@ -471,7 +482,7 @@ class AgentRunner:
                 }
                 break
 
-            latest_message = await self.client.table('messages').select('*').eq('thread_id', self.config.thread_id).in_('type', ['assistant', 'tool', 'user']).order('created_at', desc=True).limit(1).execute()
+            latest_message = await self.client.table('messages').select('type').eq('thread_id', self.config.thread_id).in_('type', ['assistant', 'tool', 'user']).order('created_at', desc=True).limit(1).execute()
             if latest_message.data and len(latest_message.data) > 0:
                 message_type = latest_message.data[0].get('type')
                 if message_type == 'assistant':
@@ -499,7 +510,9 @@ class AgentRunner:
                         execute_tools=True,
                         execute_on_stream=True,
                         tool_execution_strategy="parallel",
-                        xml_adding_strategy="user_message"
+                        xml_adding_strategy="user_message",
+                        chunk_coalesce_ms=config.STREAM_CHUNK_COALESCE_MS,
+                        chunk_coalesce_bytes=config.STREAM_CHUNK_COALESCE_BYTES
                     ),
                     native_max_auto_continues=self.config.native_max_auto_continues,
                     include_xml_examples=True,
@@ -528,16 +541,12 @@ class AgentRunner:
                             
                             if chunk.get('type') == 'status':
                                 try:
-                                    metadata = chunk.get('metadata', {})
-                                    if isinstance(metadata, str):
-                                        metadata = json.loads(metadata)
+                                    metadata = get_frame_metadata(chunk)
                                     
                                     if metadata.get('agent_should_terminate'):
                                         agent_should_terminate = True
                                         
-                                        content = chunk.get('content', {})
-                                        if isinstance(content, str):
-                                            content = json.loads(content)
+                                        content = get_frame_content(chunk)
                                         
                                         if content.get('function_name'):
                                             last_tool_call = content['function_name']
@@ -549,11 +558,7 @@ class AgentRunner:
                             
                             if chunk.get('type') == 'assistant' and 'content' in chunk:
                                 try:
-                                    content = chunk.get('content', '{}')
-                                    if isinstance(content, str):
-                                        assistant_content_json = json.loads(content)
-                                    else:
-                                        assistant_content_json = content
+                                    assistant_content_json = get_frame_content(chunk)
 
                                     assistant_text = assistant_content_json.get('content', '')
                                     full_response += assistant_text
@@ -627,7 +632,8 @@ async def run_agent(
     agent_config: Optional[dict] = None,    
     trace: Optional[StatefulTraceClient] = None,
     is_agent_builder: Optional[bool] = False,
-    target_agent_id: Optional[str] = None
+    target_agent_id: Optional[str] = None,
+    stop_event: Optional[asyncio.Event] = None
 ):
     config = AgentConfig(
         thread_id=thread_id,
@@ -642,9 +648,13 @@ async def run_agent(
         agent_config=agent_config,
         trace=trace,
         is_agent_builder=is_agent_builder,
-        target_agent_id=target_agent_id
+        target_agent_id=target_agent_id,
+        stop_event=stop_event
     )
     
     runner = AgentRunner(config)
-    async for chunk in runner.run():
-        yield chunk
\ No newline at end of file
+    try:
+        async for chunk in runner.run():
+            yield chunk
+    finally:
+        await runner.close()
\ No newline at end of file
@@ -0,0 +1,117 @@
+"""
+Compact archives of agent run transcripts.
+
+The response stream of a run holds every frame that was sent to viewers, most
+of them assistant content chunks whose text is repeated in the final saved
+message. At run end the transcript is collapsed into its final messages,
+gzip-compressed and uploaded to object storage; the run row only keeps the
+object path and a small summary.
+"""
+
+import gzip
+import json
+from typing import Any, Dict, List, Optional
+
+from utils.config import config
+from utils.logger import logger
+from utils.s3_upload_utils import upload_bytes
+
+ARCHIVE_VERSION = 1
+
+
+def _parse(value: Any) -> Any:
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except (json.JSONDecodeError, TypeError):
+            pass
+    return value
+
+
+def _is_content_chunk(response: Dict[str, Any]) -> bool:
+    metadata = _parse(response.get('metadata'))
+    return response.get('type') == 'assistant' and isinstance(metadata, dict) and metadata.get('stream_status') == 'chunk'
+
+
+def _is_tool_progress(response: Dict[str, Any]) -> bool:
+    content = _parse(response.get('content'))
+    return response.get('type') == 'status' and isinstance(content, dict) and content.get('status_type') == 'tool_progress'
+
+
+def collapse_responses(responses: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Collapse a run's streamed responses into its final messages.
+
+    Content chunks are dropped once the assistant message they belong to is
+    complete; chunks of a message that never completed (e.g. a stopped run) are
+    merged into one partial assistant message. Tool progress frames are dropped.
+    """
+    collapsed = []
+    pending_chunks: List[Dict[str, Any]] = []
+
+    def flush_partial():
+        if not pending_chunks:
+            return
+        text = "".join((_parse(chunk.get('content')) or {}).get('content') or "" for chunk in pending_chunks)
+        first, last = pending_chunks[0], pending_chunks[-1]
+        metadata = _parse(first.get('metadata')) or {}
+        collapsed.append({
+            "message_id": None, "thread_id": first.get('thread_id'), "type": "assistant",
+            "is_llm_message": True,
+            "content": {"role": "assistant", "content": text},
+            "metadata": {"stream_status": "partial", "thread_run_id": metadata.get('thread_run_id')},
+            "created_at": first.get('created_at'), "updated_at": last.get('updated_at')
+        })
+        pending_chunks.clear()
+
+    for response in responses:
+        if _is_content_chunk(response):
+            pending_chunks.append(response)
+        elif _is_tool_progress(response):
+            continue
+        else:
+            if response.get('type') == 'assistant':
+                # The complete message carries the text of the chunks before it
+                pending_chunks.clear()
+            collapsed.append(response)
+    flush_partial()
+    return collapsed
+
+
+def build_run_archive(agent_run_id: str, status: str, responses: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Build the archive document of a run from its streamed responses."""
+    return {
+        "version": ARCHIVE_VERSION,
+        "agent_run_id": agent_run_id,
+        "status": status,
+        "messages": collapse_responses(responses)
+    }
+
+
+def get_archive_path(thread_id: str, agent_run_id: str) -> str:
+    return f"{thread_id}/{agent_run_id}.json.gz"
+
+
+async def archive_run(thread_id: str, agent_run_id: str, status: str, responses: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Upload the compressed archive of a run.
+
+    Returns:
+        {"path": ..., "summary": {...}} to store on the run, or None if archiving is disabled or failed
+    """
+    if not config.AGENT_RUN_ARCHIVE_ENABLED:
+        return None
+    try:
+        archive = build_run_archive(agent_run_id, status, responses)
+        data = gzip.compress(json.dumps(archive, default=str).encode('utf-8'))
+        path = get_archive_path(thread_id, agent_run_id)
+        await upload_bytes(data, path, config.AGENT_RUN_ARCHIVE_BUCKET, content_type="application/gzip")
+        summary = {
+            "version": ARCHIVE_VERSION,
+            "responses": len(responses),
+            "messages": len(archive["messages"]),
+            "compressed_bytes": len(data)
+        }
+        logger.debug(f"Archived agent run {agent_run_id} to {path}: {summary}")
+        return {"path": path, "summary": summary}
+    except Exception as e:
+        logger.error(f"Failed to archive agent run {agent_run_id}: {str(e)}")
+        return None
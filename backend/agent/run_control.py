@@ -0,0 +1,109 @@
+"""
+Process-wide listener for agent run control signals.
+
+Rather than one pub/sub connection and polling task per run, a worker process
+keeps a single connection pattern-subscribed to every run's control channels
+(agent_run:{id}:control and agent_run:{id}:control:{instance_id}). A STOP
+signal sets the asyncio.Event each local run registered for its run ID.
+"""
+
+import asyncio
+from typing import Dict, Optional, Set
+
+from services import redis
+from utils.logger import logger
+
+CONTROL_CHANNEL_PATTERN = "agent_run:*:control*"
+RECONNECT_DELAY_SECONDS = 1.0
+
+
+class RunControlListener:
+    """Dispatches STOP signals from the control channels to registered runs.
+
+    The shared subscription starts with the first registered run and is
+    re-established if the connection fails.
+    """
+
+    def __init__(self):
+        self._events: Dict[str, Set[asyncio.Event]] = {}
+        self._pubsub = None
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    async def register(self, agent_run_id: str, stop_event: asyncio.Event):
+        """Set stop_event when a STOP signal arrives for the run.
+
+        Returns once the shared subscription is active, so no later signal is missed.
+        """
+        self._events.setdefault(agent_run_id, set()).add(stop_event)
+        await self._ensure_subscribed()
+
+    def unregister(self, agent_run_id: str, stop_event: asyncio.Event):
+        events = self._events.get(agent_run_id)
+        if events is not None:
+            events.discard(stop_event)
+            if not events:
+                del self._events[agent_run_id]
+
+    async def close(self):
+        """Stop listening and close the shared connection."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._close_pubsub()
+
+    async def _ensure_subscribed(self):
+        async with self._lock:
+            if self._task is not None and not self._task.done():
+                return
+            await self._subscribe()
+            self._task = asyncio.create_task(self._listen())
+
+    async def _subscribe(self):
+        self._pubsub = await redis.create_pubsub()
+        await self._pubsub.psubscribe(CONTROL_CHANNEL_PATTERN)
+        logger.debug(f"Subscribed to control channels matching {CONTROL_CHANNEL_PATTERN}")
+
+    async def _close_pubsub(self):
+        if self._pubsub:
+            try:
+                await self._pubsub.punsubscribe()
+                await self._pubsub.close()
+            except Exception as e:
+                logger.warning(f"Error closing control pubsub: {str(e)}")
+            self._pubsub = None
+
+    async def _listen(self):
+        while True:
+            try:
+                async for message in self._pubsub.listen():
+                    if message.get("type") == "pmessage":
+                        self._dispatch(message.get("channel"), message.get("data"))
+                logger.warning("Control channel listener stopped, resubscribing")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in control channel listener, resubscribing: {e}", exc_info=True)
+            await self._close_pubsub()
+            await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+            try:
+                await self._subscribe()
+            except Exception as e:
+                logger.error(f"Failed to resubscribe to control channels: {e}")
+
+    def _dispatch(self, channel: str, data: str):
+        if isinstance(channel, bytes): channel = channel.decode('utf-8')
+        if isinstance(data, bytes): data = data.decode('utf-8')
+        if data != "STOP":
+            return
+        # Channel format: agent_run:{agent_run_id}:control[:{instance_id}]
+        agent_run_id = channel.split(":")[1]
+        events = self._events.get(agent_run_id)
+        if events:
+            logger.info(f"Received STOP signal for agent run {agent_run_id} on {channel}")
+            for event in events:
+                event.set()
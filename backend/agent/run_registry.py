@@ -0,0 +1,82 @@
+"""
+Indexed registry of active agent runs.
+
+Each active run has a key active_run:{instance_id}:{agent_run_id} with a TTL.
+Alongside it two sets index those keys, so finding the runs of an instance or
+the instances of a run is a set lookup instead of a KEYS scan:
+- active_runs:instance:{instance_id} holds the run IDs of an instance
+- active_runs:run:{agent_run_id} holds the instance IDs running a run
+
+The key and both sets are written in one MULTI/EXEC. Set members whose
+active_run key expired (e.g. a worker that died) are pruned on lookup.
+"""
+
+from typing import List
+
+from services import redis
+from utils.logger import logger
+
+
+def active_run_key(instance_id: str, agent_run_id: str) -> str:
+    return f"active_run:{instance_id}:{agent_run_id}"
+
+
+def instance_runs_key(instance_id: str) -> str:
+    return f"active_runs:instance:{instance_id}"
+
+
+def run_instances_key(agent_run_id: str) -> str:
+    return f"active_runs:run:{agent_run_id}"
+
+
+async def register_run(instance_id: str, agent_run_id: str, ttl: int = redis.REDIS_KEY_TTL):
+    """Mark a run as active on an instance, or refresh the TTL of its entries."""
+    redis_client = await redis.get_client()
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.set(active_run_key(instance_id, agent_run_id), "running", ex=ttl)
+        pipe.sadd(instance_runs_key(instance_id), agent_run_id)
+        pipe.expire(instance_runs_key(instance_id), ttl)
+        pipe.sadd(run_instances_key(agent_run_id), instance_id)
+        pipe.expire(run_instances_key(agent_run_id), ttl)
+        await pipe.execute()
+
+
+async def unregister_run(instance_id: str, agent_run_id: str):
+    """Remove a run's active entry for an instance."""
+    redis_client = await redis.get_client()
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.delete(active_run_key(instance_id, agent_run_id))
+        pipe.srem(instance_runs_key(instance_id), agent_run_id)
+        pipe.srem(run_instances_key(agent_run_id), instance_id)
+        await pipe.execute()
+
+
+async def _live_members(set_key: str, members: List[str], key_for) -> List[str]:
+    if not members:
+        return []
+    redis_client = await redis.get_client()
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for member in members:
+            pipe.exists(key_for(member))
+        alive = await pipe.execute()
+    stale = [member for member, exists in zip(members, alive) if not exists]
+    if stale:
+        logger.debug(f"Pruning {len(stale)} expired entries from {set_key}")
+        await redis_client.srem(set_key, *stale)
+    return [member for member, exists in zip(members, alive) if exists]
+
+
+async def get_instance_runs(instance_id: str) -> List[str]:
+    """Get the IDs of the runs active on an instance."""
+    redis_client = await redis.get_client()
+    set_key = instance_runs_key(instance_id)
+    members = sorted(await redis_client.smembers(set_key))
+    return await _live_members(set_key, members, lambda agent_run_id: active_run_key(instance_id, agent_run_id))
+
+
+async def get_run_instances(agent_run_id: str) -> List[str]:
+    """Get the IDs of the instances a run is active on."""
+    redis_client = await redis.get_client()
+    set_key = run_instances_key(agent_run_id)
+    members = sorted(await redis_client.smembers(set_key))
+    return await _live_members(set_key, members, lambda instance_id: active_run_key(instance_id, agent_run_id))
@@ -0,0 +1,314 @@
+"""
+Redis transport for the responses of an agent run.
+
+Responses are appended to a Redis Stream per run (XADD), so a producer writes
+each response once and viewers block-read new batches after the last ID they
+have seen (XREAD BLOCK). Stream IDs double as resume positions. Streams are
+never trimmed while a run is live, since resume and archiving read them from
+the start; the worker sets a TTL on them when the run ends.
+
+Runs started before the move to streams keep their responses in a Redis list
+with a "new" notification per response on a pub/sub channel. Readers detect
+such runs and fall back to that format so in-flight runs finish streaming.
+
+A run's worker writes through a ResponseStreamWriter, which keeps responses in
+order and sends everything queued since its last flush in one pipeline.
+
+Stream entries hold each response already SSE-encoded, next to a small header
+with its type and status, so viewers forward frames and detect the end of a run
+without parsing JSON.
+"""
+
+import asyncio
+import json
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from services import redis
+from utils.logger import logger
+
+
+FRAME_PREFIX = "data: "
+FRAME_SUFFIX = "\n\n"
+
+
+@dataclass
+class ResponseEntry:
+    """A stored response: its ID, header fields and SSE-encoded frame (without the id line)."""
+    id: str
+    type: str
+    status: str
+    frame: str
+
+    @property
+    def response(self) -> Dict[str, Any]:
+        """The response, parsed from its frame."""
+        return json.loads(self.frame[len(FRAME_PREFIX):-len(FRAME_SUFFIX)])
+
+
+def encode_response(response: Dict[str, Any]) -> Dict[str, str]:
+    """Encode a response as stream entry fields: type and status header plus the SSE frame."""
+    return {
+        "type": str(response.get('type') or ""),
+        "status": str(response.get('status') or ""),
+        "frame": f"{FRAME_PREFIX}{json.dumps(response)}{FRAME_SUFFIX}"
+    }
+
+
+def _decode_entry(entry_id: str, fields: Dict[str, str]) -> ResponseEntry:
+    if "frame" not in fields:
+        # Entries written before frames were pre-encoded only hold the response JSON
+        fields = encode_response(json.loads(fields["data"]))
+    return ResponseEntry(entry_id, fields.get("type", ""), fields.get("status", ""), fields["frame"])
+
+
+def response_stream_key(agent_run_id: str) -> str:
+    return f"agent_run:{agent_run_id}:stream"
+
+
+def run_status_key(agent_run_id: str) -> str:
+    return f"agent_run:{agent_run_id}:status"
+
+
+def legacy_response_list_key(agent_run_id: str) -> str:
+    return f"agent_run:{agent_run_id}:responses"
+
+
+def legacy_response_channel(agent_run_id: str) -> str:
+    return f"agent_run:{agent_run_id}:new_response"
+
+
+async def set_run_status(agent_run_id: str, status: str, ttl: int):
+    """Mirror a run's status to Redis so stream (re)connects need no database read."""
+    await redis.set(run_status_key(agent_run_id), status, ex=ttl)
+
+
+async def get_run_status(agent_run_id: str) -> Optional[str]:
+    """Get a run's mirrored status, or None if it was never set or has expired."""
+    return await redis.get(run_status_key(agent_run_id))
+
+
+async def get_all_responses(agent_run_id: str) -> List[Dict[str, Any]]:
+    """Get all stored responses of a run, from its stream or its legacy list."""
+    entries = await redis.xrange(response_stream_key(agent_run_id))
+    if entries:
+        return [_decode_entry(entry_id, fields).response for entry_id, fields in entries]
+    return [json.loads(r) for r in await redis.lrange(legacy_response_list_key(agent_run_id), 0, -1)]
+
+
+async def expire_responses(agent_run_id: str, seconds: int):
+    """Set a TTL on the stored responses of a run."""
+    await redis.expire(response_stream_key(agent_run_id), seconds)
+    await redis.expire(legacy_response_list_key(agent_run_id), seconds)
+
+
+def _id_key(entry_id: str) -> Tuple[int, ...]:
+    """Sort key of a stream ID ("ms-seq") or a legacy list index."""
+    if entry_id.lstrip('-').isdigit():
+        return (int(entry_id),)
+    ms, seq = entry_id.split('-')
+    return (int(ms), int(seq))
+
+
+def is_valid_id(entry_id: str) -> bool:
+    """Whether a client-supplied ID is a stream ID or a legacy list index."""
+    try:
+        _id_key(entry_id)
+        return True
+    except ValueError:
+        return False
+
+
+def is_after(entry_id: str, last_id: Optional[str]) -> bool:
+    """Whether a response ID comes after last_id (None = before the first response)."""
+    return last_id is None or _id_key(entry_id) > _id_key(last_id)
+
+
+class ResponseStreamReader:
+    """Reads the responses of one run in order, resuming after the last one read.
+
+    Attributes:
+        last_id: ID of the last response read; a stream ID, or a list index for legacy runs
+        legacy: Whether the run stores its responses in the legacy list format
+    """
+
+    def __init__(self, agent_run_id: str, last_id: Optional[str] = None):
+        """Initialize the reader.
+
+        Args:
+            agent_run_id: Run whose responses are read
+            last_id: Read responses after this ID (None reads from the start)
+        """
+        self.agent_run_id = agent_run_id
+        self.last_id = last_id
+        self.legacy = False
+        self._pubsub = None
+
+    async def open(self):
+        """Detect the storage format of the run; must be called before reading."""
+        stream_key = response_stream_key(self.agent_run_id)
+        list_key = legacy_response_list_key(self.agent_run_id)
+        # A run with neither key yet has not produced output, so it uses the current format
+        if not await redis.exists(stream_key) and await redis.exists(list_key):
+            self.legacy = True
+            logger.debug(f"Reading legacy response list for agent run {self.agent_run_id}")
+        if self.last_id is None:
+            self.last_id = "-1" if self.legacy else "0"
+
+    async def read(self, block_ms: Optional[int] = None) -> List[ResponseEntry]:
+        """Read the responses after the last one read.
+
+        Args:
+            block_ms: Wait up to this long for new responses if there are none (None = don't wait)
+
+        Returns:
+            Entries in order; empty if nothing arrived in time
+        """
+        if self.legacy:
+            return await self._read_legacy(block_ms)
+
+        stream_key = response_stream_key(self.agent_run_id)
+        result = await redis.xread({stream_key: self.last_id}, block=block_ms)
+        if not result:
+            return []
+        _, entries = result[0]
+        if entries:
+            self.last_id = entries[-1][0]
+        return [_decode_entry(entry_id, fields) for entry_id, fields in entries]
+
+    async def close(self):
+        if self._pubsub:
+            try:
+                await self._pubsub.unsubscribe()
+                await self._pubsub.close()
+            except Exception as e:
+                logger.warning(f"Error closing legacy response pubsub for {self.agent_run_id}: {str(e)}")
+            self._pubsub = None
+
+    async def _read_legacy(self, block_ms: Optional[int]) -> List[ResponseEntry]:
+        """Read from the legacy list, waiting for a "new" notification if it has nothing new."""
+        responses = await self._read_legacy_range()
+        if responses or block_ms is None:
+            return responses
+        if self._pubsub is None:
+            self._pubsub = await redis.create_pubsub()
+            await self._pubsub.subscribe(legacy_response_channel(self.agent_run_id))
+            # Catch responses pushed before the subscription took effect
+            responses = await self._read_legacy_range()
+            if responses:
+                return responses
+        # Notifications published since subscribing are buffered, so none are missed
+        await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=block_ms / 1000)
+        return await self._read_legacy_range()
+
+    async def _read_legacy_range(self) -> List[ResponseEntry]:
+        start = int(self.last_id) + 1
+        responses_json = await redis.lrange(legacy_response_list_key(self.agent_run_id), start, -1)
+        self.last_id = str(start + len(responses_json) - 1)
+        return [_decode_entry(str(start + i), {"data": r}) for i, r in enumerate(responses_json)]
+
+
+class ResponseStreamWriter:
+    """Writes the responses of one run to its stream in order.
+
+    A single background task drains the queue and writes everything queued since
+    its last flush in one Redis pipeline, so frames keep their order and busy runs
+    need one round-trip per flush rather than one per frame. The queue is bounded:
+    when Redis falls behind, write() waits for room instead of piling up tasks.
+
+    Attributes:
+        stats: Counters for written and failed responses, flushes, backpressure waits,
+            and flush latency and queue depth
+    """
+
+    def __init__(self, agent_run_id: str, max_queue_size: int = 1000, max_batch_size: int = 200):
+        """Initialize the writer.
+
+        Args:
+            agent_run_id: Run whose stream is written
+            max_queue_size: Queued responses at which write() starts waiting
+            max_batch_size: Most responses sent in one pipeline
+        """
+        self.agent_run_id = agent_run_id
+        self.max_batch_size = max_batch_size
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self._task: Optional[asyncio.Task] = None
+        self.stats: Dict[str, Any] = {
+            "written": 0, "failed": 0, "flushes": 0, "backpressure_waits": 0,
+            "flush_ms": 0.0, "max_flush_ms": 0.0, "max_queue_depth": 0
+        }
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of responses waiting to be written."""
+        return self._queue.qsize()
+
+    async def write(self, response: Dict[str, Any]):
+        """Queue a response, waiting for room if the queue is full."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        if self._queue.full():
+            self.stats["backpressure_waits"] += 1
+        await self._queue.put(response)
+        self.stats["max_queue_depth"] = max(self.stats["max_queue_depth"], self._queue.qsize())
+
+    async def flush(self):
+        """Wait until every queued response has been written (or has failed)."""
+        if self._task is not None:
+            await self._queue.join()
+
+    async def close(self, timeout: float = 30.0):
+        """Flush queued responses within a timeout, then stop the writer task."""
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self.flush(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Timeout flushing {self.queue_depth} queued responses for agent run {self.agent_run_id}")
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get the writer's counters, with the average flush latency and current queue depth."""
+        flushes = self.stats["flushes"]
+        return {
+            **self.stats,
+            "avg_flush_ms": self.stats["flush_ms"] / flushes if flushes else 0.0,
+            "queue_depth": self.queue_depth
+        }
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.max_batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                await self._write(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _write(self, batch: List[Dict[str, Any]]):
+        """Write a batch in one pipeline; failures are logged so the run keeps going."""
+        started_at = time.monotonic()
+        try:
+            redis_client = await redis.get_client()
+            async with redis_client.pipeline(transaction=False) as pipe:
+                stream_key = response_stream_key(self.agent_run_id)
+                for response in batch:
+                    pipe.xadd(stream_key, encode_response(response))
+                await pipe.execute()
+            self.stats["written"] += len(batch)
+        except Exception as e:
+            self.stats["failed"] += len(batch)
+            logger.error(f"Failed to write {len(batch)} responses for agent run {self.agent_run_id}: {str(e)}")
+        finally:
+            flush_ms = (time.monotonic() - started_at) * 1000
+            self.stats["flushes"] += 1
+            self.stats["flush_ms"] += flush_ms
+            self.stats["max_flush_ms"] = max(self.stats["max_flush_ms"], flush_ms)
@@ -0,0 +1,188 @@
+"""
+Per-process fan-out of agent run output to SSE viewers.
+
+Viewers of a run share its upstream reads instead of each holding their own
+Redis connections:
+- One pub/sub connection per process carries the control channels of every
+  watched run; a run's channel is subscribed while it has viewers
+- One blocking stream reader per watched run fans each batch out to the
+  bounded queue of every viewer
+- A viewer whose queue is full is marked as lagged and skipped, so a slow
+  client never holds up the others; it catches up from the stream by ID
+"""
+
+import asyncio
+from typing import Any, Dict, Optional, Set, Tuple
+
+from agent.run_stream import ResponseStreamReader
+from services import redis
+from utils.config import config
+from utils.logger import logger
+
+CONTROL_SIGNALS = ("STOP", "END_STREAM", "ERROR")
+
+
+def control_channel(agent_run_id: str) -> str:
+    return f"agent_run:{agent_run_id}:control"
+
+
+class RunViewer:
+    """One viewer's queue of fanned-out run output.
+
+    Queue items are ("responses", [ResponseEntry, ...]), ("control", signal) or
+    ("error", message).
+
+    Attributes:
+        agent_run_id: Run being watched
+        lagged: Set when response batches were dropped because the queue was full;
+            the viewer must re-read the stream after its last ID and clear it
+    """
+
+    def __init__(self, agent_run_id: str, max_queue_size: int):
+        self.agent_run_id = agent_run_id
+        self.max_queue_size = max_queue_size
+        self.lagged = False
+        self._queue: asyncio.Queue = asyncio.Queue()
+
+    async def get(self) -> Tuple[str, Any]:
+        """Wait for the next queue item."""
+        return await self._queue.get()
+
+    def _put_responses(self, responses):
+        # Control and error items always fit so the end of the stream is never lost
+        if self._queue.qsize() >= self.max_queue_size:
+            if not self.lagged:
+                logger.debug(f"Viewer of agent run {self.agent_run_id} is lagging, dropping batches")
+            self.lagged = True
+            return
+        self._queue.put_nowait(("responses", responses))
+
+    def _put(self, item_type: str, data: Any):
+        self._queue.put_nowait((item_type, data))
+
+
+class RunStreamHub:
+    """Shares upstream Redis reads between all viewers of each run in this process."""
+
+    def __init__(self, max_viewer_queue_size: int = 256):
+        """Initialize the hub.
+
+        Args:
+            max_viewer_queue_size: Queued response batches at which a viewer is marked as lagged
+        """
+        self.max_viewer_queue_size = max_viewer_queue_size
+        self._viewers: Dict[str, Set[RunViewer]] = {}
+        self._readers: Dict[str, asyncio.Task] = {}
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    async def subscribe(self, agent_run_id: str, after_id: str) -> RunViewer:
+        """Start receiving a run's output.
+
+        Args:
+            agent_run_id: Run to watch
+            after_id: Last response ID the viewer has; used as the start of a new upstream read
+
+        Returns:
+            The viewer; responses the upstream read had delivered before it joined are
+            not queued, so the caller re-reads the stream after after_id once
+        """
+        viewer = RunViewer(agent_run_id, self.max_viewer_queue_size)
+        async with self._lock:
+            viewers = self._viewers.get(agent_run_id)
+            if viewers is None:
+                if self._pubsub is None:
+                    self._pubsub = await redis.create_pubsub()
+                await self._pubsub.subscribe(control_channel(agent_run_id))
+                if self._listener is None or self._listener.done():
+                    self._listener = asyncio.create_task(self._listen_control())
+                viewers = self._viewers[agent_run_id] = set()
+                self._readers[agent_run_id] = asyncio.create_task(self._read_responses(agent_run_id, after_id))
+                logger.debug(f"Started upstream reads for agent run {agent_run_id}")
+            viewers.add(viewer)
+        return viewer
+
+    async def unsubscribe(self, viewer: RunViewer):
+        """Stop a viewer; the run's upstream reads stop with its last viewer."""
+        agent_run_id = viewer.agent_run_id
+        async with self._lock:
+            viewers = self._viewers.get(agent_run_id)
+            if viewers is None:
+                return
+            viewers.discard(viewer)
+            if viewers:
+                return
+            del self._viewers[agent_run_id]
+            reader = self._readers.pop(agent_run_id, None)
+            if reader:
+                reader.cancel()
+            try:
+                await self._pubsub.unsubscribe(control_channel(agent_run_id))
+            except Exception as e:
+                logger.warning(f"Failed to unsubscribe from {control_channel(agent_run_id)}: {str(e)}")
+            logger.debug(f"Stopped upstream reads for agent run {agent_run_id}")
+
+    async def close(self):
+        """Stop all upstream reads and close the shared pub/sub connection."""
+        tasks = list(self._readers.values())
+        if self._listener:
+            tasks.append(self._listener)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._readers.clear()
+        self._viewers.clear()
+        self._listener = None
+        if self._pubsub:
+            try:
+                await self._pubsub.close()
+            except Exception as e:
+                logger.warning(f"Error closing stream hub pubsub: {str(e)}")
+            self._pubsub = None
+
+    def _broadcast(self, agent_run_id: str, item_type: str, data: Any):
+        for viewer in list(self._viewers.get(agent_run_id, ())):
+            if item_type == "responses":
+                viewer._put_responses(data)
+            else:
+                viewer._put(item_type, data)
+
+    async def _read_responses(self, agent_run_id: str, after_id: str):
+        reader = ResponseStreamReader(agent_run_id, after_id)
+        try:
+            await reader.open()
+            while True:
+                responses = await reader.read(block_ms=config.AGENT_RUN_STREAM_BLOCK_MS)
+                if responses:
+                    self._broadcast(agent_run_id, "responses", responses)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"Error reading responses for {agent_run_id}: {e}")
+            self._broadcast(agent_run_id, "error", "Reader failed")
+        finally:
+            await reader.close()
+
+    async def _listen_control(self):
+        while self._viewers:
+            try:
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in stream hub control listener: {e}")
+                for agent_run_id in list(self._viewers):
+                    self._broadcast(agent_run_id, "error", "Listener failed")
+                return
+            if not message or message.get("type") != "message":
+                continue
+            channel = message.get("channel")
+            data = message.get("data")
+            if isinstance(channel, bytes): channel = channel.decode('utf-8')
+            if isinstance(data, bytes): data = data.decode('utf-8')
+            if data in CONTROL_SIGNALS:
+                # Channel format: agent_run:{agent_run_id}:control
+                agent_run_id = channel.split(":")[1]
+                logger.info(f"Received control signal '{data}' for {agent_run_id}")
+                self._broadcast(agent_run_id, "control", data)
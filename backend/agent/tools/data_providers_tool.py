@@ -1,7 +1,7 @@
 import json
 from typing import Union, Dict, Any
 
-from agentpress.tool import Tool, ToolResult, openapi_schema, xml_schema
+from agentpress.tool import Tool, ToolResult, openapi_schema, xml_schema, cache_result
 from agent.tools.data_providers.LinkedinProvider import LinkedinProvider
 from agent.tools.data_providers.YahooFinanceProvider import YahooFinanceProvider
 from agent.tools.data_providers.AmazonProvider import AmazonProvider
@@ -22,6 +22,7 @@ class DataProvidersTool(Tool):
             "twitter": TwitterProvider()
         }
 
+    @cache_result(ttl=86400, scoped=False)
     @openapi_schema({
         "type": "function",
         "function": {
@@ -85,6 +86,7 @@ Use this tool when you need to discover what endpoints are available.
                 simplified_message += "..."
             return self.fail_response(simplified_message)
 
+    @cache_result(ttl=3600, scoped=False)
     @openapi_schema({
         "type": "function",
         "function": {
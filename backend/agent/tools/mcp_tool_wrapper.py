@@ -1,4 +1,6 @@
 from typing import Any, Dict, List, Optional
+import hashlib
+import json
 from agentpress.tool import Tool, ToolResult, ToolSchema, SchemaType
 from mcp_module import mcp_service
 from utils.logger import logger
@@ -25,6 +27,11 @@ class MCPToolWrapper(Tool):
         
         super().__init__()
         
+    def get_cache_scope(self) -> Optional[str]:
+        """Cached results are shared only between runs with the same MCP configs and credentials."""
+        configs = json.dumps(self.mcp_configs, sort_keys=True, default=str)
+        return f"mcp:{hashlib.sha256(configs.encode()).hexdigest()[:16]}"
+
     async def _ensure_initialized(self):
         if not self._initialized:
             await self._initialize_servers()
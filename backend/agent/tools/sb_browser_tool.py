@@ -2,6 +2,7 @@ import traceback
 import json
 import base64
 import io
+from typing import List, Tuple
 from PIL import Image
 
 from agentpress.tool import ToolResult, openapi_schema, xml_schema
@@ -18,6 +19,10 @@ class SandboxBrowserTool(SandboxToolsBase):
         super().__init__(project_id, thread_manager)
         self.thread_id = thread_id
 
+    def get_concurrency_scopes(self) -> List[Tuple[str, int]]:
+        """The sandbox runs a single browser, so its actions also run one at a time."""
+        return super().get_concurrency_scopes() + [(f"browser:{self.project_id}", 1)]
+
     def _validate_base64_image(self, base64_string: str, max_size_mb: int = 10) -> tuple[bool, str]:
         """
         Comprehensive validation of base64 image data.
@@ -1,12 +1,16 @@
 import asyncio
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, AsyncGenerator, Union
 import time
 import asyncio
 from uuid import uuid4
-from agentpress.tool import ToolResult, openapi_schema, xml_schema
+from agentpress.tool import ToolResult, ToolProgress, openapi_schema, xml_schema
 from sandbox.tool_base import SandboxToolsBase
 from agentpress.thread_manager import ThreadManager
 
+# Blocking commands report the tail of their output this often while running
+PROGRESS_INTERVAL_SECONDS = 2
+PROGRESS_TAIL_LINES = 20
+
 class SandboxShellTool(SandboxToolsBase):
     """Tool for executing tasks in a Daytona sandbox with browser-use capabilities. 
     Uses sessions for maintaining state between commands and provides comprehensive process management."""
@@ -116,7 +120,7 @@ class SandboxShellTool(SandboxToolsBase):
         session_name: Optional[str] = None,
         blocking: bool = False,
         timeout: int = 60
-    ) -> ToolResult:
+    ) -> AsyncGenerator[Union[ToolProgress, ToolResult], None]:
         try:
             # Ensure sandbox is initialized
             await self._ensure_sandbox()
@@ -155,6 +159,8 @@ class SandboxShellTool(SandboxToolsBase):
                 
                 start_time = time.time()
                 final_output = ""
+                last_progress_time = start_time
+                last_tail = None
                 
                 while (time.time() - start_time) < timeout:
                     # Wait a shorter interval for more responsive checking
@@ -172,6 +178,17 @@ class SandboxShellTool(SandboxToolsBase):
                     if self._is_command_completed(current_output, marker):
                         final_output = current_output
                         break
+
+                    # Stream the tail of the output while the command runs
+                    if time.time() - last_progress_time >= PROGRESS_INTERVAL_SECONDS:
+                        tail = "\n".join(current_output.rstrip().splitlines()[-PROGRESS_TAIL_LINES:])
+                        if tail != last_tail:
+                            yield ToolProgress(
+                                message=f"Running for {int(time.time() - start_time)}s",
+                                data={"session_name": session_name, "tail": tail}
+                            )
+                            last_tail = tail
+                        last_progress_time = time.time()
                 
                 # If we didn't get the marker, capture whatever output we have
                 if not final_output:
@@ -181,7 +198,7 @@ class SandboxShellTool(SandboxToolsBase):
                 # Kill the session after capture
                 await self._execute_raw_command(f"tmux kill-session -t {session_name}")
                 
-                return self.success_response({
+                yield self.success_response({
                     "output": final_output,
                     "session_name": session_name,
                     "cwd": cwd,
@@ -192,7 +209,7 @@ class SandboxShellTool(SandboxToolsBase):
                 await self._execute_raw_command(f'tmux send-keys -t {session_name} "{wrapped_command}" Enter')
                 
                 # For non-blocking, just return immediately
-                return self.success_response({
+                yield self.success_response({
                     "session_name": session_name,
                     "cwd": cwd,
                     "message": f"Command sent to tmux session '{session_name}'. Use check_command_output to view results.",
@@ -206,7 +223,7 @@ class SandboxShellTool(SandboxToolsBase):
                     await self._execute_raw_command(f"tmux kill-session -t {session_name}")
                 except:
                     pass
-            return self.fail_response(f"Error executing command: {str(e)}")
+            yield self.fail_response(f"Error executing command: {str(e)}")
 
     async def _execute_raw_command(self, command: str) -> Dict[str, Any]:
         """Execute a raw command directly in the sandbox."""
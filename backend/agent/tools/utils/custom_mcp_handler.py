@@ -186,6 +186,7 @@ class CustomMCPHandler:
                     'name': tool_name,
                     'description': tool.description,
                     'parameters': tool.inputSchema,
+                    'read_only': bool(getattr(getattr(tool, 'annotations', None), 'readOnlyHint', False)),
                     'server': server_name,
                     'original_name': tool_name_from_server,
                     'is_custom': True,
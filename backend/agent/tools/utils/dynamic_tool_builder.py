@@ -1,5 +1,6 @@
 from typing import Dict, Any, List, Callable, Awaitable
-from agentpress.tool import ToolResult, ToolSchema, SchemaType
+from agentpress.tool import ToolResult, ToolSchema, SchemaType, ToolCachePolicy
+from utils.config import config
 from utils.logger import logger
 
 
@@ -22,7 +23,8 @@ class DynamicToolBuilder:
             openapi_tool_info = {
                 "name": tool_name,
                 "description": tool_info['description'],
-                "parameters": tool_info['parameters']
+                "parameters": tool_info['parameters'],
+                "read_only": tool_info.get('read_only', False)
             }
             method = self._create_dynamic_method(tool_name, openapi_tool_info, execute_callback)
             if method:
@@ -46,6 +48,9 @@ class DynamicToolBuilder:
         schema = self._create_tool_schema(method_name, description, tool_info)
         
         dynamic_tool_method.tool_schemas = [schema]
+        # Tools the server marks read-only are safe to answer from the result cache
+        if tool_info.get('read_only'):
+            dynamic_tool_method.tool_cache = ToolCachePolicy(ttl=config.MCP_READ_ONLY_CACHE_TTL)
         
         tool_data = {
             'method': dynamic_tool_method,
@@ -1,7 +1,7 @@
 from tavily import AsyncTavilyClient
 import httpx
 from dotenv import load_dotenv
-from agentpress.tool import Tool, ToolResult, openapi_schema, xml_schema
+from agentpress.tool import Tool, ToolResult, ToolProgress, openapi_schema, xml_schema, tool_limits, cache_result
 from utils.config import config
 from sandbox.tool_base import SandboxToolsBase
 from agentpress.thread_manager import ThreadManager
@@ -10,6 +10,7 @@ import os
 import datetime
 import asyncio
 import logging
+from typing import AsyncGenerator, Union
 
 # TODO: add subpages, etc... in filters as sometimes its necessary 
 
@@ -33,6 +34,8 @@ class SandboxWebSearchTool(SandboxToolsBase):
         # Tavily asynchronous search client
         self.tavily_client = AsyncTavilyClient(api_key=self.tavily_api_key)
 
+    @tool_limits(timeout=60)
+    @cache_result(ttl=3600, scoped=False)
     @openapi_schema({
         "type": "function",
         "function": {
@@ -144,6 +147,8 @@ class SandboxWebSearchTool(SandboxToolsBase):
                 simplified_message += "..."
             return self.fail_response(simplified_message)
 
+    # Not cached: the result names files written into the sandbox, which a cache hit would not recreate
+    @tool_limits(timeout=180)
     @openapi_schema({
         "type": "function",
         "function": {
@@ -177,7 +182,7 @@ class SandboxWebSearchTool(SandboxToolsBase):
     async def scrape_webpage(
         self,
         urls: str
-    ) -> ToolResult:
+    ) -> AsyncGenerator[Union[ToolProgress, ToolResult], None]:
         """
         Retrieve the complete text content of multiple webpages in a single efficient operation.
         
@@ -196,14 +201,16 @@ class SandboxWebSearchTool(SandboxToolsBase):
             # Parse the URLs parameter
             if not urls:
                 logging.warning("Scrape attempt with empty URLs")
-                return self.fail_response("Valid URLs are required.")
+                yield self.fail_response("Valid URLs are required.")
+                return
             
             # Split the URLs string into a list
             url_list = [url.strip() for url in urls.split(',') if url.strip()]
             
             if not url_list:
                 logging.warning("No valid URLs found in the input")
-                return self.fail_response("No valid URLs provided.")
+                yield self.fail_response("No valid URLs provided.")
+                return
                 
             if len(url_list) == 1:
                 logging.warning("Only a single URL provided - for efficiency you should scrape multiple URLs at once")
@@ -222,6 +229,10 @@ class SandboxWebSearchTool(SandboxToolsBase):
                     # Scrape this URL
                     result = await self._scrape_single_url(url)
                     results.append(result)
+                    yield ToolProgress(
+                        message=f"Scraped {len(results)}/{len(url_list)} URLs",
+                        data={"url": url, "success": result.get("success", False), "file_path": result.get("file_path")}
+                    )
                     
                 except Exception as e:
                     logging.error(f"Error processing URL {url}: {str(e)}")
@@ -252,9 +263,10 @@ class SandboxWebSearchTool(SandboxToolsBase):
                         message += f"\n- {r.get('url')}: {r.get('error', 'Unknown error')}"
             else:
                 error_details = "; ".join([f"{r.get('url')}: {r.get('error', 'Unknown error')}" for r in results])
-                return self.fail_response(f"Failed to scrape all {len(results)} URLs. Errors: {error_details}")
+                yield self.fail_response(f"Failed to scrape all {len(results)} URLs. Errors: {error_details}")
+                return
             
-            return ToolResult(
+            yield ToolResult(
                 success=True,
                 output=message
             )
@@ -262,7 +274,7 @@ class SandboxWebSearchTool(SandboxToolsBase):
         except Exception as e:
             error_message = str(e)
             logging.error(f"Error in scrape_webpage: {error_message}")
-            return self.fail_response(f"Error processing scrape request: {error_message[:200]}")
+            yield self.fail_response(f"Error processing scrape request: {error_message[:200]}")
     
     async def _scrape_single_url(self, url: str) -> dict:
         """
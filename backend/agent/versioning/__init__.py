@@ -3,6 +3,7 @@ from .version_service import (
     AgentVersion,
     VersionStatus,
     get_version_service,
+    get_tool_summary,
     VersionServiceError,
     VersionNotFoundError,
     AgentNotFoundError,
@@ -16,6 +17,7 @@ __all__ = [
     'AgentVersion', 
     'VersionStatus',
     'get_version_service',
+    'get_tool_summary',
     'VersionServiceError',
     'VersionNotFoundError',
     'AgentNotFoundError',
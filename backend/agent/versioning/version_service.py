@@ -52,6 +52,25 @@ class AgentVersion:
         }
 
 
+def _is_tool_enabled(tool_config: Any) -> bool:
+    if isinstance(tool_config, dict):
+        return bool(tool_config.get('enabled', False))
+    return bool(tool_config)
+
+
+def get_tool_summary(configured_mcps: List[Dict[str, Any]], agentpress_tools: Dict[str, Any]) -> Dict[str, Any]:
+    """Tool summary columns stored on an agent for its current version."""
+    configured_mcps = configured_mcps or []
+    enabled_tools = [name for name, tool_config in (agentpress_tools or {}).items() if _is_tool_enabled(tool_config)]
+    tool_names = [f"mcp:{mcp['name']}" for mcp in configured_mcps if isinstance(mcp, dict) and 'name' in mcp]
+    tool_names += [f"agentpress:{name}" for name in enabled_tools]
+    return {
+        'mcp_tools_count': len(configured_mcps),
+        'agentpress_tools_count': len(enabled_tools),
+        'tool_names': tool_names
+    }
+
+
 class VersionServiceError(Exception):
     pass
 
@@ -121,12 +140,13 @@ class VersionService:
         
         return result.count or 0
     
-    async def _update_agent_current_version(self, agent_id: str, version_id: str, version_count: int):
+    async def _update_agent_current_version(self, agent_id: str, version: AgentVersion, version_count: int):
         client = await self._get_client()
         
         data = {
-            'current_version_id': version_id,
-            'version_count': version_count
+            'current_version_id': version.version_id,
+            'version_count': version_count,
+            **get_tool_summary(version.configured_mcps, version.agentpress_tools)
         }
         
         result = await client.table('agents').update(data).eq(
@@ -242,7 +262,7 @@ class VersionService:
             raise Exception("Failed to create version")
         
         version_count = await self._count_versions(agent_id)
-        await self._update_agent_current_version(agent_id, version.version_id, version_count)
+        await self._update_agent_current_version(agent_id, version, version_count)
         
         logger.info(f"Created version {version.version_name} for agent {agent_id}")
         return version
@@ -320,7 +340,7 @@ class VersionService:
         }).eq('version_id', version_id).execute()
         
         version_count = await self._count_versions(agent_id)
-        await self._update_agent_current_version(agent_id, version_id, version_count)
+        await self._update_agent_current_version(agent_id, self._version_from_db_row(version), version_count)
         
         logger.info(f"Activated version {version['version_name']} for agent {agent_id}")
     
@@ -2,17 +2,36 @@
 Context Management for AgentPress Threads.
 
 This module handles token counting and thread summarization to prevent
-reaching the context window limitations of LLM models.
+reaching the context window limitations of LLM models. Per-message token
+counts are memoized so repeated compression passes do not re-tokenize.
 """
 
 import json
-from typing import List, Dict, Any, Optional, Union
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional, Set, Union
 
-from litellm.utils import token_counter
+from agentpress.message import Message
+from agentpress.token_cache import TokenCountCache
+from services import redis
 from services.supabase import DBConnection
+from utils.config import config
 from utils.logger import logger
 
 DEFAULT_TOKEN_THRESHOLD = 120000
+DEFAULT_MAX_MESSAGES = 320
+MESSAGE_VIEW_CACHE_SIZE = 5000
+# Redis TTL of a thread's frozen compaction state (7 days)
+COMPACTION_STATE_TTL = 3600 * 24 * 7
+
+
+@dataclass
+class CompactionState:
+    """Compressed forms and omissions decided at a thread's last compaction."""
+    frozen_contents: Dict[str, Any] = field(default_factory=dict)
+    omitted_message_ids: Set[str] = field(default_factory=set)
+    dirty: bool = False
+
 
 class ContextManager:
     """Manages thread context including token counting and summarization."""
@@ -25,29 +44,84 @@ class ContextManager:
         """
         self.db = DBConnection()
         self.token_threshold = token_threshold
+        self.token_cache = TokenCountCache()
+        self._message_views: "OrderedDict[int, Message]" = OrderedDict()
+        # Cache-stable mode: compaction state per thread, persisted in Redis between runs
+        self._compaction_states: Dict[Optional[str], CompactionState] = {}
+
+    @staticmethod
+    def _compaction_state_key(thread_id: str) -> str:
+        return f"thread_compaction:{thread_id}"
+
+    async def load_compaction_state(self, thread_id: str) -> CompactionState:
+        """Load a thread's frozen compaction state from Redis once per manager.
+
+        A new ContextManager is created for every run, so without this each user
+        turn would start from an empty state and re-compact the whole thread.
+        """
+        state = self._compaction_states.get(thread_id)
+        if state is not None:
+            return state
+        state = CompactionState()
+        try:
+            state_json = await redis.get(self._compaction_state_key(thread_id))
+            if state_json:
+                data = json.loads(state_json)
+                state.frozen_contents = data.get("frozen_contents") or {}
+                state.omitted_message_ids = set(data.get("omitted_message_ids") or [])
+        except Exception as e:
+            logger.warning(f"Failed to load compaction state for thread {thread_id}: {e}")
+        self._compaction_states[thread_id] = state
+        return state
+
+    async def save_compaction_state(self, thread_id: str):
+        """Persist a thread's compaction state if the last compaction changed it."""
+        state = self._compaction_states.get(thread_id)
+        if state is None or not state.dirty:
+            return
+        data = {
+            "frozen_contents": state.frozen_contents,
+            "omitted_message_ids": sorted(state.omitted_message_ids),
+        }
+        try:
+            await redis.set(self._compaction_state_key(thread_id), json.dumps(data), ex=COMPACTION_STATE_TTL)
+            state.dirty = False
+        except Exception as e:
+            logger.warning(f"Failed to save compaction state for thread {thread_id}: {e}")
+
+    def count_tokens(self, messages: List[Dict[str, Any]], llm_model: str) -> int:
+        """Count the tokens of a message list using the per-message cache."""
+        return self.token_cache.count_messages(messages, llm_model)
+
+    def get_message_view(self, msg: Dict[str, Any]) -> Message:
+        """Get the parse-once view of a message, reusing it while the content object is unchanged.
+
+        Views are keyed by the identity of the content object; a view keeps its
+        content alive, so the key cannot be reused while the entry exists.
+        """
+        key = id(msg.get('content'))
+        view = self._message_views.get(key)
+        if view is not None and view.matches(msg):
+            self._message_views.move_to_end(key)
+            return view
+        view = Message(msg)
+        self._message_views[key] = view
+        if len(self._message_views) > MESSAGE_VIEW_CACHE_SIZE:
+            self._message_views.popitem(last=False)
+        return view
 
     def is_tool_result_message(self, msg: Dict[str, Any]) -> bool:
         """Check if a message is a tool result message."""
         if not isinstance(msg, dict) or not ("content" in msg and msg['content']):
             return False
-        content = msg['content']
-        if isinstance(content, str) and "ToolResult" in content: 
-            return True
-        if isinstance(content, dict) and "tool_execution" in content: 
-            return True
-        if isinstance(content, dict) and "interactive_elements" in content: 
-            return True
-        if isinstance(content, str):
-            try:
-                parsed_content = json.loads(content)
-                if isinstance(parsed_content, dict) and "tool_execution" in parsed_content: 
-                    return True
-                if isinstance(parsed_content, dict) and "interactive_elements" in content: 
-                    return True
-            except (json.JSONDecodeError, TypeError):
-                pass
-        return False
+        return self.get_message_view(msg).is_tool_result
     
+    def get_serialized_content(self, msg_content: Union[str, dict]) -> str:
+        """Get message content as a string, serializing structured content at most once per content object."""
+        if isinstance(msg_content, str):
+            return msg_content
+        return self.get_message_view({"content": msg_content}).serialized
+
     def compress_message(self, msg_content: Union[str, dict], message_id: Optional[str] = None, max_length: int = 3000) -> Union[str, dict]:
         """Compress the message content."""
         if isinstance(msg_content, str):
@@ -56,21 +130,29 @@ class ContextManager:
             else:
                 return msg_content
         elif isinstance(msg_content, dict):
-            if len(json.dumps(msg_content)) > max_length:
+            serialized = self.get_serialized_content(msg_content)
+            if len(serialized) > max_length:
                 # Special handling for edit_file tool result to preserve JSON structure
                 tool_execution = msg_content.get("tool_execution", {})
                 if tool_execution.get("function_name") == "edit_file":
-                    output = tool_execution.get("result", {}).get("output", {})
+                    result = tool_execution.get("result", {})
+                    output = result.get("output", {})
                     if isinstance(output, dict):
-                        # Truncate file contents within the JSON
+                        # Truncate file contents within the JSON, on a copy so cached views stay valid
+                        truncated_output = dict(output)
+                        truncated = False
                         for key in ["original_content", "updated_content"]:
                             if isinstance(output.get(key), str) and len(output[key]) > max_length // 4:
-                                output[key] = output[key][:max_length // 4] + "\n... (truncated)"
+                                truncated_output[key] = output[key][:max_length // 4] + "\n... (truncated)"
+                                truncated = True
+                        if truncated:
+                            msg_content = {**msg_content, "tool_execution": {**tool_execution, "result": {**result, "output": truncated_output}}}
+                            serialized = json.dumps(msg_content)
                 
                 # After potential truncation, check size again
-                if len(json.dumps(msg_content)) > max_length:
+                if len(serialized) > max_length:
                     # If still too large, fall back to string truncation
-                    return json.dumps(msg_content)[:max_length] + "... (truncated)" + f"\n\nmessage_id \"{message_id}\"\nUse expand-message tool to see contents"
+                    return serialized[:max_length] + "... (truncated)" + f"\n\nmessage_id \"{message_id}\"\nUse expand-message tool to see contents"
                 else:
                     return msg_content
             else:
@@ -93,7 +175,7 @@ class ContextManager:
             else:
                 return msg_content
         elif isinstance(msg_content, dict):
-            json_str = json.dumps(msg_content)
+            json_str = self.get_serialized_content(msg_content)
             if len(json_str) > max_length:
                 # Calculate how much to keep from start and end
                 keep_length = max_length - 150  # Reserve space for truncation message
@@ -109,7 +191,7 @@ class ContextManager:
   
     def compress_tool_result_messages(self, messages: List[Dict[str, Any]], llm_model: str, max_tokens: Optional[int], token_threshold: int = 1000) -> List[Dict[str, Any]]:
         """Compress the tool result messages except the most recent one."""
-        uncompressed_total_token_count = token_counter(model=llm_model, messages=messages)
+        uncompressed_total_token_count = self.token_cache.count_messages(messages, llm_model)
         max_tokens_value = max_tokens or (100 * 1000)
 
         if uncompressed_total_token_count > max_tokens_value:
@@ -119,7 +201,7 @@ class ContextManager:
                     continue  # Skip non-dict messages
                 if self.is_tool_result_message(msg):  # Only compress ToolResult messages
                     _i += 1  # Count the number of ToolResult messages
-                    msg_token_count = token_counter(messages=[msg])  # Count the number of tokens in the message
+                    msg_token_count = self.token_cache.count_message(msg, llm_model)  # Count the number of tokens in the message
                     if msg_token_count > token_threshold:  # If the message is too long
                         if _i > 1:  # If this is not the most recent ToolResult message
                             message_id = msg.get('message_id')  # Get the message_id
@@ -133,7 +215,7 @@ class ContextManager:
 
     def compress_user_messages(self, messages: List[Dict[str, Any]], llm_model: str, max_tokens: Optional[int], token_threshold: int = 1000) -> List[Dict[str, Any]]:
         """Compress the user messages except the most recent one."""
-        uncompressed_total_token_count = token_counter(model=llm_model, messages=messages)
+        uncompressed_total_token_count = self.token_cache.count_messages(messages, llm_model)
         max_tokens_value = max_tokens or (100 * 1000)
 
         if uncompressed_total_token_count > max_tokens_value:
@@ -143,7 +225,7 @@ class ContextManager:
                     continue  # Skip non-dict messages
                 if msg.get('role') == 'user':  # Only compress User messages
                     _i += 1  # Count the number of User messages
-                    msg_token_count = token_counter(messages=[msg])  # Count the number of tokens in the message
+                    msg_token_count = self.token_cache.count_message(msg, llm_model)  # Count the number of tokens in the message
                     if msg_token_count > token_threshold:  # If the message is too long
                         if _i > 1:  # If this is not the most recent User message
                             message_id = msg.get('message_id')  # Get the message_id
@@ -157,7 +239,7 @@ class ContextManager:
 
     def compress_assistant_messages(self, messages: List[Dict[str, Any]], llm_model: str, max_tokens: Optional[int], token_threshold: int = 1000) -> List[Dict[str, Any]]:
         """Compress the assistant messages except the most recent one."""
-        uncompressed_total_token_count = token_counter(model=llm_model, messages=messages)
+        uncompressed_total_token_count = self.token_cache.count_messages(messages, llm_model)
         max_tokens_value = max_tokens or (100 * 1000)
         
         if uncompressed_total_token_count > max_tokens_value:
@@ -167,7 +249,7 @@ class ContextManager:
                     continue  # Skip non-dict messages
                 if msg.get('role') == 'assistant':  # Only compress Assistant messages
                     _i += 1  # Count the number of Assistant messages
-                    msg_token_count = token_counter(messages=[msg])  # Count the number of tokens in the message
+                    msg_token_count = self.token_cache.count_message(msg, llm_model)  # Count the number of tokens in the message
                     if msg_token_count > token_threshold:  # If the message is too long
                         if _i > 1:  # If this is not the most recent Assistant message
                             message_id = msg.get('message_id')  # Get the message_id
@@ -181,34 +263,269 @@ class ContextManager:
         return messages
 
     def remove_meta_messages(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Remove meta messages from the messages."""
+        """Remove meta messages from the messages.
+
+        Structured content is rendered as a JSON string without tool call
+        arguments. The rendering is cached on the message view, so unchanged
+        messages yield the same string object on every turn.
+        """
         result: List[Dict[str, Any]] = []
         for msg in messages:
-            msg_content = msg.get('content')
-            # Try to parse msg_content as JSON if it's a string
-            if isinstance(msg_content, str):
-                try: 
-                    msg_content = json.loads(msg_content)
-                except json.JSONDecodeError: 
-                    pass
-            if isinstance(msg_content, dict):
-                # Create a copy to avoid modifying the original
-                msg_content_copy = msg_content.copy()
-                if "tool_execution" in msg_content_copy:
-                    tool_execution = msg_content_copy["tool_execution"].copy()
-                    if "arguments" in tool_execution:
-                        del tool_execution["arguments"]
-                    msg_content_copy["tool_execution"] = tool_execution
+            if not isinstance(msg, dict):
+                result.append(msg)
+                continue
+            content = self.get_message_view(msg).without_meta
+            if content is msg.get('content'):
+                result.append(msg)
+            else:
                 # Create a new message dict with the modified content
                 new_msg = msg.copy()
-                new_msg["content"] = json.dumps(msg_content_copy)
+                new_msg["content"] = content
                 result.append(new_msg)
+        return result
+
+    def get_model_max_tokens(self, llm_model: str) -> int:
+        """Get the context budget for a model, leaving room for output and the system prompt."""
+        if 'sonnet' in llm_model.lower():
+            return 200 * 1000 - 64000 - 28000
+        elif 'gpt' in llm_model.lower():
+            return 128 * 1000 - 28000
+        elif 'gemini' in llm_model.lower():
+            return 1000 * 1000 - 300000
+        elif 'deepseek' in llm_model.lower():
+            return 128 * 1000 - 28000
+        else:
+            return 41 * 1000 - 10000
+
+    def get_message_kind(self, msg: Dict[str, Any]) -> Optional[str]:
+        """Classify a message for compression planning: 'tool_result', 'user', 'assistant' or None."""
+        if not isinstance(msg, dict):
+            return None
+        if self.is_tool_result_message(msg):
+            return 'tool_result'
+        role = msg.get('role')
+        if role in ('user', 'assistant'):
+            return role
+        return None
+
+    def compress_messages(self, messages: List[Dict[str, Any]], llm_model: str, max_tokens: Optional[int] = 41000, token_threshold: int = 4096, max_iterations: int = 5, thread_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Compress the messages to fit the model's context budget.
+        
+        Args:
+            messages: List of messages to compress
+            llm_model: Model name for token counting
+            max_tokens: Maximum allowed tokens (overridden by the model-specific budget)
+            token_threshold: Token threshold above which a message is truncated
+            max_iterations: Unused; kept for compatibility with the recursive strategy
+            thread_id: Thread the messages belong to; selects the frozen state in cache-stable mode
+        """
+        if config.CONTEXT_CACHE_STABLE_COMPRESSION:
+            return self.compress_messages_cache_stable(messages, llm_model, token_threshold, thread_id)
+
+        max_tokens = self.get_model_max_tokens(llm_model)
+        cache_stats_before = self.token_cache.snapshot()
+
+        result = self.plan_compression(messages, llm_model, max_tokens, token_threshold)
+
+        cache_stats = self.token_cache.snapshot()
+        skipped = cache_stats["hits"] - cache_stats_before["hits"]
+        tokenized = cache_stats["misses"] - cache_stats_before["misses"]
+        logger.info(f"compress_messages: token cache skipped {skipped} tokenizations, ran {tokenized}")
+
+        return self.middle_out_messages(result)
+
+    def compress_messages_cache_stable(self, messages: List[Dict[str, Any]], llm_model: str, token_threshold: int = 4096, thread_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Compress the messages while keeping the prompt prefix byte-stable between turns.
+
+        Compressed forms and omissions are frozen by message_id and reapplied on
+        every call, so the prefix sent to the model only changes when a new
+        compaction runs. Compaction happens only once the context exceeds the
+        model budget (or the message cap) and then shrinks it to
+        CONTEXT_COMPACTION_TARGET_PERCENT of both in one step, leaving enough
+        headroom that the next compaction is many turns away.
+
+        The state is kept per thread; call load_compaction_state before and
+        save_compaction_state after so it carries over to the next run.
+
+        Args:
+            messages: List of messages to compress
+            llm_model: Model name for token counting
+            token_threshold: Token threshold above which a message is truncated
+            thread_id: Thread whose compaction state is applied and updated
+        """
+        max_tokens = self.get_model_max_tokens(llm_model)
+        state = self._compaction_states.setdefault(thread_id, CompactionState())
+
+        result = []
+        for msg in self.remove_meta_messages(messages):
+            message_id = msg.get('message_id') if isinstance(msg, dict) else None
+            if message_id in state.omitted_message_ids:
+                continue
+            if message_id in state.frozen_contents:
+                msg = msg.copy()
+                msg["content"] = state.frozen_contents[message_id]
+            result.append(msg)
+
+        token_count = self.count_tokens(result, llm_model)
+        if token_count <= max_tokens and len(result) <= DEFAULT_MAX_MESSAGES:
+            return result
+
+        target_percent = min(max(config.CONTEXT_COMPACTION_TARGET_PERCENT, 10), 100)
+        target_tokens = max_tokens * target_percent // 100
+        target_messages = DEFAULT_MAX_MESSAGES * target_percent // 100
+        logger.warning(f"compress_messages_cache_stable: compacting {token_count} tokens / {len(result)} messages to {target_tokens} tokens / {target_messages} messages")
+
+        compacted = self.middle_out_messages(
+            self.plan_compression(result, llm_model, target_tokens, token_threshold),
+            target_messages
+        )
+
+        # Freeze every change so later turns reproduce exactly the same prefix
+        originals = {msg.get('message_id'): msg for msg in result if isinstance(msg, dict) and msg.get('message_id')}
+        kept = set()
+        frozen = 0
+        for msg in compacted:
+            message_id = msg.get('message_id') if isinstance(msg, dict) else None
+            if not message_id:
+                continue
+            kept.add(message_id)
+            if message_id in originals and originals[message_id].get("content") != msg["content"]:
+                state.frozen_contents[message_id] = msg["content"]
+                frozen += 1
+        omitted = [message_id for message_id in originals if message_id not in kept]
+        state.omitted_message_ids.update(omitted)
+        state.dirty = state.dirty or bool(frozen or omitted)
+
+        logger.info(f"compress_messages_cache_stable: {token_count} -> {self.count_tokens(compacted, llm_model)} tokens ({frozen} frozen, {len(omitted)} omitted)")
+        return compacted
+
+    def plan_compression(
+            self,
+            messages: List[Dict[str, Any]],
+            llm_model: str,
+            max_tokens: int,
+            token_threshold: int = 4096,
+            min_messages_to_keep: int = 10
+        ) -> List[Dict[str, Any]]:
+        """Bring the messages under max_tokens in a single planned pass.
+
+        Each message is costed once. Truncations are then applied in priority
+        order (oldest tool results, then older user and assistant messages, and
+        finally the most recent message of each kind) until the budget is met.
+        If truncation is not enough, whole messages are omitted in the same
+        priority order, never touching the system prompt, the most recent
+        message of each kind or the last min_messages_to_keep messages.
+        Assistant messages with native tool calls are omitted together with
+        their tool responses. The plan depends only on the input, so identical
+        inputs always produce identical output.
+
+        Args:
+            messages: List of messages to compress
+            llm_model: Model name for token counting
+            max_tokens: Token budget to fit
+            token_threshold: Token threshold above which a message is truncated
+            min_messages_to_keep: Number of trailing messages that are never omitted
+
+        Returns:
+            The compressed list of messages; the input messages are not modified
+        """
+        result = self.remove_meta_messages(messages)
+        costs = [self.token_cache.count_message(msg, llm_model) if isinstance(msg, dict) else 0 for msg in result]
+        initial_token_count = total = sum(costs)
+        if total <= max_tokens:
+            return result
+
+        system_index = 0 if result and isinstance(result[0], dict) and result[0].get('role') == 'system' else None
+        kinds = [self.get_message_kind(msg) for msg in result]
+
+        # The most recent message of each kind is only ever middle-truncated
+        latest: Dict[str, int] = {}
+        for i in range(len(result) - 1, -1, -1):
+            if kinds[i] and kinds[i] not in latest:
+                latest[kinds[i]] = i
+            role = result[i].get('role') if isinstance(result[i], dict) else None
+            if role in ('user', 'assistant') and role not in latest:
+                latest[role] = i
+        protected = set(latest.values())
+        if system_index is not None:
+            protected.add(system_index)
+
+        # 1. Truncation: (priority, index) keeps the order deterministic; O(n log n)
+        truncation_priority = {'tool_result': 0, 'user': 1, 'assistant': 2}
+        truncations = sorted(
+            (3 if i in protected else truncation_priority[kinds[i]], i)
+            for i in range(len(result))
+            if i != system_index and kinds[i] and costs[i] > token_threshold
+            and isinstance(result[i].get('content'), (str, dict))
+        )
+
+        truncated = 0
+        for _, i in truncations:
+            if total <= max_tokens:
+                break
+            msg = result[i]
+            if i in protected:
+                new_content = self.safe_truncate(msg["content"], int(max_tokens * 2))
             else:
-                result.append(msg)
+                message_id = msg.get('message_id')
+                if not message_id:
+                    logger.warning(f"UNEXPECTED: Message has no message_id {str(msg)[:100]}")
+                    continue
+                new_content = self.compress_message(msg["content"], message_id, token_threshold * 3)
+            new_msg = msg.copy()
+            new_msg["content"] = new_content
+            new_cost = self.token_cache.count_message(new_msg, llm_model)
+            total += new_cost - costs[i]
+            costs[i] = new_cost
+            result[i] = new_msg
+            truncated += 1
+
+        # 2. Omission: remove whole messages (or tool-call groups) by the same priority
+        omitted = set()
+        if total > max_tokens:
+            keep_from = max(len(result) - min_messages_to_keep, 0)
+            groups: Dict[int, List[int]] = {}
+            grouped = set()
+            for i, msg in enumerate(result):
+                if isinstance(msg, dict) and msg.get('role') == 'assistant' and msg.get('tool_calls'):
+                    call_ids = {call.get('id') for call in msg['tool_calls'] if isinstance(call, dict)}
+                    group = [i]
+                    for j in range(i + 1, len(result)):
+                        candidate = result[j]
+                        if not (isinstance(candidate, dict) and candidate.get('role') == 'tool'):
+                            break
+                        if candidate.get('tool_call_id') in call_ids:
+                            group.append(j)
+                    groups[i] = group
+                    grouped.update(group[1:])
+
+            omissions = sorted(
+                (0 if kinds[i] == 'tool_result' else 1, i)
+                for i in range(len(result))
+                if i != system_index and i not in grouped
+            )
+            for _, i in omissions:
+                if total <= max_tokens:
+                    break
+                group = groups.get(i, [i])
+                if any(j in protected or j >= keep_from for j in group):
+                    continue
+                omitted.update(group)
+                total -= sum(costs[j] for j in group)
+
+            if omitted:
+                result = [msg for i, msg in enumerate(result) if i not in omitted]
+            if total > max_tokens:
+                logger.warning(f"plan_compression: still over budget after omitting {len(omitted)} messages: {total} > {max_tokens}")
+
+        logger.info(f"plan_compression: {initial_token_count} -> {total} tokens ({truncated} truncated, {len(omitted)} omitted, {len(messages)} -> {len(result)} messages)")
         return result
 
-    def compress_messages(self, messages: List[Dict[str, Any]], llm_model: str, max_tokens: Optional[int] = 41000, token_threshold: int = 4096, max_iterations: int = 5) -> List[Dict[str, Any]]:
-        """Compress the messages.
+    def compress_messages_recursive(self, messages: List[Dict[str, Any]], llm_model: str, max_tokens: Optional[int] = 41000, token_threshold: int = 4096, max_iterations: int = 5) -> List[Dict[str, Any]]:
+        """Compress the messages by repeatedly halving the truncation threshold.
+
+        This is the previous compression strategy, kept as a baseline for
+        utils/scripts/benchmark_context_compression.py.
         
         Args:
             messages: List of messages to compress
@@ -217,28 +534,18 @@ class ContextManager:
             token_threshold: Token threshold for individual message compression (must be a power of 2)
             max_iterations: Maximum number of compression iterations
         """
-        # Set model-specific token limits
-        if 'sonnet' in llm_model.lower():
-            max_tokens = 200 * 1000 - 64000 - 28000
-        elif 'gpt' in llm_model.lower():
-            max_tokens = 128 * 1000 - 28000
-        elif 'gemini' in llm_model.lower():
-            max_tokens = 1000 * 1000 - 300000
-        elif 'deepseek' in llm_model.lower():
-            max_tokens = 128 * 1000 - 28000
-        else:
-            max_tokens = 41 * 1000 - 10000
+        max_tokens = self.get_model_max_tokens(llm_model)
 
         result = messages
         result = self.remove_meta_messages(result)
 
-        uncompressed_total_token_count = token_counter(model=llm_model, messages=result)
+        uncompressed_total_token_count = self.token_cache.count_messages(result, llm_model)
 
         result = self.compress_tool_result_messages(result, llm_model, max_tokens, token_threshold)
         result = self.compress_user_messages(result, llm_model, max_tokens, token_threshold)
         result = self.compress_assistant_messages(result, llm_model, max_tokens, token_threshold)
 
-        compressed_token_count = token_counter(model=llm_model, messages=result)
+        compressed_token_count = self.token_cache.count_messages(result, llm_model)
 
         logger.info(f"compress_messages: {uncompressed_total_token_count} -> {compressed_token_count}")  # Log the token compression for debugging later
 
@@ -249,7 +556,7 @@ class ContextManager:
 
         if compressed_token_count > max_tokens:
             logger.warning(f"Further token compression is needed: {compressed_token_count} > {max_tokens}")
-            result = self.compress_messages(messages, llm_model, max_tokens, token_threshold // 2, max_iterations - 1)
+            result = self.compress_messages_recursive(messages, llm_model, max_tokens, token_threshold // 2, max_iterations - 1)
 
         return self.middle_out_messages(result)
     
@@ -277,7 +584,7 @@ class ContextManager:
         result = self.remove_meta_messages(result)
 
         # Early exit if no compression needed
-        initial_token_count = token_counter(model=llm_model, messages=result)
+        initial_token_count = self.token_cache.count_messages(result, llm_model)
         max_allowed_tokens = max_tokens or (100 * 1000)
         
         if initial_token_count <= max_allowed_tokens:
@@ -314,17 +621,17 @@ class ContextManager:
 
             # Recalculate token count
             messages_to_count = ([system_message] + conversation_messages) if system_message else conversation_messages
-            current_token_count = token_counter(model=llm_model, messages=messages_to_count)
+            current_token_count = self.token_cache.count_messages(messages_to_count, llm_model)
 
         # Prepare final result
         final_messages = ([system_message] + conversation_messages) if system_message else conversation_messages
-        final_token_count = token_counter(model=llm_model, messages=final_messages)
+        final_token_count = self.token_cache.count_messages(final_messages, llm_model)
         
         logger.info(f"compress_messages_by_omitting_messages: {initial_token_count} -> {final_token_count} tokens ({len(messages)} -> {len(final_messages)} messages)")
             
         return final_messages
     
-    def middle_out_messages(self, messages: List[Dict[str, Any]], max_messages: int = 320) -> List[Dict[str, Any]]:
+    def middle_out_messages(self, messages: List[Dict[str, Any]], max_messages: int = DEFAULT_MAX_MESSAGES) -> List[Dict[str, Any]]:
         """Remove messages from the middle of the list, keeping max_messages total."""
         if len(messages) <= max_messages:
             return messages
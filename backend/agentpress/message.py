@@ -0,0 +1,144 @@
+"""
+Parse-once message representations for AgentPress.
+
+Message content travels as JSON strings between the database, the context
+manager and the streaming pipeline. The classes here keep the parsed form next
+to the serialized one so each is computed at most once:
+- Message: read-only view of an LLM message used for context management
+- MessageFrame: a yielded message dict that remembers its parsed content and metadata
+"""
+
+import json
+from typing import Any, Dict, Optional
+
+
+class Message:
+    """Parse-once view of an LLM message dict.
+
+    The content is parsed from JSON at most once, and the serialized form,
+    the tool-result check and the meta-stripped content are computed lazily
+    and cached. Instances are tied to the content object they
+    were built from; `matches` tells whether a message dict still has it.
+
+    Attributes:
+        message_id: ID of the message, if it has one
+        role: Role of the message
+        source: The original `content` value of the message dict
+        content: Parsed content (dict/list) or the original string if it is not JSON
+    """
+
+    __slots__ = (
+        'message_id', 'role', 'source', 'content',
+        '_serialized', '_is_tool_result', '_without_meta'
+    )
+
+    _UNSET = object()
+
+    def __init__(self, msg: Dict[str, Any]):
+        self.message_id: Optional[str] = msg.get('message_id')
+        self.role: Optional[str] = msg.get('role')
+        self.source = msg.get('content')
+        self.content = self.source
+        if isinstance(self.source, str):
+            try:
+                self.content = json.loads(self.source)
+            except (json.JSONDecodeError, TypeError):
+                pass
+        self._serialized: Optional[str] = None
+        self._is_tool_result: Optional[bool] = None
+        self._without_meta: Any = Message._UNSET
+
+    def matches(self, msg: Dict[str, Any]) -> bool:
+        """Whether this view was built from the message's current content."""
+        return msg.get('content') is self.source
+
+    @property
+    def serialized(self) -> str:
+        """Content as a string: the original string, or the JSON rendering of structured content."""
+        if self._serialized is None:
+            self._serialized = self.source if isinstance(self.source, str) else json.dumps(self.source)
+        return self._serialized
+
+    @property
+    def is_tool_result(self) -> bool:
+        """Whether the content is a tool result."""
+        if self._is_tool_result is None:
+            source = self.source
+            content = self.content
+            self._is_tool_result = bool(source) and (
+                (isinstance(source, str) and "ToolResult" in source)
+                or (isinstance(content, dict) and ("tool_execution" in content or "interactive_elements" in content))
+            )
+        return self._is_tool_result
+
+    @property
+    def without_meta(self) -> Any:
+        """Content with tool call arguments stripped, serialized to a JSON string when structured."""
+        if self._without_meta is Message._UNSET:
+            if isinstance(self.content, dict):
+                content = self.content.copy()
+                if "tool_execution" in content:
+                    tool_execution = content["tool_execution"].copy()
+                    tool_execution.pop("arguments", None)
+                    content["tool_execution"] = tool_execution
+                self._without_meta = json.dumps(content)
+            else:
+                self._without_meta = self.source
+        return self._without_meta
+
+
+class MessageFrame(dict):
+    """A message dict yielded by the response processor.
+
+    `content` and `metadata` are JSON strings for clients, while the parsed
+    values they were rendered from stay available to in-process consumers
+    through get_frame_content and get_frame_metadata.
+    """
+
+    __slots__ = ('parsed_content', 'parsed_metadata')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.parsed_content = None
+        self.parsed_metadata = None
+
+    @classmethod
+    def create(cls, fields: Dict[str, Any]) -> "MessageFrame":
+        """Build a frame from message fields, rendering structured content and metadata to JSON."""
+        frame = cls(fields)
+        for key in ('content', 'metadata'):
+            value = frame.get(key)
+            if key in frame and not isinstance(value, str):
+                frame[key] = json.dumps(value)
+                setattr(frame, f"parsed_{key}", value)
+        return frame
+
+
+def frame_message(message_object: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Format a saved message object for yielding, keeping its parsed content and metadata."""
+    if not message_object:
+        return message_object
+    return MessageFrame.create(message_object)
+
+
+def _parse(value: Any) -> Any:
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except (json.JSONDecodeError, TypeError):
+            return value
+    return value
+
+
+def get_frame_content(chunk: Dict[str, Any]) -> Any:
+    """Get a yielded message's parsed content without re-parsing frames built in-process."""
+    if isinstance(chunk, MessageFrame) and chunk.parsed_content is not None:
+        return chunk.parsed_content
+    return _parse(chunk.get('content'))
+
+
+def get_frame_metadata(chunk: Dict[str, Any]) -> Any:
+    """Get a yielded message's parsed metadata without re-parsing frames built in-process."""
+    if isinstance(chunk, MessageFrame) and chunk.parsed_metadata is not None:
+        return chunk.parsed_metadata
+    return _parse(chunk.get('metadata', {}))
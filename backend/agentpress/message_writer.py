@@ -0,0 +1,196 @@
+"""
+Write-behind message persistence for AgentPress.
+
+This module batches message inserts on the hot streaming path:
+- Message IDs and timestamps are assigned client-side so callers get the
+  full message object immediately
+- Rows are buffered per thread and inserted in order with one round-trip
+- Buffers flush when they reach a size limit, after a time window, or on demand
+- Rows are reported to an on_written callback only once they are stored
+"""
+
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from utils.logger import logger
+
+DEFAULT_MAX_BATCH_SIZE = 20
+DEFAULT_FLUSH_INTERVAL = 0.2  # seconds
+
+
+class MessageWriter:
+    """Buffers message rows per thread and inserts them in batches.
+
+    Attributes:
+        max_batch_size: Number of buffered rows for a thread that triggers a flush
+        flush_interval: Seconds to wait before flushing a non-full buffer
+        stats: Counters for queued rows, batches and failed rows
+    """
+
+    def __init__(
+        self,
+        insert_batch: Callable[[List[Dict[str, Any]]], Awaitable[Any]],
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        on_written: Optional[Callable[[str, List[Dict[str, Any]]], Awaitable[Any]]] = None
+    ):
+        """Initialize the writer.
+
+        Args:
+            insert_batch: Coroutine that inserts a list of rows in one round-trip
+            max_batch_size: Buffered rows per thread that trigger an immediate flush
+            flush_interval: Maximum seconds a row waits in the buffer
+            on_written: Coroutine called with a thread ID and the rows of it that were stored
+        """
+        self.insert_batch = insert_batch
+        self.on_written = on_written
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        self._buffers: Dict[str, List[Dict[str, Any]]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._timer: Optional[asyncio.Task] = None
+        self._timer_flushing = False
+        self._last_created_at: Optional[datetime] = None
+        self.stats: Dict[str, int] = {"queued": 0, "batches": 0, "failed": 0}
+
+    def next_timestamp(self) -> str:
+        """Return a strictly increasing UTC timestamp so batch order survives ORDER BY created_at.
+
+        Rows inserted directly should be stamped here too, so every message of a
+        thread is ordered by the same clock.
+        """
+        now = datetime.now(timezone.utc)
+        if self._last_created_at and now <= self._last_created_at:
+            now = self._last_created_at + timedelta(microseconds=1)
+        self._last_created_at = now
+        return now.isoformat()
+
+    def observe_timestamp(self, created_at: Optional[str]):
+        """Never hand out timestamps at or before a created_at already stored for the thread.
+
+        Rows written elsewhere (e.g. user prompts inserted by the API) are stamped
+        by the database clock; raising the floor to the newest one seen keeps
+        replies after them even if this process's clock lags behind.
+        """
+        if not created_at:
+            return
+        try:
+            observed = datetime.fromisoformat(created_at)
+        except ValueError:
+            logger.warning(f"Ignoring unparseable created_at {created_at!r}")
+            return
+        if observed.tzinfo is None:
+            observed = observed.replace(tzinfo=timezone.utc)
+        if self._last_created_at is None or observed > self._last_created_at:
+            self._last_created_at = observed
+
+    async def add(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """Queue a message row and return it as it will be stored.
+
+        Args:
+            row: Column values for the `messages` table; must include thread_id
+
+        Returns:
+            The row with message_id, created_at and updated_at filled in
+        """
+        thread_id = row['thread_id']
+        now = self.next_timestamp()
+        message = {
+            'message_id': str(uuid.uuid4()),
+            'created_at': now,
+            'updated_at': now,
+            **row
+        }
+
+        buffer = self._buffers.setdefault(thread_id, [])
+        buffer.append(message)
+        self.stats["queued"] += 1
+
+        if len(buffer) >= self.max_batch_size:
+            await self.flush(thread_id)
+        else:
+            self._schedule_flush()
+        return message
+
+    def pending(self, thread_id: str) -> int:
+        """Number of rows waiting to be written for a thread."""
+        return len(self._buffers.get(thread_id, []))
+
+    async def flush(self, thread_id: Optional[str] = None):
+        """Write buffered rows for one thread, or for every thread if none is given."""
+        thread_ids = [thread_id] if thread_id else list(self._buffers.keys())
+        for tid in thread_ids:
+            lock = self._locks.setdefault(tid, asyncio.Lock())
+            async with lock:
+                rows = self._buffers.pop(tid, None)
+                if rows:
+                    await self._write(tid, rows)
+
+    async def close(self):
+        """Stop the flush timer and write everything still buffered.
+
+        A timer that is still waiting is cancelled; one that is already writing
+        is awaited, since the rows it took from the buffer are only in its hands.
+        """
+        timer, self._timer = self._timer, None
+        if timer and not timer.done():
+            if not self._timer_flushing:
+                timer.cancel()
+            await asyncio.gather(timer, return_exceptions=True)
+        await self.flush()
+
+    def _schedule_flush(self):
+        """Start the time-window flush if one is not already pending."""
+        if self._timer and not self._timer.done():
+            return
+        try:
+            self._timer = asyncio.get_running_loop().create_task(self._flush_after_interval())
+        except RuntimeError:
+            # No running loop (e.g. during shutdown) - rows are written on the next explicit flush
+            self._timer = None
+
+    async def _flush_after_interval(self):
+        try:
+            await asyncio.sleep(self.flush_interval)
+        except asyncio.CancelledError:
+            return
+        self._timer_flushing = True
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Error in timed message flush: {str(e)}", exc_info=True)
+        finally:
+            self._timer_flushing = False
+
+    async def _write(self, thread_id: str, rows: List[Dict[str, Any]]):
+        """Insert rows in one batch, falling back to row-by-row inserts on failure."""
+        try:
+            await self.insert_batch(rows)
+            self.stats["batches"] += 1
+            logger.debug(f"Flushed {len(rows)} messages for thread {thread_id}")
+            await self._notify_written(thread_id, rows)
+            return
+        except Exception as e:
+            logger.error(f"Batched insert of {len(rows)} messages failed for thread {thread_id}: {str(e)}", exc_info=True)
+
+        written = []
+        for row in rows:
+            try:
+                await self.insert_batch([row])
+                self.stats["batches"] += 1
+                written.append(row)
+            except Exception as e:
+                self.stats["failed"] += 1
+                logger.error(f"Failed to insert message {row.get('message_id')} for thread {thread_id}: {str(e)}", exc_info=True)
+        if written:
+            await self._notify_written(thread_id, written)
+
+    async def _notify_written(self, thread_id: str, rows: List[Dict[str, Any]]):
+        if not self.on_written:
+            return
+        try:
+            await self.on_written(thread_id, rows)
+        except Exception as e:
+            logger.warning(f"on_written callback failed for thread {thread_id}: {str(e)}")
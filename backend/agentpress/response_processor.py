@@ -11,21 +11,28 @@ This module handles the processing of LLM responses, including:
 import json
 import re
 import uuid
+import time
 import asyncio
+import inspect
 from datetime import datetime, timezone
 from typing import List, Dict, Any, Optional, AsyncGenerator, Tuple, Union, Callable, Literal
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from utils.logger import logger
-from agentpress.tool import ToolResult
+from agentpress.tool import ToolResult, ToolProgress
 from agentpress.tool_registry import ToolRegistry
 from agentpress.xml_tool_parser import XMLToolParser
+from agentpress.xml_stream_scanner import XMLStreamScanner
+from agentpress.tool_scheduler import ToolScheduler
+from agentpress.tool_result_cache import ToolResultCache
 from langfuse.client import StatefulTraceClient
 from services.langfuse import langfuse
+from agentpress.message import MessageFrame, frame_message
 from utils.json_helpers import (
     ensure_dict, ensure_list, safe_json_parse, 
-    to_json_string, format_for_yield
+    to_json_string
 )
 from litellm.utils import token_counter
+from utils.config import config as app_config
 
 # Type alias for XML result adding strategy
 XmlAddingStrategy = Literal["user_message", "assistant_message", "inline_edit"]
@@ -61,6 +68,8 @@ class ProcessorConfig:
         tool_execution_strategy: How to execute multiple tools ("sequential" or "parallel")
         xml_adding_strategy: How to add XML tool results to the conversation
         max_xml_tool_calls: Maximum number of XML tool calls to process (0 = no limit)
+        chunk_coalesce_ms: For streaming, merge content deltas for up to this many milliseconds per yielded chunk (0 = no time limit)
+        chunk_coalesce_bytes: For streaming, yield merged content once it reaches this many UTF-8 bytes (0 = no size limit)
     """
 
     xml_tool_calling: bool = True  
@@ -71,6 +80,8 @@ class ProcessorConfig:
     tool_execution_strategy: ToolExecutionStrategy = "sequential"
     xml_adding_strategy: XmlAddingStrategy = "assistant_message"
     max_xml_tool_calls: int = 0  # 0 means no limit
+    chunk_coalesce_ms: int = 0  # both 0 means one chunk per delta
+    chunk_coalesce_bytes: int = 0
     
     def __post_init__(self):
         """Validate configuration after initialization."""
@@ -83,10 +94,57 @@ class ProcessorConfig:
         if self.max_xml_tool_calls < 0:
             raise ValueError("max_xml_tool_calls must be a non-negative integer (0 = no limit)")
 
+        if self.chunk_coalesce_ms < 0 or self.chunk_coalesce_bytes < 0:
+            raise ValueError("chunk_coalesce_ms and chunk_coalesce_bytes must be non-negative integers (0 = no limit)")
+
+@dataclass
+class ContentChunkBuffer:
+    """Merges consecutive streamed content deltas into fewer yielded chunks.
+
+    With both limits at 0 every delta is yielded on its own. Otherwise buffered
+    content is yielded once it is max_ms old or max_bytes large, and whenever
+    another message has to be yielded after it. The age limit also applies
+    while the stream is idle; see ResponseProcessor._iterate_with_deadlines.
+    """
+    max_ms: int = 0
+    max_bytes: int = 0
+    parts: List[str] = field(default_factory=list)
+    size: int = 0
+    started: Optional[float] = None
+
+    def add(self, text: str) -> bool:
+        """Buffer a delta and return whether the buffered content should be yielded now."""
+        self.parts.append(text)
+        if not self.max_ms and not self.max_bytes:
+            return True
+        if self.started is None:
+            self.started = time.monotonic()
+        if self.max_bytes:
+            self.size += len(text.encode('utf-8'))
+            if self.size >= self.max_bytes:
+                return True
+        return bool(self.max_ms) and (time.monotonic() - self.started) * 1000 >= self.max_ms
+
+    def seconds_until_due(self) -> Optional[float]:
+        """Seconds until the buffered content reaches max_ms, or None if nothing is waiting on a deadline."""
+        if not self.max_ms or self.started is None or not self.parts:
+            return None
+        return max(self.max_ms / 1000 - (time.monotonic() - self.started), 0)
+
+    def take(self) -> Optional[str]:
+        """Return the buffered content and reset the buffer, or None if it is empty."""
+        if not self.parts:
+            return None
+        content = "".join(self.parts)
+        self.parts = []
+        self.size = 0
+        self.started = None
+        return content
+
 class ResponseProcessor:
     """Processes LLM responses, extracting and executing tool calls."""
     
-    def __init__(self, tool_registry: ToolRegistry, add_message_callback: Callable, trace: Optional[StatefulTraceClient] = None, is_agent_builder: bool = False, target_agent_id: Optional[str] = None, agent_config: Optional[dict] = None):
+    def __init__(self, tool_registry: ToolRegistry, add_message_callback: Callable, trace: Optional[StatefulTraceClient] = None, is_agent_builder: bool = False, target_agent_id: Optional[str] = None, agent_config: Optional[dict] = None, flush_messages_callback: Optional[Callable] = None, stop_event: Optional[asyncio.Event] = None):
         """Initialize the ResponseProcessor.
         
         Args:
@@ -94,15 +152,35 @@ class ResponseProcessor:
             add_message_callback: Callback function to add messages to the thread.
                 MUST return the full saved message object (dict) or None.
             agent_config: Optional agent configuration with version information
+            flush_messages_callback: Optional callback that writes out messages queued
+                by add_message_callback; awaited with the thread_id at the end of each run.
+            stop_event: Optional event set when the run is stopped; scheduled tool calls are then cancelled
         """
         self.tool_registry = tool_registry
         self.add_message = add_message_callback
+        self.flush_messages = flush_messages_callback
         self.trace = trace or langfuse.trace(name="anonymous:response_processor")
         # Initialize the XML parser
         self.xml_parser = XMLToolParser()
         self.is_agent_builder = is_agent_builder
         self.target_agent_id = target_agent_id
         self.agent_config = agent_config
+        self.tool_scheduler = ToolScheduler(
+            tool_registry=tool_registry,
+            execute=self._execute_tool,
+            default_concurrency=app_config.TOOL_DEFAULT_CONCURRENCY,
+            default_timeout=app_config.TOOL_DEFAULT_TIMEOUT_SECONDS,
+            stop_event=stop_event
+        )
+        self.tool_result_cache = ToolResultCache(
+            tool_registry=tool_registry,
+            enabled=app_config.TOOL_RESULT_CACHE_ENABLED,
+            max_bytes=app_config.TOOL_RESULT_CACHE_MAX_BYTES
+        )
+        # Progress of async-generator tools, set while a streaming run forwards it to the client
+        self.tool_progress: Optional[asyncio.Queue] = None
+        # Outcomes of the tools of the current run; saved as one summary row instead of per-tool status rows
+        self.tool_run_outcomes: List[Dict[str, Any]] = []
 
     async def _yield_message(self, message_obj: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
         """Helper to yield a message with proper formatting.
@@ -110,9 +188,19 @@ class ResponseProcessor:
         Ensures that content and metadata are JSON strings for client compatibility.
         """
         if message_obj:
-            return format_for_yield(message_obj)
+            return frame_message(message_obj)
         return None
 
+    async def _flush_messages(self, thread_id: str):
+        """Write out any messages still queued for the thread."""
+        if not self.flush_messages:
+            return
+        try:
+            await self.flush_messages(thread_id)
+        except Exception as e:
+            logger.error(f"Error flushing queued messages for thread {thread_id}: {str(e)}", exc_info=True)
+            self.trace.event(name="error_flushing_queued_messages", level="ERROR", status_message=(f"Error flushing queued messages for thread {thread_id}: {str(e)}"))
+
     async def _add_message_with_agent_info(
         self,
         thread_id: str,
@@ -169,8 +257,12 @@ class ResponseProcessor:
         continuous_state = continuous_state or {}
         accumulated_content = continuous_state.get('accumulated_content', "")
         tool_calls_buffer = {}
-        current_xml_content = accumulated_content   # equal to accumulated_content if auto-continuing, else blank
+        # Incremental scanner over the XML content; seeded with accumulated_content if auto-continuing, else blank
+        xml_scanner = self._create_xml_scanner(initial=accumulated_content)
         xml_chunks_buffer = []
+        # Content deltas not yet yielded, merged according to the coalescing settings
+        content_chunks = ContentChunkBuffer(config.chunk_coalesce_ms, config.chunk_coalesce_bytes)
+        self.tool_progress = asyncio.Queue()
         pending_tool_executions = []
         yielded_tool_indices = set() # Stores indices of tools whose *status* has been yielded
         tool_index = 0
@@ -207,24 +299,33 @@ class ResponseProcessor:
         try:
             # --- Save and Yield Start Events (only if not auto-continuing) ---
             if auto_continue_count == 0:
+                self.tool_run_outcomes = []
                 start_content = {"status_type": "thread_run_start", "thread_run_id": thread_run_id}
                 start_msg_obj = await self.add_message(
                     thread_id=thread_id, type="status", content=start_content, 
                     is_llm_message=False, metadata={"thread_run_id": thread_run_id}
                 )
-                if start_msg_obj: yield format_for_yield(start_msg_obj)
+                if start_msg_obj: yield frame_message(start_msg_obj)
 
                 assist_start_content = {"status_type": "assistant_response_start"}
                 assist_start_msg_obj = await self.add_message(
                     thread_id=thread_id, type="status", content=assist_start_content, 
                     is_llm_message=False, metadata={"thread_run_id": thread_run_id}
                 )
-                if assist_start_msg_obj: yield format_for_yield(assist_start_msg_obj)
+                if assist_start_msg_obj: yield frame_message(assist_start_msg_obj)
             # --- End Start Events ---
 
             __sequence = continuous_state.get('sequence', 0)    # get the sequence from the previous auto-continue cycle
 
-            async for chunk in llm_response:
+            async for chunk in self._iterate_with_deadlines(llm_response, content_chunks):
+                if chunk is None:
+                    # The stream went quiet while content was buffered; yield it within the coalescing window
+                    pending_content = content_chunks.take()
+                    if pending_content:
+                        yield self._create_content_chunk(thread_id, thread_run_id, __sequence, pending_content)
+                        __sequence += 1
+                    continue
+
                 # Extract streaming metadata from chunks
                 current_time = datetime.now(timezone.utc).timestamp()
                 if streaming_metadata["first_chunk_time"] is None:
@@ -244,6 +345,15 @@ class ResponseProcessor:
                         streaming_metadata["usage"]["completion_tokens"] = chunk.usage.completion_tokens
                     if hasattr(chunk.usage, 'total_tokens') and chunk.usage.total_tokens is not None:
                         streaming_metadata["usage"]["total_tokens"] = chunk.usage.total_tokens
+                    # Prompt cache usage (Anthropic reports both, OpenAI-style providers only cached_tokens)
+                    cache_read_tokens = getattr(chunk.usage, 'cache_read_input_tokens', None)
+                    if cache_read_tokens is None and getattr(chunk.usage, 'prompt_tokens_details', None):
+                        cache_read_tokens = getattr(chunk.usage.prompt_tokens_details, 'cached_tokens', None)
+                    if cache_read_tokens is not None:
+                        streaming_metadata["usage"]["cache_read_input_tokens"] = cache_read_tokens
+                    cache_creation_tokens = getattr(chunk.usage, 'cache_creation_input_tokens', None)
+                    if cache_creation_tokens is not None:
+                        streaming_metadata["usage"]["cache_creation_input_tokens"] = cache_creation_tokens
 
                 if hasattr(chunk, 'choices') and chunk.choices and hasattr(chunk.choices[0], 'finish_reason') and chunk.choices[0].finish_reason:
                     finish_reason = chunk.choices[0].finish_reason
@@ -266,29 +376,20 @@ class ResponseProcessor:
                         chunk_content = delta.content
                         # print(chunk_content, end='', flush=True)
                         accumulated_content += chunk_content
-                        current_xml_content += chunk_content
 
                         if not (config.max_xml_tool_calls > 0 and xml_tool_call_count >= config.max_xml_tool_calls):
-                            # Yield ONLY content chunk (don't save)
-                            now_chunk = datetime.now(timezone.utc).isoformat()
-                            yield {
-                                "sequence": __sequence,
-                                "message_id": None, "thread_id": thread_id, "type": "assistant",
-                                "is_llm_message": True,
-                                "content": to_json_string({"role": "assistant", "content": chunk_content}),
-                                "metadata": to_json_string({"stream_status": "chunk", "thread_run_id": thread_run_id}),
-                                "created_at": now_chunk, "updated_at": now_chunk
-                            }
-                            __sequence += 1
+                            # Yield ONLY content chunk (don't save), merged with earlier deltas if coalescing
+                            if content_chunks.add(chunk_content):
+                                yield self._create_content_chunk(thread_id, thread_run_id, __sequence, content_chunks.take())
+                                __sequence += 1
                         else:
                             logger.info("XML tool call limit reached - not yielding more content chunks")
                             self.trace.event(name="xml_tool_call_limit_reached", level="DEFAULT", status_message=(f"XML tool call limit reached - not yielding more content chunks"))
 
                         # --- Process XML Tool Calls (if enabled and limit not reached) ---
                         if config.xml_tool_calling and not (config.max_xml_tool_calls > 0 and xml_tool_call_count >= config.max_xml_tool_calls):
-                            xml_chunks = self._extract_xml_chunks(current_xml_content)
+                            xml_chunks = xml_scanner.feed(chunk_content)
                             for xml_chunk in xml_chunks:
-                                current_xml_content = current_xml_content.replace(xml_chunk, "", 1)
                                 xml_chunks_buffer.append(xml_chunk)
                                 result = self._parse_xml_tool_call(xml_chunk)
                                 if result:
@@ -300,12 +401,18 @@ class ResponseProcessor:
                                     )
 
                                     if config.execute_tools and config.execute_on_stream:
-                                        # Save and Yield tool_started status
-                                        started_msg_obj = await self._yield_and_save_tool_started(context, thread_id, thread_run_id)
-                                        if started_msg_obj: yield format_for_yield(started_msg_obj)
+                                        # Content leading up to the tool call goes out before its status
+                                        pending_content = content_chunks.take()
+                                        if pending_content:
+                                            yield self._create_content_chunk(thread_id, thread_run_id, __sequence, pending_content)
+                                            __sequence += 1
+
+                                        # Yield tool_started status (ephemeral, not saved)
+                                        started_msg_obj = self._create_tool_started_status(context, thread_id, thread_run_id)
+                                        if started_msg_obj: yield frame_message(started_msg_obj)
                                         yielded_tool_indices.add(tool_index) # Mark status as yielded
 
-                                        execution_task = asyncio.create_task(self._execute_tool(tool_call))
+                                        execution_task = self.tool_scheduler.submit(tool_call)
                                         pending_tool_executions.append({
                                             "task": execution_task, "tool_call": tool_call,
                                             "tool_index": tool_index, "context": context
@@ -319,6 +426,11 @@ class ResponseProcessor:
 
                     # --- Process Native Tool Call Chunks ---
                     if config.native_tool_calling and delta and hasattr(delta, 'tool_calls') and delta.tool_calls:
+                        pending_content = content_chunks.take()
+                        if pending_content:
+                            yield self._create_content_chunk(thread_id, thread_run_id, __sequence, pending_content)
+                            __sequence += 1
+
                         for tool_call_chunk in delta.tool_calls:
                             # Yield Native Tool Call Chunk (transient status, not saved)
                             # ... (safe extraction logic for tool_call_data_chunk) ...
@@ -335,12 +447,12 @@ class ResponseProcessor:
 
 
                             now_tool_chunk = datetime.now(timezone.utc).isoformat()
-                            yield {
+                            yield MessageFrame.create({
                                 "message_id": None, "thread_id": thread_id, "type": "status", "is_llm_message": True,
-                                "content": to_json_string({"role": "assistant", "status_type": "tool_call_chunk", "tool_call_chunk": tool_call_data_chunk}),
-                                "metadata": to_json_string({"thread_run_id": thread_run_id}),
+                                "content": {"role": "assistant", "status_type": "tool_call_chunk", "tool_call_chunk": tool_call_data_chunk},
+                                "metadata": {"thread_run_id": thread_run_id},
                                 "created_at": now_tool_chunk, "updated_at": now_tool_chunk
-                            }
+                            })
 
                             # --- Buffer and Execute Complete Native Tool Calls ---
                             if not hasattr(tool_call_chunk, 'function'): continue
@@ -370,18 +482,27 @@ class ResponseProcessor:
                                     tool_call_data, tool_index, current_assistant_id
                                 )
 
-                                # Save and Yield tool_started status
-                                started_msg_obj = await self._yield_and_save_tool_started(context, thread_id, thread_run_id)
-                                if started_msg_obj: yield format_for_yield(started_msg_obj)
+                                # Yield tool_started status (ephemeral, not saved)
+                                started_msg_obj = self._create_tool_started_status(context, thread_id, thread_run_id)
+                                if started_msg_obj: yield frame_message(started_msg_obj)
                                 yielded_tool_indices.add(tool_index) # Mark status as yielded
 
-                                execution_task = asyncio.create_task(self._execute_tool(tool_call_data))
+                                execution_task = self.tool_scheduler.submit(tool_call_data)
                                 pending_tool_executions.append({
                                     "task": execution_task, "tool_call": tool_call_data,
                                     "tool_index": tool_index, "context": context
                                 })
                                 tool_index += 1
 
+                # Forward progress of tools running during the stream
+                if not self.tool_progress.empty():
+                    pending_content = content_chunks.take()
+                    if pending_content:
+                        yield self._create_content_chunk(thread_id, thread_run_id, __sequence, pending_content)
+                        __sequence += 1
+                    for progress_frame in self._drain_tool_progress(thread_id, thread_run_id, pending_tool_executions):
+                        yield progress_frame
+
                 if finish_reason == "xml_tool_limit_reached":
                     logger.info("Stopping stream processing after loop due to XML tool call limit")
                     self.trace.event(name="stopping_stream_processing_after_loop_due_to_xml_tool_call_limit", level="DEFAULT", status_message=(f"Stopping stream processing after loop due to XML tool call limit"))
@@ -389,6 +510,12 @@ class ResponseProcessor:
 
             # print() # Add a final newline after the streaming loop finishes
 
+            # Yield content still held back by coalescing
+            pending_content = content_chunks.take()
+            if pending_content:
+                yield self._create_content_chunk(thread_id, thread_run_id, __sequence, pending_content)
+                __sequence += 1
+
             # --- After Streaming Loop ---
             
             if (
@@ -423,14 +550,22 @@ class ResponseProcessor:
                     self.trace.event(name="failed_to_calculate_usage", level="WARNING", status_message=(f"Failed to calculate usage: {str(e)}"))
 
 
+            if "cache_read_input_tokens" in streaming_metadata["usage"] or "cache_creation_input_tokens" in streaming_metadata["usage"]:
+                cache_read = streaming_metadata["usage"].get("cache_read_input_tokens") or 0
+                cache_creation = streaming_metadata["usage"].get("cache_creation_input_tokens") or 0
+                prompt_tokens = streaming_metadata["usage"]["prompt_tokens"]
+                logger.info(f"Prompt cache: {cache_read} read, {cache_creation} written, {prompt_tokens} prompt tokens")
+                self.trace.event(name="prompt_cache_usage", level="DEFAULT", status_message=(f"Prompt cache: {cache_read} read, {cache_creation} written, {prompt_tokens} prompt tokens"))
+
             # Wait for pending tool executions from streaming phase
             tool_results_buffer = [] # Stores (tool_call, result, tool_index, context)
             if pending_tool_executions:
                 logger.info(f"Waiting for {len(pending_tool_executions)} pending streamed tool executions")
                 self.trace.event(name="waiting_for_pending_streamed_tool_executions", level="DEFAULT", status_message=(f"Waiting for {len(pending_tool_executions)} pending streamed tool executions"))
-                # ... (asyncio.wait logic) ...
+                # Wait for all tasks, forwarding their progress as it arrives
                 pending_tasks = [execution["task"] for execution in pending_tool_executions]
-                done, _ = await asyncio.wait(pending_tasks)
+                async for progress_frame in self._wait_for_tools(pending_tasks, thread_id, thread_run_id, pending_tool_executions):
+                    yield progress_frame
 
                 for execution in pending_tool_executions:
                     tool_idx = execution.get("tool_index", -1)
@@ -459,9 +594,9 @@ class ResponseProcessor:
                              logger.error(f"Error getting result for pending tool execution {tool_idx}: {str(e)}")
                              self.trace.event(name="error_getting_result_for_pending_tool_execution", level="ERROR", status_message=(f"Error getting result for pending tool execution {tool_idx}: {str(e)}"))
                              context.error = e
-                             # Save and Yield tool error status message (even if started was yielded)
-                             error_msg_obj = await self._yield_and_save_tool_error(context, thread_id, thread_run_id)
-                             if error_msg_obj: yield format_for_yield(error_msg_obj)
+                             # Yield tool error status (even if started was yielded)
+                             error_msg_obj = self._create_tool_error_status(context, thread_id, thread_run_id)
+                             if error_msg_obj: yield frame_message(error_msg_obj)
                          continue # Skip further status yielding for this tool index
 
                     # If status wasn't yielded before (shouldn't happen with current logic), yield it now
@@ -477,19 +612,19 @@ class ResponseProcessor:
                                 self.trace.event(name="terminating_tool_completed_during_streaming", level="DEFAULT", status_message=(f"Terminating tool '{tool_name}' completed during streaming. Setting termination flag."))
                                 agent_should_terminate = True
                                 
-                            # Save and Yield tool completed/failed status
-                            completed_msg_obj = await self._yield_and_save_tool_completed(
+                            # Yield tool completed/failed status (ephemeral, not saved)
+                            completed_msg_obj = self._create_tool_completed_status(
                                 context, None, thread_id, thread_run_id
                             )
-                            if completed_msg_obj: yield format_for_yield(completed_msg_obj)
+                            if completed_msg_obj: yield frame_message(completed_msg_obj)
                             yielded_tool_indices.add(tool_idx)
                     except Exception as e:
                         logger.error(f"Error getting result/yielding status for pending tool execution {tool_idx}: {str(e)}")
                         self.trace.event(name="error_getting_result_yielding_status_for_pending_tool_execution", level="ERROR", status_message=(f"Error getting result/yielding status for pending tool execution {tool_idx}: {str(e)}"))
                         context.error = e
-                        # Save and Yield tool error status
-                        error_msg_obj = await self._yield_and_save_tool_error(context, thread_id, thread_run_id)
-                        if error_msg_obj: yield format_for_yield(error_msg_obj)
+                        # Yield tool error status
+                        error_msg_obj = self._create_tool_error_status(context, thread_id, thread_run_id)
+                        if error_msg_obj: yield frame_message(error_msg_obj)
                         yielded_tool_indices.add(tool_idx)
 
 
@@ -500,7 +635,7 @@ class ResponseProcessor:
                     thread_id=thread_id, type="status", content=finish_content, 
                     is_llm_message=False, metadata={"thread_run_id": thread_run_id}
                 )
-                if finish_msg_obj: yield format_for_yield(finish_msg_obj)
+                if finish_msg_obj: yield frame_message(finish_msg_obj)
                 logger.info(f"Stream finished with reason: xml_tool_limit_reached after {xml_tool_call_count} XML tool calls")
                 self.trace.event(name="stream_finished_with_reason_xml_tool_limit_reached_after_xml_tool_calls", level="DEFAULT", status_message=(f"Stream finished with reason: xml_tool_limit_reached after {xml_tool_call_count} XML tool calls"))
 
@@ -547,7 +682,7 @@ class ResponseProcessor:
                     # Format the message for yielding
                     yield_message = last_assistant_message_object.copy()
                     yield_message['metadata'] = yield_metadata
-                    yield format_for_yield(yield_message)
+                    yield frame_message(yield_message)
                 else:
                     logger.error(f"Failed to save final assistant message for thread {thread_id}")
                     self.trace.event(name="failed_to_save_final_assistant_message_for_thread", level="ERROR", status_message=(f"Failed to save final assistant message for thread {thread_id}"))
@@ -557,7 +692,7 @@ class ResponseProcessor:
                         thread_id=thread_id, type="status", content=err_content, 
                         is_llm_message=False, metadata={"thread_run_id": thread_run_id}
                     )
-                    if err_msg_obj: yield format_for_yield(err_msg_obj)
+                    if err_msg_obj: yield frame_message(err_msg_obj)
 
             # --- Process All Tool Results Now ---
             if config.execute_tools:
@@ -574,9 +709,7 @@ class ResponseProcessor:
                  # Gather XML tool calls from buffer (up to limit)
                 parsed_xml_data = []
                 if config.xml_tool_calling:
-                    # Reparse remaining content just in case (should be empty if processed correctly)
-                    xml_chunks = self._extract_xml_chunks(current_xml_content)
-                    xml_chunks_buffer.extend(xml_chunks)
+                    # The scanner emits blocks as soon as they close, so no rescan of the content is needed
                     # Process only chunks not already handled in the stream loop
                     remaining_limit = config.max_xml_tool_calls - xml_tool_call_count if config.max_xml_tool_calls > 0 else len(xml_chunks_buffer)
                     xml_chunks_to_process = xml_chunks_buffer[:remaining_limit] # Ensure limit is respected
@@ -626,7 +759,10 @@ class ResponseProcessor:
                 elif final_tool_calls_to_process and not config.execute_on_stream:
                     logger.info(f"Executing {len(final_tool_calls_to_process)} tools ({config.tool_execution_strategy}) after stream")
                     self.trace.event(name="executing_tools_after_stream", level="DEFAULT", status_message=(f"Executing {len(final_tool_calls_to_process)} tools ({config.tool_execution_strategy}) after stream"))
-                    results_list = await self._execute_tools(final_tool_calls_to_process, config.tool_execution_strategy)
+                    execution_task = asyncio.create_task(self._execute_tools(final_tool_calls_to_process, config.tool_execution_strategy))
+                    async for progress_frame in self._wait_for_tools([execution_task], thread_id, thread_run_id, []):
+                        yield progress_frame
+                    results_list = execution_task.result()
                     current_tool_idx = 0
                     for tc, res in results_list:
                        # Map back using all_tool_data_map which has correct indices
@@ -656,8 +792,8 @@ class ResponseProcessor:
 
                         # Yield start status ONLY IF executing non-streamed (already yielded if streamed)
                         if not config.execute_on_stream and tool_idx not in yielded_tool_indices:
-                            started_msg_obj = await self._yield_and_save_tool_started(context, thread_id, thread_run_id)
-                            if started_msg_obj: yield format_for_yield(started_msg_obj)
+                            started_msg_obj = self._create_tool_started_status(context, thread_id, thread_run_id)
+                            if started_msg_obj: yield frame_message(started_msg_obj)
                             yielded_tool_indices.add(tool_idx) # Mark status yielded
 
                         # Save the tool result message to DB
@@ -667,18 +803,18 @@ class ResponseProcessor:
                         )
 
                         # Yield completed/failed status (linked to saved result ID if available)
-                        completed_msg_obj = await self._yield_and_save_tool_completed(
+                        completed_msg_obj = self._create_tool_completed_status(
                             context,
                             saved_tool_result_object['message_id'] if saved_tool_result_object else None,
                             thread_id, thread_run_id
                         )
-                        if completed_msg_obj: yield format_for_yield(completed_msg_obj)
+                        if completed_msg_obj: yield frame_message(completed_msg_obj)
                         # Don't add to yielded_tool_indices here, completion status is separate yield
 
                         # Yield the saved tool result object
                         if saved_tool_result_object:
                             tool_result_message_objects[tool_idx] = saved_tool_result_object
-                            yield format_for_yield(saved_tool_result_object)
+                            yield frame_message(saved_tool_result_object)
                         else:
                              logger.error(f"Failed to save tool result for index {tool_idx}, not yielding result message.")
                              self.trace.event(name="failed_to_save_tool_result_for_index", level="ERROR", status_message=(f"Failed to save tool result for index {tool_idx}, not yielding result message."))
@@ -691,7 +827,7 @@ class ResponseProcessor:
                     thread_id=thread_id, type="status", content=finish_content, 
                     is_llm_message=False, metadata={"thread_run_id": thread_run_id}
                 )
-                if finish_msg_obj: yield format_for_yield(finish_msg_obj)
+                if finish_msg_obj: yield frame_message(finish_msg_obj)
 
             # Check if agent should terminate after processing pending tools
             if agent_should_terminate:
@@ -707,7 +843,7 @@ class ResponseProcessor:
                     thread_id=thread_id, type="status", content=finish_content, 
                     is_llm_message=False, metadata={"thread_run_id": thread_run_id}
                 )
-                if finish_msg_obj: yield format_for_yield(finish_msg_obj)
+                if finish_msg_obj: yield frame_message(finish_msg_obj)
                 
                 # Save assistant_response_end BEFORE terminating
                 if last_assistant_message_object:
@@ -823,7 +959,7 @@ class ResponseProcessor:
                     thread_id=thread_id, type="status", content=err_content, 
                     is_llm_message=False, metadata={"thread_run_id": thread_run_id if 'thread_run_id' in locals() else None}
                 )
-                if err_msg_obj: yield format_for_yield(err_msg_obj) # Yield the saved error message
+                if err_msg_obj: yield frame_message(err_msg_obj) # Yield the saved error message
                 # Re-raise the same exception (not a new one) to ensure proper error propagation
                 logger.critical(f"Re-raising error to stop further processing: {str(e)}")
                 self.trace.event(name="re_raising_error_to_stop_further_processing", level="ERROR", status_message=(f"Re-raising error to stop further processing: {str(e)}"))
@@ -833,21 +969,38 @@ class ResponseProcessor:
             raise # Use bare 'raise' to preserve the original exception with its traceback
 
         finally:
+            # Don't leave streamed tool calls running if the consumer stopped early
+            for execution in pending_tool_executions:
+                if not execution["task"].done():
+                    execution["task"].cancel()
+            self.tool_progress = None
+
             # Update continuous state for potential auto-continue
             if should_auto_continue:
                 continuous_state['accumulated_content'] = accumulated_content
                 continuous_state['sequence'] = __sequence
                 
                 logger.info(f"Updated continuous state for auto-continue with {len(accumulated_content)} chars")
+                await self._flush_messages(thread_id)
             else:
+                tool_metrics = self.tool_scheduler.get_metrics()
+                if tool_metrics:
+                    self.trace.event(name="tool_scheduler_metrics", level="DEFAULT", status_message=(f"Tool scheduling for {len(tool_metrics)} functions"), metadata={"tools": tool_metrics})
+                if self.tool_result_cache.stats:
+                    logger.info(f"Tool result cache: {self.tool_result_cache.stats}")
+                    self.trace.event(name="tool_result_cache_stats", level="DEFAULT", status_message=(f"Tool result cache for {len(self.tool_result_cache.stats)} functions"), metadata={"tools": self.tool_result_cache.stats})
+
                 # Save and Yield the final thread_run_end status (only if not auto-continuing and finish_reason is not 'length')
                 try:
+                    await self._save_tool_run_summary(thread_id, thread_run_id if 'thread_run_id' in locals() else None)
                     end_content = {"status_type": "thread_run_end"}
                     end_msg_obj = await self.add_message(
                         thread_id=thread_id, type="status", content=end_content, 
                         is_llm_message=False, metadata={"thread_run_id": thread_run_id if 'thread_run_id' in locals() else None}
                     )
-                    if end_msg_obj: yield format_for_yield(end_msg_obj)
+                    # Flush before yielding so the run is persisted even if the consumer stops here
+                    await self._flush_messages(thread_id)
+                    if end_msg_obj: yield frame_message(end_msg_obj)
                 except Exception as final_e:
                     logger.error(f"Error in finally block: {str(final_e)}", exc_info=True)
                     self.trace.event(name="error_in_finally_block", level="ERROR", status_message=(f"Error in finally block: {str(final_e)}"))
@@ -881,6 +1034,7 @@ class ResponseProcessor:
         finish_reason = None
         native_tool_calls_for_message = []
 
+        self.tool_run_outcomes = []
         try:
             # Save and Yield thread_run_start status message
             start_content = {"status_type": "thread_run_start", "thread_run_id": thread_run_id}
@@ -888,7 +1042,7 @@ class ResponseProcessor:
                 thread_id=thread_id, type="status", content=start_content,
                 is_llm_message=False, metadata={"thread_run_id": thread_run_id}
             )
-            if start_msg_obj: yield format_for_yield(start_msg_obj)
+            if start_msg_obj: yield frame_message(start_msg_obj)
 
             # Extract finish_reason, content, tool calls
             if hasattr(llm_response, 'choices') and llm_response.choices:
@@ -949,7 +1103,7 @@ class ResponseProcessor:
                      thread_id=thread_id, type="status", content=err_content, 
                      is_llm_message=False, metadata={"thread_run_id": thread_run_id}
                  )
-                 if err_msg_obj: yield format_for_yield(err_msg_obj)
+                 if err_msg_obj: yield frame_message(err_msg_obj)
 
        # --- Execute Tools and Yield Results ---
             tool_calls_to_execute = [item['tool_call'] for item in all_tool_data]
@@ -970,8 +1124,8 @@ class ResponseProcessor:
                     context.result = result
 
                     # Save and Yield start status
-                    started_msg_obj = await self._yield_and_save_tool_started(context, thread_id, thread_run_id)
-                    if started_msg_obj: yield format_for_yield(started_msg_obj)
+                    started_msg_obj = self._create_tool_started_status(context, thread_id, thread_run_id)
+                    if started_msg_obj: yield frame_message(started_msg_obj)
 
                     # Save tool result
                     saved_tool_result_object = await self._add_tool_result(
@@ -980,17 +1134,17 @@ class ResponseProcessor:
                     )
 
                     # Save and Yield completed/failed status
-                    completed_msg_obj = await self._yield_and_save_tool_completed(
+                    completed_msg_obj = self._create_tool_completed_status(
                         context,
                         saved_tool_result_object['message_id'] if saved_tool_result_object else None,
                         thread_id, thread_run_id
                     )
-                    if completed_msg_obj: yield format_for_yield(completed_msg_obj)
+                    if completed_msg_obj: yield frame_message(completed_msg_obj)
 
                     # Yield the saved tool result object
                     if saved_tool_result_object:
                         tool_result_message_objects[tool_index] = saved_tool_result_object
-                        yield format_for_yield(saved_tool_result_object)
+                        yield frame_message(saved_tool_result_object)
                     else:
                          logger.error(f"Failed to save tool result for index {tool_index}")
                          self.trace.event(name="failed_to_save_tool_result_for_index", level="ERROR", status_message=(f"Failed to save tool result for index {tool_index}"))
@@ -1004,7 +1158,7 @@ class ResponseProcessor:
                     thread_id=thread_id, type="status", content=finish_content, 
                     is_llm_message=False, metadata={"thread_run_id": thread_run_id}
                 )
-                if finish_msg_obj: yield format_for_yield(finish_msg_obj)
+                if finish_msg_obj: yield frame_message(finish_msg_obj)
 
             # --- Save and Yield assistant_response_end ---
             if assistant_message_object: # Only save if assistant message was saved
@@ -1031,7 +1185,7 @@ class ResponseProcessor:
                  thread_id=thread_id, type="status", content=err_content, 
                  is_llm_message=False, metadata={"thread_run_id": thread_run_id if 'thread_run_id' in locals() else None}
              )
-             if err_msg_obj: yield format_for_yield(err_msg_obj)
+             if err_msg_obj: yield frame_message(err_msg_obj)
              
              # Re-raise the same exception (not a new one) to ensure proper error propagation
              logger.critical(f"Re-raising error to stop further processing: {str(e)}")
@@ -1039,110 +1193,77 @@ class ResponseProcessor:
              raise # Use bare 'raise' to preserve the original exception with its traceback
 
         finally:
+            await self._save_tool_run_summary(thread_id, thread_run_id if 'thread_run_id' in locals() else None)
              # Save and Yield the final thread_run_end status
             end_content = {"status_type": "thread_run_end"}
             end_msg_obj = await self.add_message(
                 thread_id=thread_id, type="status", content=end_content, 
                 is_llm_message=False, metadata={"thread_run_id": thread_run_id if 'thread_run_id' in locals() else None}
             )
-            if end_msg_obj: yield format_for_yield(end_msg_obj)
+            await self._flush_messages(thread_id)
+            if end_msg_obj: yield frame_message(end_msg_obj)
+
+
+    async def _iterate_with_deadlines(self, llm_response: AsyncGenerator, content_chunks: ContentChunkBuffer) -> AsyncGenerator[Any, None]:
+        """Iterate an LLM stream, yielding None whenever buffered content falls due before the next chunk.
 
+        The pending read is awaited with asyncio.wait rather than wait_for, so a
+        deadline never cancels it and no chunk is lost.
+        """
+        iterator = llm_response.__aiter__()
+        next_chunk: Optional[asyncio.Future] = None
+        try:
+            while True:
+                timeout = content_chunks.seconds_until_due()
+                if next_chunk is None and timeout is None:
+                    try:
+                        chunk = await iterator.__anext__()
+                    except StopAsyncIteration:
+                        return
+                    yield chunk
+                    continue
+
+                if next_chunk is None:
+                    next_chunk = asyncio.ensure_future(iterator.__anext__())
+                done, _ = await asyncio.wait({next_chunk}, timeout=timeout)
+                if not done:
+                    yield None
+                    continue
+                future, next_chunk = next_chunk, None
+                try:
+                    chunk = future.result()
+                except StopAsyncIteration:
+                    return
+                yield chunk
+        finally:
+            if next_chunk is not None and not next_chunk.done():
+                next_chunk.cancel()
+
+    def _create_content_chunk(self, thread_id: str, thread_run_id: str, sequence: int, content: str) -> MessageFrame:
+        """Create a transient assistant content chunk for yielding."""
+        now_chunk = datetime.now(timezone.utc).isoformat()
+        return MessageFrame.create({
+            "sequence": sequence,
+            "message_id": None, "thread_id": thread_id, "type": "assistant",
+            "is_llm_message": True,
+            "content": {"role": "assistant", "content": content},
+            "metadata": {"stream_status": "chunk", "thread_run_id": thread_run_id},
+            "created_at": now_chunk, "updated_at": now_chunk
+        })
+
+    def _create_xml_scanner(self, initial: str = "") -> XMLStreamScanner:
+        """Create an incremental XML scanner for the currently registered tools."""
+        return XMLStreamScanner(initial=initial, matcher=self.tool_registry.get_xml_tag_matcher())
 
     def _extract_xml_chunks(self, content: str) -> List[str]:
-        """Extract complete XML chunks using start and end pattern matching."""
-        chunks = []
-        pos = 0
-        
+        """Extract complete XML chunks from a complete piece of content."""
         try:
-            # First, look for new format <function_calls> blocks
-            start_pattern = '<function_calls>'
-            end_pattern = '</function_calls>'
-            
-            while pos < len(content):
-                # Find the next function_calls block
-                start_pos = content.find(start_pattern, pos)
-                if start_pos == -1:
-                    break
-                
-                # Find the matching end tag
-                end_pos = content.find(end_pattern, start_pos)
-                if end_pos == -1:
-                    break
-                
-                # Extract the complete block including tags
-                chunk_end = end_pos + len(end_pattern)
-                chunk = content[start_pos:chunk_end]
-                chunks.append(chunk)
-                
-                # Move position past this chunk
-                pos = chunk_end
-            
-            # If no new format found, fall back to old format for backwards compatibility
-            if not chunks:
-                pos = 0
-                while pos < len(content):
-                    # Find the next tool tag
-                    next_tag_start = -1
-                    current_tag = None
-                    
-                    # Find the earliest occurrence of any registered tool function name
-                    # Check for available function names
-                    available_functions = self.tool_registry.get_available_functions()
-                    for func_name in available_functions.keys():
-                        # Convert function name to potential tag name (underscore to dash)
-                        tag_name = func_name.replace('_', '-')
-                        start_pattern = f'<{tag_name}'
-                        tag_pos = content.find(start_pattern, pos)
-                        
-                        if tag_pos != -1 and (next_tag_start == -1 or tag_pos < next_tag_start):
-                            next_tag_start = tag_pos
-                            current_tag = tag_name
-                    
-                    if next_tag_start == -1 or not current_tag:
-                        break
-                    
-                    # Find the matching end tag
-                    end_pattern = f'</{current_tag}>'
-                    tag_stack = []
-                    chunk_start = next_tag_start
-                    current_pos = next_tag_start
-                    
-                    while current_pos < len(content):
-                        # Look for next start or end tag of the same type
-                        next_start = content.find(f'<{current_tag}', current_pos + 1)
-                        next_end = content.find(end_pattern, current_pos)
-                        
-                        if next_end == -1:  # No closing tag found
-                            break
-                        
-                        if next_start != -1 and next_start < next_end:
-                            # Found nested start tag
-                            tag_stack.append(next_start)
-                            current_pos = next_start + 1
-                        else:
-                            # Found end tag
-                            if not tag_stack:  # This is our matching end tag
-                                chunk_end = next_end + len(end_pattern)
-                                chunk = content[chunk_start:chunk_end]
-                                chunks.append(chunk)
-                                pos = chunk_end
-                                break
-                            else:
-                                # Pop nested tag
-                                tag_stack.pop()
-                                current_pos = next_end + 1
-                    
-                    if current_pos >= len(content):  # Reached end without finding closing tag
-                        break
-                    
-                    pos = max(pos + 1, current_pos)
-        
+            return self._create_xml_scanner().feed(content)
         except Exception as e:
             logger.error(f"Error extracting XML chunks: {e}")
             logger.error(f"Content was: {content}")
             self.trace.event(name="error_extracting_xml_chunks", level="ERROR", status_message=(f"Error extracting XML chunks: {e}"), metadata={"content": content})
-        
-        return chunks
+            return []
 
     def _parse_xml_tool_call(self, xml_chunk: str) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
         """Parse XML chunk into tool call format and return parsing details.
@@ -1232,18 +1353,26 @@ class ResponseProcessor:
                 except json.JSONDecodeError:
                     arguments = {"text": arguments}
             
-            # Get available functions from tool registry
-            available_functions = self.tool_registry.get_available_functions()
-            
             # Look up the function by name
-            tool_fn = available_functions.get(function_name)
+            tool_fn = self.tool_registry.get_function(function_name)
             if not tool_fn:
                 logger.error(f"Tool function '{function_name}' not found in registry")
                 span.end(status_message="tool_not_found", level="ERROR")
                 return ToolResult(success=False, output=f"Tool function '{function_name}' not found")
             
+            cached_result = await self.tool_result_cache.get(function_name, arguments)
+            if cached_result is not None:
+                logger.info(f"Tool result cache hit: {function_name}")
+                span.end(status_message="tool_result_cached", output=cached_result)
+                return cached_result
+
             logger.debug(f"Found tool function for '{function_name}', executing...")
-            result = await tool_fn(**arguments)
+            outcome = tool_fn(**arguments)
+            if inspect.isasyncgen(outcome):
+                result = await self._collect_tool_progress(tool_call, outcome)
+            else:
+                result = await outcome
+            await self.tool_result_cache.set(function_name, arguments, result)
             logger.info(f"Tool execution complete: {function_name} -> {result}")
             span.end(status_message="tool_executed", output=result)
             return result
@@ -1252,6 +1381,66 @@ class ResponseProcessor:
             span.end(status_message="tool_execution_error", output=f"Error executing tool: {str(e)}", level="ERROR")
             return ToolResult(success=False, output=f"Error executing tool: {str(e)}")
 
+    async def _collect_tool_progress(self, tool_call: Dict[str, Any], generator: AsyncGenerator) -> ToolResult:
+        """Run an async-generator tool function, forwarding its progress and returning its final result."""
+        result = None
+        try:
+            async for item in generator:
+                if isinstance(item, ToolProgress):
+                    if self.tool_progress is not None:
+                        self.tool_progress.put_nowait((tool_call, item))
+                else:
+                    result = item
+        finally:
+            await generator.aclose()
+
+        if result is None:
+            return ToolResult(success=False, output=f"Tool '{tool_call['function_name']}' finished without a result")
+        return result
+
+    def _drain_tool_progress(self, thread_id: str, thread_run_id: str, executions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Turn queued tool progress into transient status frames for yielding."""
+        frames = []
+        while self.tool_progress is not None and not self.tool_progress.empty():
+            tool_call, progress = self.tool_progress.get_nowait()
+            context = next((execution["context"] for execution in executions if execution["tool_call"] is tool_call), None)
+            frames.append(self._create_tool_progress_frame(tool_call, progress, context, thread_id, thread_run_id))
+        return frames
+
+    async def _wait_for_tools(self, tasks: List[asyncio.Task], thread_id: str, thread_run_id: str, executions: List[Dict[str, Any]]) -> AsyncGenerator[Dict[str, Any], None]:
+        """Wait for tool tasks to finish, yielding their progress frames as they arrive."""
+        pending = set(tasks)
+        while pending:
+            progress_getter = asyncio.ensure_future(self.tool_progress.get())
+            try:
+                done, _ = await asyncio.wait(pending | {progress_getter}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                if not progress_getter.done():
+                    progress_getter.cancel()
+            pending -= done
+            if progress_getter in done:
+                tool_call, progress = progress_getter.result()
+                context = next((execution["context"] for execution in executions if execution["tool_call"] is tool_call), None)
+                yield self._create_tool_progress_frame(tool_call, progress, context, thread_id, thread_run_id)
+            for progress_frame in self._drain_tool_progress(thread_id, thread_run_id, executions):
+                yield progress_frame
+
+    def _create_tool_progress_frame(self, tool_call: Dict[str, Any], progress: ToolProgress, context: Optional[ToolExecutionContext], thread_id: str, thread_run_id: str) -> MessageFrame:
+        """Create a transient tool progress status for yielding; it is never saved."""
+        now_progress = datetime.now(timezone.utc).isoformat()
+        return MessageFrame.create({
+            "message_id": None, "thread_id": thread_id, "type": "status", "is_llm_message": False,
+            "content": {
+                "role": "assistant", "status_type": "tool_progress",
+                "function_name": tool_call.get("function_name"), "xml_tag_name": tool_call.get("xml_tag_name"),
+                "tool_index": context.tool_index if context else None,
+                "tool_call_id": tool_call.get("id"),
+                "message": progress.message, "data": progress.data
+            },
+            "metadata": {"thread_run_id": thread_run_id},
+            "created_at": now_progress, "updated_at": now_progress
+        })
+
     async def _execute_tools(
         self, 
         tool_calls: List[Dict[str, Any]], 
@@ -1308,7 +1497,7 @@ class ResponseProcessor:
                 logger.debug(f"Executing tool {index+1}/{len(tool_calls)}: {tool_name}")
                 
                 try:
-                    result = await self._execute_tool(tool_call)
+                    result = await self.tool_scheduler.run(tool_call)
                     results.append((tool_call, result))
                     logger.debug(f"Completed tool {tool_name} with success={result.success}")
                     
@@ -1344,8 +1533,9 @@ class ResponseProcessor:
     async def _execute_tools_in_parallel(self, tool_calls: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], ToolResult]]:
         """Execute tool calls in parallel and return results.
         
-        This method executes all tool calls simultaneously using asyncio.gather, which
+        This method schedules all tool calls at once and gathers their results, which
         can significantly improve performance when executing multiple independent tools.
+        Concurrency is bounded by the limits the tool scheduler enforces.
         
         Args:
             tool_calls: List of tool calls to execute
@@ -1362,7 +1552,7 @@ class ResponseProcessor:
             self.trace.event(name="executing_tools_in_parallel", level="DEFAULT", status_message=(f"Executing {len(tool_calls)} tools in parallel: {tool_names}"))
             
             # Create tasks for all tool calls
-            tasks = [self._execute_tool(tool_call) for tool_call in tool_calls]
+            tasks = [self.tool_scheduler.submit(tool_call) for tool_call in tool_calls]
             
             # Execute all tasks concurrently with error handling
             results = await asyncio.gather(*tasks, return_exceptions=True)
@@ -1616,8 +1806,46 @@ class ResponseProcessor:
         
         return context
         
-    async def _yield_and_save_tool_started(self, context: ToolExecutionContext, thread_id: str, thread_run_id: str) -> Optional[Dict[str, Any]]:
-        """Formats, saves, and returns a tool started status message."""
+    def _create_status_frame(self, thread_id: str, thread_run_id: str, content: Dict[str, Any], metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """Create an ephemeral status message that is yielded to the run stream but never saved."""
+        now_status = datetime.now(timezone.utc).isoformat()
+        return {
+            "message_id": None, "thread_id": thread_id, "type": "status", "is_llm_message": False,
+            "content": content, "metadata": metadata,
+            "created_at": now_status, "updated_at": now_status
+        }
+
+    def _record_tool_outcome(self, context: ToolExecutionContext, status_type: str, tool_message_id: Optional[str] = None):
+        """Record a finished tool for the per-run summary saved instead of individual status rows."""
+        outcome = {
+            "tool_index": context.tool_index,
+            "function_name": context.function_name,
+            "status": status_type
+        }
+        if context.xml_tag_name:
+            outcome["xml_tag_name"] = context.xml_tag_name
+        if context.tool_call.get("id"):
+            outcome["tool_call_id"] = context.tool_call["id"]
+        if tool_message_id:
+            outcome["tool_result_message_id"] = tool_message_id
+        self.tool_run_outcomes.append(outcome)
+
+    async def _save_tool_run_summary(self, thread_id: str, thread_run_id: Optional[str]):
+        """Save one compact status row summarizing the tools of the run, if any ran."""
+        if not self.tool_run_outcomes:
+            return
+        try:
+            await self.add_message(
+                thread_id=thread_id, type="status",
+                content={"status_type": "tool_run_summary", "tools": self.tool_run_outcomes},
+                is_llm_message=False, metadata={"thread_run_id": thread_run_id}
+            )
+        except Exception as e:
+            logger.error(f"Error saving tool run summary: {str(e)}", exc_info=True)
+        self.tool_run_outcomes = []
+
+    def _create_tool_started_status(self, context: ToolExecutionContext, thread_id: str, thread_run_id: str) -> Dict[str, Any]:
+        """Formats an ephemeral tool started status message."""
         tool_name = context.xml_tag_name or context.function_name
         content = {
             "role": "assistant", "status_type": "tool_started",
@@ -1625,17 +1853,13 @@ class ResponseProcessor:
             "message": f"Starting execution of {tool_name}", "tool_index": context.tool_index,
             "tool_call_id": context.tool_call.get("id") # Include tool_call ID if native
         }
-        metadata = {"thread_run_id": thread_run_id}
-        saved_message_obj = await self.add_message(
-            thread_id=thread_id, type="status", content=content, is_llm_message=False, metadata=metadata
-        )
-        return saved_message_obj # Return the full object (or None if saving failed)
+        return self._create_status_frame(thread_id, thread_run_id, content, {"thread_run_id": thread_run_id})
 
-    async def _yield_and_save_tool_completed(self, context: ToolExecutionContext, tool_message_id: Optional[str], thread_id: str, thread_run_id: str) -> Optional[Dict[str, Any]]:
-        """Formats, saves, and returns a tool completed/failed status message."""
+    def _create_tool_completed_status(self, context: ToolExecutionContext, tool_message_id: Optional[str], thread_id: str, thread_run_id: str) -> Dict[str, Any]:
+        """Formats an ephemeral tool completed/failed status message and records the outcome."""
         if not context.result:
-            # Delegate to error saving if result is missing (e.g., execution failed)
-            return await self._yield_and_save_tool_error(context, thread_id, thread_run_id)
+            # Delegate to error status if result is missing (e.g., execution failed)
+            return self._create_tool_error_status(context, thread_id, thread_run_id)
 
         tool_name = context.xml_tag_name or context.function_name
         status_type = "tool_completed" if context.result.success else "tool_failed"
@@ -1659,13 +1883,11 @@ class ResponseProcessor:
             self.trace.event(name="marking_tool_status_for_termination", level="DEFAULT", status_message=(f"Marking tool status for '{context.function_name}' with termination signal."))
         # <<< END ADDED >>>
 
-        saved_message_obj = await self.add_message(
-            thread_id=thread_id, type="status", content=content, is_llm_message=False, metadata=metadata
-        )
-        return saved_message_obj
+        self._record_tool_outcome(context, status_type, tool_message_id)
+        return self._create_status_frame(thread_id, thread_run_id, content, metadata)
 
-    async def _yield_and_save_tool_error(self, context: ToolExecutionContext, thread_id: str, thread_run_id: str) -> Optional[Dict[str, Any]]:
-        """Formats, saves, and returns a tool error status message."""
+    def _create_tool_error_status(self, context: ToolExecutionContext, thread_id: str, thread_run_id: str) -> Dict[str, Any]:
+        """Formats an ephemeral tool error status message and records the outcome."""
         error_msg = str(context.error) if context.error else "Unknown error during tool execution"
         tool_name = context.xml_tag_name or context.function_name
         content = {
@@ -1675,9 +1897,5 @@ class ResponseProcessor:
             "tool_index": context.tool_index,
             "tool_call_id": context.tool_call.get("id")
         }
-        metadata = {"thread_run_id": thread_run_id}
-        # Save the status message with is_llm_message=False
-        saved_message_obj = await self.add_message(
-            thread_id=thread_id, type="status", content=content, is_llm_message=False, metadata=metadata
-        )
-        return saved_message_obj
+        self._record_tool_outcome(context, "tool_error")
+        return self._create_status_frame(thread_id, thread_run_id, content, {"thread_run_id": thread_run_id})
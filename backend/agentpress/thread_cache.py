@@ -0,0 +1,279 @@
+"""
+Thread message caching for AgentPress.
+
+This module keeps the LLM-visible messages of a thread in memory so that
+repeated reads during a run only fetch rows newer than the last one seen:
+- In-process tier seeded once per run from the database
+- Delta merging keyed on (created_at, message_id)
+- Optional Redis tier so a later run can start from a warm snapshot
+- Rolling summaries that stand in for the older messages they cover
+"""
+
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set
+
+from services import redis
+from utils.logger import logger
+
+# Redis snapshot TTL (1 hour) - threads idle for longer are reseeded from the DB
+THREAD_CACHE_TTL = 3600
+
+
+def parse_message_row(row: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Turn a `messages` row into an LLM message dict carrying its message_id.
+
+    Args:
+        row: Row with at least 'message_id' and 'content' columns
+
+    Returns:
+        The parsed message dict, or None if the content is not valid JSON
+    """
+    content = row['content']
+    if isinstance(content, str):
+        try:
+            parsed = json.loads(content)
+        except json.JSONDecodeError:
+            logger.error(f"Failed to parse message: {content}")
+            return None
+    elif isinstance(content, dict):
+        # Rows queued by the message writer share their content dict with the pending insert
+        parsed = content.copy()
+    else:
+        parsed = content
+    parsed['message_id'] = row['message_id']
+    return parsed
+
+
+def copy_message(message: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy a cached message deep enough for callers to mutate it safely.
+
+    Context compression replaces `content` and the LLM layer tags list content
+    blocks with cache_control, so the top-level dict and list items are copied.
+    """
+    copied = message.copy()
+    content = copied.get('content')
+    if isinstance(content, list):
+        copied['content'] = [item.copy() if isinstance(item, dict) else item for item in content]
+    return copied
+
+
+@dataclass
+class CachedThread:
+    """Cached LLM messages for a single thread plus the read cursor.
+
+    summary_message_id and summary_covers_until describe the latest rolling
+    summary: it replaces every message up to and including summary_covers_until.
+    """
+    messages: List[Dict[str, Any]] = field(default_factory=list)
+    message_ids: Set[str] = field(default_factory=set)
+    last_created_at: Optional[str] = None
+    last_message_id: Optional[str] = None
+    summary_message_ids: Set[str] = field(default_factory=set)
+    summary_message_id: Optional[str] = None
+    summary_covers_until: Optional[str] = None
+
+
+class ThreadMessageCache:
+    """Per-thread cache of LLM messages with incremental refresh.
+
+    The cache is seeded from a full read the first time a thread is requested
+    and afterwards only merges rows whose created_at is at or after the cursor.
+    Rows written through ThreadManager.add_message are appended directly.
+
+    Attributes:
+        use_redis: Whether snapshots are mirrored to Redis
+        stats: Counters for hits, misses, delta rows and appended rows
+    """
+
+    def __init__(self, use_redis: bool = False, ttl: int = THREAD_CACHE_TTL):
+        """Initialize an empty cache.
+
+        Args:
+            use_redis: Mirror thread snapshots to Redis for cross-run warm starts
+            ttl: TTL in seconds for the Redis snapshot keys
+        """
+        self.use_redis = use_redis
+        self.ttl = ttl
+        self._threads: Dict[str, CachedThread] = {}
+        self.stats: Dict[str, int] = {
+            "hits": 0,
+            "misses": 0,
+            "redis_hits": 0,
+            "delta_rows": 0,
+            "appended": 0,
+        }
+
+    @staticmethod
+    def _messages_key(thread_id: str) -> str:
+        return f"thread_messages:{thread_id}"
+
+    @staticmethod
+    def _cursor_key(thread_id: str) -> str:
+        return f"thread_messages:{thread_id}:cursor"
+
+    async def get(self, thread_id: str) -> Optional[CachedThread]:
+        """Return the cached thread, loading it from Redis if enabled.
+
+        Counts a hit when the thread is available and a miss otherwise.
+        """
+        cached = self._threads.get(thread_id)
+        if cached is None and self.use_redis:
+            cached = await self._load_from_redis(thread_id)
+            if cached is not None:
+                self._threads[thread_id] = cached
+                self.stats["redis_hits"] += 1
+
+        if cached is None:
+            self.stats["misses"] += 1
+        else:
+            self.stats["hits"] += 1
+        return cached
+
+    def messages(self, thread_id: str) -> List[Dict[str, Any]]:
+        """Return copies of the cached messages for a thread in order.
+
+        If the thread has a rolling summary, the summary replaces the messages it
+        covers and is followed by the remaining tail; older summaries are dropped.
+        """
+        cached = self._threads.get(thread_id)
+        if cached is None:
+            return []
+
+        view = cached.messages
+        if cached.summary_message_ids:
+            tail_start = 0
+            summary = None
+            for index, msg in enumerate(cached.messages):
+                if msg.get('message_id') == cached.summary_covers_until:
+                    tail_start = index + 1
+                if msg.get('message_id') == cached.summary_message_id:
+                    summary = msg
+            view = [msg for msg in cached.messages[tail_start:] if msg.get('message_id') not in cached.summary_message_ids]
+            if summary is not None and tail_start > 0:
+                view = [summary] + view
+        return [copy_message(msg) for msg in view]
+
+    def summary_message_id(self, thread_id: str) -> Optional[str]:
+        """Return the ID of the thread's latest rolling summary, if any."""
+        cached = self._threads.get(thread_id)
+        return cached.summary_message_id if cached else None
+
+    def last_created_at(self, thread_id: str) -> Optional[str]:
+        """Return the created_at of the newest cached message of a thread, if any."""
+        cached = self._threads.get(thread_id)
+        return cached.last_created_at if cached else None
+
+    async def seed(self, thread_id: str, rows: List[Dict[str, Any]]):
+        """Replace the cached thread with a full read of its rows."""
+        cached = CachedThread()
+        self._threads[thread_id] = cached
+        added = self._merge(cached, rows)
+        if self.use_redis:
+            await self._write_to_redis(thread_id, cached, added, reset=True)
+
+    async def extend(self, thread_id: str, rows: List[Dict[str, Any]]):
+        """Merge rows fetched after the cursor, skipping ones already cached."""
+        cached = self._threads.get(thread_id)
+        if cached is None:
+            await self.seed(thread_id, rows)
+            return
+        added = self._merge(cached, rows)
+        self.stats["delta_rows"] += len(added)
+        if added and self.use_redis:
+            await self._write_to_redis(thread_id, cached, added)
+
+    async def append(self, thread_id: str, row: Dict[str, Any]):
+        """Append a freshly inserted row to a thread that is already cached."""
+        cached = self._threads.get(thread_id)
+        if cached is None:
+            return
+        added = self._merge(cached, [row])
+        self.stats["appended"] += len(added)
+        if added and self.use_redis:
+            await self._write_to_redis(thread_id, cached, added)
+
+    async def invalidate(self, thread_id: str):
+        """Drop a thread from the cache so the next read reseeds it."""
+        self._threads.pop(thread_id, None)
+        if self.use_redis:
+            try:
+                await redis.delete(self._messages_key(thread_id))
+                await redis.delete(self._cursor_key(thread_id))
+            except Exception as e:
+                logger.warning(f"Failed to invalidate Redis message cache for thread {thread_id}: {e}")
+
+    def _merge(self, cached: CachedThread, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Merge rows into the cached thread and advance the cursor."""
+        added = []
+        for row in rows:
+            message_id = row.get('message_id')
+            if not message_id or message_id in cached.message_ids:
+                continue
+            message = parse_message_row(row)
+            if message is None:
+                continue
+            cached.messages.append(message)
+            cached.message_ids.add(message_id)
+            added.append(message)
+
+            if row.get('type') == 'summary':
+                cached.summary_message_ids.add(message_id)
+                # Reads select the boundary as a column; freshly inserted rows carry full metadata
+                covers_until = row.get('covers_until_message_id') or (row.get('metadata') or {}).get('covers_until_message_id')
+                if covers_until:
+                    cached.summary_message_id = message_id
+                    cached.summary_covers_until = covers_until
+
+            created_at = row.get('created_at')
+            if created_at and (cached.last_created_at is None or created_at >= cached.last_created_at):
+                cached.last_created_at = created_at
+                cached.last_message_id = message_id
+        return added
+
+    async def _load_from_redis(self, thread_id: str) -> Optional[CachedThread]:
+        """Rebuild a cached thread from its Redis snapshot, if present."""
+        try:
+            redis_client = await redis.get_client()
+            cursor_json = await redis_client.get(self._cursor_key(thread_id))
+            if not cursor_json:
+                return None
+            cursor = json.loads(cursor_json)
+            messages = [json.loads(m) for m in await redis_client.lrange(self._messages_key(thread_id), 0, -1)]
+        except Exception as e:
+            logger.warning(f"Failed to load Redis message cache for thread {thread_id}: {e}")
+            return None
+
+        return CachedThread(
+            messages=messages,
+            message_ids={m['message_id'] for m in messages if m.get('message_id')},
+            last_created_at=cursor.get('last_created_at'),
+            last_message_id=cursor.get('last_message_id'),
+            summary_message_ids=set(cursor.get('summary_message_ids') or []),
+            summary_message_id=cursor.get('summary_message_id'),
+            summary_covers_until=cursor.get('summary_covers_until'),
+        )
+
+    async def _write_to_redis(self, thread_id: str, cached: CachedThread, added: List[Dict[str, Any]], reset: bool = False):
+        """Mirror newly added messages and the cursor to Redis in one pipeline."""
+        messages_key = self._messages_key(thread_id)
+        cursor_key = self._cursor_key(thread_id)
+        cursor = {
+            "last_created_at": cached.last_created_at,
+            "last_message_id": cached.last_message_id,
+            "summary_message_ids": sorted(cached.summary_message_ids),
+            "summary_message_id": cached.summary_message_id,
+            "summary_covers_until": cached.summary_covers_until,
+        }
+        try:
+            redis_client = await redis.get_client()
+            async with redis_client.pipeline(transaction=True) as pipe:
+                if reset:
+                    pipe.delete(messages_key)
+                if added:
+                    pipe.rpush(messages_key, *[json.dumps(m) for m in added])
+                pipe.set(cursor_key, json.dumps(cursor), ex=self.ttl)
+                pipe.expire(messages_key, self.ttl)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Failed to write Redis message cache for thread {thread_id}: {e}")
@@ -11,25 +11,38 @@ This module provides comprehensive conversation management, including:
 """
 
 import json
-from typing import List, Dict, Any, Optional, Type, Union, AsyncGenerator, Literal, cast
+import asyncio
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Type, Union, AsyncGenerator, Literal, Tuple, cast
 from services.llm import make_llm_api_call
 from agentpress.tool import Tool
 from agentpress.tool_registry import ToolRegistry
 from agentpress.context_manager import ContextManager
+from agentpress.thread_cache import ThreadMessageCache
+from agentpress.message_writer import MessageWriter
+from agentpress.message import get_frame_content
 from agentpress.response_processor import (
     ResponseProcessor,
     ProcessorConfig
 )
 from services.supabase import DBConnection
 from utils.logger import logger
+from utils.config import config as app_config
 from langfuse.client import StatefulGenerationClient, StatefulTraceClient
 from services.langfuse import langfuse
 import datetime
-from litellm.utils import token_counter
 
 # Type alias for tool choice
 ToolChoice = Literal["auto", "required", "none"]
 
+# Columns needed to build the LLM view of a thread; the keyset columns must always be included.
+# type and the summary boundary let the message cache replace summarized ranges.
+LLM_MESSAGE_COLUMNS = 'message_id, content, created_at, type, covers_until_message_id:metadata->>covers_until_message_id'
+
+# Rendered XML tool instructions keyed by (tool registry fingerprint, compact), shared by all runs in the process
+XML_EXAMPLES_CACHE_SIZE = 64
+_xml_examples_cache: "OrderedDict[Tuple[str, bool], str]" = OrderedDict()
+
 class ThreadManager:
     """Manages conversation threads with LLM models and tool execution.
 
@@ -38,7 +51,7 @@ class ThreadManager:
     XML-based tool execution patterns.
     """
 
-    def __init__(self, trace: Optional[StatefulTraceClient] = None, is_agent_builder: bool = False, target_agent_id: Optional[str] = None, agent_config: Optional[dict] = None):
+    def __init__(self, trace: Optional[StatefulTraceClient] = None, is_agent_builder: bool = False, target_agent_id: Optional[str] = None, agent_config: Optional[dict] = None, stop_event: Optional[asyncio.Event] = None):
         """Initialize ThreadManager.
 
         Args:
@@ -46,6 +59,7 @@ class ThreadManager:
             is_agent_builder: Whether this is an agent builder session
             target_agent_id: ID of the agent being built (if in agent builder mode)
             agent_config: Optional agent configuration with version information
+            stop_event: Optional event set when the run is stopped; running tool calls are then cancelled
         """
         self.db = DBConnection()
         self.tool_registry = ToolRegistry()
@@ -55,15 +69,24 @@ class ThreadManager:
         self.agent_config = agent_config
         if not self.trace:
             self.trace = langfuse.trace(name="anonymous:thread_manager")
+        self.message_writer = MessageWriter(
+            insert_batch=self._insert_message_rows,
+            max_batch_size=app_config.MESSAGE_WRITER_BATCH_SIZE,
+            flush_interval=app_config.MESSAGE_WRITER_FLUSH_INTERVAL_MS / 1000,
+            on_written=self._on_messages_written
+        )
         self.response_processor = ResponseProcessor(
             tool_registry=self.tool_registry,
-            add_message_callback=self.add_message,
+            add_message_callback=self.queue_message,
+            flush_messages_callback=self.flush_messages,
             trace=self.trace,
             is_agent_builder=self.is_agent_builder,
             target_agent_id=self.target_agent_id,
-            agent_config=self.agent_config
+            agent_config=self.agent_config,
+            stop_event=stop_event
         )
         self.context_manager = ContextManager()
+        self.message_cache = ThreadMessageCache(use_redis=app_config.THREAD_MESSAGE_CACHE_REDIS)
 
     def add_tool(self, tool_class: Type[Tool], function_names: Optional[List[str]] = None, **kwargs):
         """Add a tool to the ThreadManager."""
@@ -148,6 +171,13 @@ class ThreadManager:
         logger.debug(f"Adding message of type '{type}' to thread {thread_id} (agent: {agent_id}, version: {agent_version_id})")
         client = await self.db.client
 
+        # Write out anything queued for this thread first so insert order matches call order;
+        # flush also waits for a timed flush that is already writing this thread's rows
+        await self.message_writer.flush(thread_id)
+
+        # Stamp times with the writer's clock so direct and queued rows order consistently
+        now = self.message_writer.next_timestamp()
+
         # Prepare data for insertion
         data_to_insert = {
             'thread_id': thread_id,
@@ -155,6 +185,8 @@ class ThreadManager:
             'content': content,
             'is_llm_message': is_llm_message,
             'metadata': metadata or {},
+            'created_at': now,
+            'updated_at': now,
         }
         
         # Add agent information if provided
@@ -169,6 +201,8 @@ class ThreadManager:
             logger.info(f"Successfully added message to thread {thread_id}")
 
             if result.data and len(result.data) > 0 and isinstance(result.data[0], dict) and 'message_id' in result.data[0]:
+                if is_llm_message:
+                    await self.message_cache.append(thread_id, result.data[0])
                 return result.data[0]
             else:
                 logger.error(f"Insert operation failed or did not return expected data structure for thread {thread_id}. Result data: {result.data}")
@@ -177,11 +211,119 @@ class ThreadManager:
             logger.error(f"Failed to add message to thread {thread_id}: {str(e)}", exc_info=True)
             raise
 
+    async def queue_message(
+        self,
+        thread_id: str,
+        type: str,
+        content: Union[Dict[str, Any], List[Any], str],
+        is_llm_message: bool = False,
+        metadata: Optional[Dict[str, Any]] = None,
+        agent_id: Optional[str] = None,
+        agent_version_id: Optional[str] = None
+    ):
+        """Queue a message for a batched write and return it immediately.
+
+        Takes the same arguments as add_message. The message_id and created_at
+        are assigned client-side, so the returned object can be referenced right
+        away; the row itself is written by the message writer within
+        MESSAGE_WRITER_FLUSH_INTERVAL_MS or on the next flush_messages call.
+        LLM messages enter the message cache once the row is stored.
+        """
+        logger.debug(f"Queueing message of type '{type}' for thread {thread_id} (agent: {agent_id}, version: {agent_version_id})")
+
+        # Every row carries the same columns so the batch can be sent as one bulk insert
+        message = await self.message_writer.add({
+            'thread_id': thread_id,
+            'type': type,
+            'content': content,
+            'is_llm_message': is_llm_message,
+            'metadata': metadata or {},
+            'agent_id': agent_id,
+            'agent_version_id': agent_version_id,
+        })
+        return message
+
+    async def flush_messages(self, thread_id: Optional[str] = None):
+        """Write out queued messages for a thread, or for all threads if none is given."""
+        await self.message_writer.flush(thread_id)
+
+    async def close(self):
+        """Write out all queued messages and stop the message writer's flush timer."""
+        await self.message_writer.close()
+
+    async def _on_messages_written(self, thread_id: str, rows: List[Dict[str, Any]]):
+        """Add LLM messages to the message cache once the writer has stored them."""
+        for row in rows:
+            if row.get('is_llm_message'):
+                await self.message_cache.append(thread_id, row)
+
+    async def _insert_message_rows(self, rows: List[Dict[str, Any]]):
+        """Insert a batch of prepared message rows in a single request."""
+        client = await self.db.client
+        await client.table('messages').insert(rows).execute()
+
+    async def _fetch_llm_message_rows(
+        self,
+        thread_id: str,
+        since: Optional[str] = None,
+        columns: str = LLM_MESSAGE_COLUMNS
+    ) -> List[Dict[str, Any]]:
+        """Fetch raw LLM message rows for a thread, optionally only from a created_at cursor on.
+
+        Rows are paged with a keyset cursor over (created_at, message_id), which
+        is served by idx_messages_thread_llm_keyset and stays stable when new
+        rows are inserted between pages.
+
+        Args:
+            thread_id: The ID of the thread to read.
+            since: Optional created_at cursor; rows created at or after it are returned.
+            columns: Columns to select. Defaults to the narrow set needed for the LLM view,
+                     leaving out heavy columns such as the full metadata.
+
+        Returns:
+            List of rows ordered by (created_at, message_id).
+        """
+        client = await self.db.client
+
+        # Fetch messages in batches of 1000 to avoid overloading the database
+        all_rows = []
+        batch_size = 1000
+        last_created_at = None
+        last_message_id = None
+
+        while True:
+            query = client.table('messages').select(columns).eq('thread_id', thread_id).eq('is_llm_message', True)
+            if since:
+                query = query.gte('created_at', since)
+            if last_created_at:
+                # (created_at, message_id) > (last_created_at, last_message_id)
+                query = query.or_(
+                    f'created_at.gt."{last_created_at}",'
+                    f'and(created_at.eq."{last_created_at}",message_id.gt.{last_message_id})'
+                )
+            result = await query.order('created_at').order('message_id').limit(batch_size).execute()
+
+            if not result.data or len(result.data) == 0:
+                break
+
+            all_rows.extend(result.data)
+
+            # If we got fewer than batch_size records, we've reached the end
+            if len(result.data) < batch_size:
+                break
+
+            last_created_at = result.data[-1]['created_at']
+            last_message_id = result.data[-1]['message_id']
+
+        return all_rows
+
     async def get_llm_messages(self, thread_id: str) -> List[Dict[str, Any]]:
         """Get all messages for a thread.
 
-        This method uses the SQL function which handles context truncation
-        by considering summary messages.
+        The first call for a thread seeds the message cache with a full read;
+        later calls only fetch rows created since the last cached message.
+        If the thread has a rolling summary, it is returned in place of the
+        messages it covers, followed by the rest of the thread.
 
         Args:
             thread_id: The ID of the thread to get messages for.
@@ -190,59 +332,94 @@ class ThreadManager:
             List of message objects.
         """
         logger.debug(f"Getting messages for thread {thread_id}")
-        client = await self.db.client
 
         try:
-            # result = await client.rpc('get_llm_formatted_messages', {'p_thread_id': thread_id}).execute()
-            
-            # Fetch messages in batches of 1000 to avoid overloading the database
-            all_messages = []
-            batch_size = 1000
-            offset = 0
-            
-            while True:
-                result = await client.table('messages').select('message_id, content').eq('thread_id', thread_id).eq('is_llm_message', True).order('created_at').range(offset, offset + batch_size - 1).execute()
-                
-                if not result.data or len(result.data) == 0:
-                    break
-                    
-                all_messages.extend(result.data)
-                
-                # If we got fewer than batch_size records, we've reached the end
-                if len(result.data) < batch_size:
-                    break
-                    
-                offset += batch_size
-            
-            # Use all_messages instead of result.data in the rest of the method
-            result_data = all_messages
-
-            # Parse the returned data which might be stringified JSON
-            if not result_data:
-                return []
+            cached = await self.message_cache.get(thread_id)
+            if cached is None:
+                rows = await self._fetch_llm_message_rows(thread_id)
+                await self.message_cache.seed(thread_id, rows)
+            else:
+                rows = await self._fetch_llm_message_rows(thread_id, since=cached.last_created_at)
+                await self.message_cache.extend(thread_id, rows)
 
-            # Return properly parsed JSON objects
-            messages = []
-            for item in result_data:
-                if isinstance(item['content'], str):
-                    try:
-                        parsed_item = json.loads(item['content'])
-                        parsed_item['message_id'] = item['message_id']
-                        messages.append(parsed_item)
-                    except json.JSONDecodeError:
-                        logger.error(f"Failed to parse message: {item['content']}")
-                else:
-                    content = item['content']
-                    content['message_id'] = item['message_id']
-                    messages.append(content)
+            # Rows this run writes must sort after everything already in the thread
+            self.message_writer.observe_timestamp(self.message_cache.last_created_at(thread_id))
 
-            return messages
+            logger.debug(f"Thread message cache stats for {thread_id}: {self.message_cache.stats}")
+            return self.message_cache.messages(thread_id)
 
         except Exception as e:
             logger.error(f"Failed to get messages for thread {thread_id}: {str(e)}", exc_info=True)
             return []
 
 
+    def _get_xml_examples_content(self) -> str:
+        """Get the XML tool-calling instructions for the registered tools.
+
+        The rendered block is cached process-wide per tool registry fingerprint,
+        so repeated runs and auto-continues with the same tools reuse it.
+
+        Returns:
+            The instructions block, or an empty string if no tools are registered.
+        """
+        compact = app_config.XML_TOOL_SCHEMAS_COMPACT
+        cache_key = (self.tool_registry.get_fingerprint(), compact)
+        cached = _xml_examples_cache.get(cache_key)
+        if cached is not None:
+            _xml_examples_cache.move_to_end(cache_key)
+            logger.debug(f"Using cached XML examples for tool registry {cache_key[0][:12]}")
+            return cached
+
+        openapi_schemas = self.tool_registry.get_openapi_schemas()
+        usage_examples = self.tool_registry.get_usage_examples()
+        examples_content = ""
+
+        if openapi_schemas:
+            # Convert schemas to JSON string; compact mode drops indentation to save prompt tokens
+            if compact:
+                schemas_json = json.dumps(openapi_schemas, separators=(',', ':'))
+            else:
+                schemas_json = json.dumps(openapi_schemas, indent=2)
+
+            # Build usage examples section if any exist
+            usage_examples_section = ""
+            if usage_examples:
+                usage_examples_section = "\n\nUsage Examples:\n"
+                for func_name, example in usage_examples.items():
+                    usage_examples_section += f"\n{func_name}:\n{example}\n"
+
+            examples_content = f"""
+In this environment you have access to a set of tools you can use to answer the user's question.
+
+You can invoke functions by writing a <function_calls> block like the following as part of your reply to the user:
+
+<function_calls>
+<invoke name="function_name">
+<parameter name="param_name">param_value</parameter>
+...
+</invoke>
+</function_calls>
+
+String and scalar parameters should be specified as-is, while lists and objects should use JSON format.
+
+Here are the functions available in JSON Schema format:
+
+```json
+{schemas_json}
+```
+
+When using the tools:
+- Use the exact function names from the JSON schema above
+- Include all required parameters as specified in the schema
+- Format complex data (objects, arrays) as JSON strings within the parameter tags
+- Boolean values should be "true" or "false" (lowercase)
+{usage_examples_section}"""
+
+        _xml_examples_cache[cache_key] = examples_content
+        if len(_xml_examples_cache) > XML_EXAMPLES_CACHE_SIZE:
+            _xml_examples_cache.popitem(last=False)
+        return examples_content
+
     async def run_thread(
         self,
         thread_id: str,
@@ -306,55 +483,9 @@ class ThreadManager:
 
         # Add XML tool calling instructions to system prompt if requested
         if include_xml_examples and config.xml_tool_calling:
-            openapi_schemas = self.tool_registry.get_openapi_schemas()
-            usage_examples = self.tool_registry.get_usage_examples()
-            
-            if openapi_schemas:
-                # Convert schemas to JSON string
-                schemas_json = json.dumps(openapi_schemas, indent=2)
-                
-                # Build usage examples section if any exist
-                usage_examples_section = ""
-                if usage_examples:
-                    usage_examples_section = "\n\nUsage Examples:\n"
-                    for func_name, example in usage_examples.items():
-                        usage_examples_section += f"\n{func_name}:\n{example}\n"
-                
-                examples_content = f"""
-In this environment you have access to a set of tools you can use to answer the user's question.
-
-You can invoke functions by writing a <function_calls> block like the following as part of your reply to the user:
-
-<function_calls>
-<invoke name="function_name">
-<parameter name="param_name">param_value</parameter>
-...
-</invoke>
-</function_calls>
-
-String and scalar parameters should be specified as-is, while lists and objects should use JSON format.
-
-Here are the functions available in JSON Schema format:
-
-```json
-{schemas_json}
-```
-
-When using the tools:
-- Use the exact function names from the JSON schema above
-- Include all required parameters as specified in the schema
-- Format complex data (objects, arrays) as JSON strings within the parameter tags
-- Boolean values should be "true" or "false" (lowercase)
-{usage_examples_section}"""
-
-                # # Save examples content to a file
-                # try:
-                #     with open('xml_examples.txt', 'w') as f:
-                #         f.write(examples_content)
-                #     logger.debug("Saved XML examples to xml_examples.txt")
-                # except Exception as e:
-                #     logger.error(f"Failed to save XML examples to file: {e}")
+            examples_content = self._get_xml_examples_content()
 
+            if examples_content:
                 system_content = working_system_prompt.get('content')
 
                 if isinstance(system_content, str):
@@ -362,9 +493,10 @@ When using the tools:
                     logger.debug("Appended XML examples to string system prompt content.")
                 elif isinstance(system_content, list):
                     appended = False
-                    for item in working_system_prompt['content']: # Modify the copy
+                    working_system_prompt['content'] = list(system_content)
+                    for index, item in enumerate(working_system_prompt['content']): # Modify the copy
                         if isinstance(item, dict) and item.get('type') == 'text' and 'text' in item:
-                            item['text'] += examples_content
+                            working_system_prompt['content'][index] = {**item, 'text': item['text'] + examples_content}
                             logger.debug("Appended XML examples to the first text block in list system prompt content.")
                             appended = True
                             break
@@ -397,7 +529,7 @@ When using the tools:
                 token_count = 0
                 try:
                     # Use the potentially modified working_system_prompt for token counting
-                    token_count = token_counter(model=llm_model, messages=[working_system_prompt] + messages)
+                    token_count = self.context_manager.count_tokens([working_system_prompt] + messages, llm_model)
                     token_threshold = self.context_manager.token_threshold
                     logger.info(f"Thread {thread_id} token count: {token_count}/{token_threshold} ({(token_count/token_threshold)*100:.1f}%)")
 
@@ -447,7 +579,11 @@ When using the tools:
 
                 # print(f"\n\n\n\n prepared_messages: {prepared_messages}\n\n\n\n")
 
-                prepared_messages = self.context_manager.compress_messages(prepared_messages, llm_model)
+                if app_config.CONTEXT_CACHE_STABLE_COMPRESSION:
+                    await self.context_manager.load_compaction_state(thread_id)
+                prepared_messages = self.context_manager.compress_messages(prepared_messages, llm_model, thread_id=thread_id)
+                if app_config.CONTEXT_CACHE_STABLE_COMPRESSION:
+                    await self.context_manager.save_compaction_state(thread_id)
 
                 # 5. Make LLM API call
                 logger.debug("Making LLM API call")
@@ -572,7 +708,7 @@ When using the tools:
 
                                 elif chunk.get('type') == 'status':
                                     # if the finish reason is length, auto-continue
-                                    content = json.loads(chunk.get('content'))
+                                    content = get_frame_content(chunk)
                                     if content.get('finish_reason') == 'length':
                                         logger.info(f"Detected finish_reason='length', auto-continuing ({auto_continue_count + 1}/{native_max_auto_continues})")
                                         auto_continue = True
@@ -0,0 +1,152 @@
+"""
+Rolling thread summarization for AgentPress.
+
+This module condenses the older part of long threads into summary messages:
+- Runs off the critical path, after a thread run has ended
+- Triggers once the LLM view passes a configurable share of the model budget
+- Writes a 'summary' message that replaces everything up to a boundary message
+"""
+
+import json
+from typing import Any, Dict, List, Optional
+
+from agentpress.thread_manager import ThreadManager
+from services.llm import make_llm_api_call
+from utils.config import config
+from utils.logger import logger
+
+# Per-message character cap when rendering the transcript for the summarizer
+SUMMARY_MESSAGE_CHAR_LIMIT = 4000
+
+SUMMARY_SYSTEM_PROMPT = """You are summarizing the earlier part of a conversation between a user and an AI agent that uses tools.
+Write a dense summary that lets the agent continue the task without the original messages. Include:
+- The user's goals, requirements and preferences
+- Decisions made and the reasons for them
+- Files, URLs, commands, IDs and other concrete facts the agent produced or relied on
+- Work completed so far and what remains open
+If the transcript starts with an earlier summary, merge it into the new one. Respond with the summary only."""
+
+
+class ThreadSummarizer:
+    """Writes rolling summaries for threads that approach the model budget."""
+
+    def __init__(self, thread_manager: Optional[ThreadManager] = None):
+        """Initialize the summarizer.
+
+        Args:
+            thread_manager: ThreadManager used to read and write messages; a new one is created if omitted
+        """
+        self.thread_manager = thread_manager or ThreadManager()
+        self.context_manager = self.thread_manager.context_manager
+
+    async def summarize_if_needed(self, thread_id: str, llm_model: str) -> Optional[Dict[str, Any]]:
+        """Summarize the older part of a thread if its LLM view is over the trigger share.
+
+        Args:
+            thread_id: The thread to summarize
+            llm_model: Model the thread runs with; it determines the token budget
+
+        Returns:
+            The saved summary message, or None if no summary was needed or possible
+        """
+        messages = await self.thread_manager.get_llm_messages(thread_id)
+        budget = self.context_manager.get_model_max_tokens(llm_model)
+        costs = [self.context_manager.token_cache.count_message(msg, llm_model) for msg in messages]
+        token_count = sum(costs)
+        trigger_tokens = budget * config.THREAD_SUMMARY_TRIGGER_PERCENT // 100
+
+        if token_count < trigger_tokens:
+            logger.debug(f"Thread {thread_id} at {token_count}/{trigger_tokens} tokens, no summary needed")
+            return None
+
+        keep_tokens = budget * config.THREAD_SUMMARY_KEEP_PERCENT // 100
+        tail_start = self._find_tail_start(messages, costs, keep_tokens)
+        # The boundary must be a regular message; a previous summary sits after its own tail
+        if tail_start is not None and messages[tail_start - 1].get('message_id') == self.thread_manager.message_cache.summary_message_id(thread_id):
+            tail_start = None
+        if tail_start is None:
+            logger.info(f"Thread {thread_id} has no summarizable range before its tail")
+            return None
+
+        to_summarize = messages[:tail_start]
+        boundary_message_id = to_summarize[-1].get('message_id')
+        summary_text = await self._summarize(to_summarize)
+        if not summary_text:
+            return None
+
+        summary_message = await self.thread_manager.add_message(
+            thread_id=thread_id,
+            type="summary",
+            content={
+                "role": "user",
+                "content": f"Summary of the earlier conversation:\n\n{summary_text}"
+            },
+            is_llm_message=True,
+            metadata={
+                "covers_until_message_id": boundary_message_id,
+                "summarized_messages": len(to_summarize),
+                "summarized_tokens": sum(costs[:tail_start])
+            }
+        )
+        logger.info(f"Summarized {len(to_summarize)} messages ({sum(costs[:tail_start])} tokens) of thread {thread_id} up to message {boundary_message_id}")
+        return summary_message
+
+    def _find_tail_start(self, messages: List[Dict[str, Any]], costs: List[int], keep_tokens: int) -> Optional[int]:
+        """Find the first index of the tail kept verbatim after the summary.
+
+        The tail is the longest suffix within keep_tokens, moved forward past
+        native tool responses so tool calls are never separated from their results.
+        """
+        tail_start = len(messages)
+        tail_tokens = 0
+        while tail_start > 0 and tail_tokens + costs[tail_start - 1] <= keep_tokens:
+            tail_start -= 1
+            tail_tokens += costs[tail_start]
+
+        while tail_start < len(messages) and messages[tail_start].get('role') == 'tool':
+            tail_start += 1
+
+        # Need at least one real message before the tail and something left after it
+        if tail_start >= len(messages) or not any(msg.get('message_id') for msg in messages[:tail_start]):
+            return None
+        if not messages[tail_start - 1].get('message_id'):
+            return None
+        return tail_start
+
+    async def _summarize(self, messages: List[Dict[str, Any]]) -> Optional[str]:
+        """Ask the summary model for a summary of the given messages."""
+        transcript = "\n\n".join(self._render_message(msg) for msg in messages)
+        try:
+            response = await make_llm_api_call(
+                messages=[
+                    {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+                    {"role": "user", "content": transcript}
+                ],
+                model_name=config.THREAD_SUMMARY_MODEL,
+                max_tokens=config.THREAD_SUMMARY_MAX_TOKENS,
+                temperature=0
+            )
+        except Exception as e:
+            logger.error(f"Failed to generate thread summary: {str(e)}", exc_info=True)
+            return None
+
+        if response and response.get('choices') and response['choices'][0].get('message'):
+            summary = (response['choices'][0]['message'].get('content') or '').strip()
+            if summary:
+                return summary
+        logger.warning(f"Summary model returned no content: {response}")
+        return None
+
+    def _render_message(self, msg: Dict[str, Any]) -> str:
+        """Render one message as a transcript entry, capped at SUMMARY_MESSAGE_CHAR_LIMIT characters."""
+        content = msg.get('content')
+        if isinstance(content, list):
+            content = "\n".join(
+                item.get('text', '') for item in content
+                if isinstance(item, dict) and item.get('type') == 'text'
+            )
+        elif not isinstance(content, str):
+            content = json.dumps(content)
+        if len(content) > SUMMARY_MESSAGE_CHAR_LIMIT:
+            content = content[:SUMMARY_MESSAGE_CHAR_LIMIT] + "... (truncated)"
+        return f"[{msg.get('role', 'unknown')}]\n{content}"
@@ -0,0 +1,72 @@
+"""
+Token count caching for AgentPress.
+
+This module memoizes litellm token counts per message so that a message is
+tokenized at most once per content version:
+- Entries are keyed by model, message_id and a hash of the message contents
+- List totals are computed by summing cached per-message counts
+- Hit and miss counters report how many tokenizations were skipped
+"""
+
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
+
+from litellm.utils import token_counter
+
+# Upper bound on cached entries; roughly two per message for long threads
+TOKEN_CACHE_MAX_ENTRIES = 20000
+
+
+def message_content_hash(msg: Dict[str, Any]) -> str:
+    """Hash everything in a message that contributes to its token count."""
+    serialized = json.dumps(msg, sort_keys=True, default=str)
+    return hashlib.blake2b(serialized.encode(), digest_size=16).hexdigest()
+
+
+class TokenCountCache:
+    """LRU cache of per-message token counts.
+
+    Summing per-message counts slightly overestimates a list count, since each
+    single-message count includes the reply priming tokens; for budgeting this
+    errs on the safe side.
+
+    Attributes:
+        max_entries: Maximum number of cached counts
+        stats: Counters for hits (skipped tokenizations) and misses
+    """
+
+    def __init__(self, max_entries: int = TOKEN_CACHE_MAX_ENTRIES):
+        """Initialize an empty cache.
+
+        Args:
+            max_entries: Maximum number of cached counts before the oldest are evicted
+        """
+        self.max_entries = max_entries
+        self._counts: "OrderedDict[Tuple[str, str, str], int]" = OrderedDict()
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0}
+
+    def count_message(self, msg: Dict[str, Any], llm_model: str) -> int:
+        """Return the token count of a single message, tokenizing it only on a cache miss."""
+        key = (llm_model, str(msg.get('message_id') or ''), message_content_hash(msg))
+        count = self._counts.get(key)
+        if count is not None:
+            self._counts.move_to_end(key)
+            self.stats["hits"] += 1
+            return count
+
+        count = token_counter(model=llm_model, messages=[msg])
+        self.stats["misses"] += 1
+        self._counts[key] = count
+        if len(self._counts) > self.max_entries:
+            self._counts.popitem(last=False)
+        return count
+
+    def count_messages(self, messages: List[Dict[str, Any]], llm_model: str) -> int:
+        """Return the token count of a message list as the sum of cached per-message counts."""
+        return sum(self.count_message(msg, llm_model) for msg in messages if isinstance(msg, dict))
+
+    def snapshot(self) -> Dict[str, int]:
+        """Return a copy of the current counters."""
+        return dict(self.stats)
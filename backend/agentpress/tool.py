@@ -4,10 +4,13 @@ Core tool system providing the foundation for creating and managing tools.
 This module defines the base classes and decorators for creating tools in AgentPress:
 - Tool base class for implementing tool functionality
 - Schema decorators for OpenAPI tool definitions
+- Execution limit decorators for scheduling tool calls
+- Result cache decorators for idempotent tool functions
 - Result containers for standardized tool outputs
+- Progress containers for tools that stream partial output
 """
 
-from typing import Dict, Any, Union, Optional, List
+from typing import Dict, Any, Union, Optional, List, Tuple
 from dataclasses import dataclass, field
 from abc import ABC
 import json
@@ -31,6 +34,28 @@ class ToolSchema:
     schema_type: SchemaType
     schema: Dict[str, Any]
 
+@dataclass
+class ToolLimits:
+    """Execution limits declared for a tool function.
+
+    Attributes:
+        timeout (Optional[float]): Deadline for one call in seconds (None = scheduler default)
+        max_concurrency (Optional[int]): Concurrent calls of the function per run (None = scheduler default)
+    """
+    timeout: Optional[float] = None
+    max_concurrency: Optional[int] = None
+
+@dataclass
+class ToolCachePolicy:
+    """Result caching declared for an idempotent tool function.
+
+    Attributes:
+        ttl (int): Seconds a cached result stays valid
+        scoped (bool): Share results only within the tool's cache scope (Tool.get_cache_scope)
+    """
+    ttl: int
+    scoped: bool = True
+
 @dataclass
 class ToolResult:
     """Container for tool execution results.
@@ -42,6 +67,21 @@ class ToolResult:
     success: bool
     output: str
 
+@dataclass
+class ToolProgress:
+    """Incremental progress from a long-running tool function.
+
+    Tool functions may be async generators: they yield any number of
+    ToolProgress items followed by a final ToolResult. Progress is shown to the
+    client while the tool runs; only the final result is persisted.
+
+    Attributes:
+        message (str): Short human-readable progress update
+        data (Optional[Dict[str, Any]]): Structured progress details (e.g. output tail, completed item)
+    """
+    message: str
+    data: Optional[Dict[str, Any]] = None
+
 class Tool(ABC):
     """Abstract base class for all tools.
     
@@ -53,6 +93,8 @@ class Tool(ABC):
         
     Methods:
         get_schemas: Get all registered tool schemas
+        get_concurrency_scopes: Get the shared resources the tool's calls are limited on
+        get_cache_scope: Get the scope cached results of the tool are shared in
         success_response: Create a successful result
         fail_response: Create a failed result
     """
@@ -78,6 +120,27 @@ class Tool(ABC):
         """
         return self._schemas
 
+    def get_concurrency_scopes(self) -> List[Tuple[str, int]]:
+        """Get the shared resources this tool's calls run against.
+
+        Override in tools that use resources with limited capacity, such as a
+        sandbox; a call holds a slot on every returned resource while it runs.
+
+        Returns:
+            List of resource keys and the number of calls that may run on each at once
+        """
+        return []
+
+    def get_cache_scope(self) -> Optional[str]:
+        """Get the scope in which cached results of this tool's functions are shared.
+
+        Override in tools whose results depend on per-project or per-user state.
+
+        Returns:
+            Scope key, or None to share results globally
+        """
+        return None
+
     def success_response(self, data: Union[Dict[str, Any], str]) -> ToolResult:
         """Create a successful tool result.
         
@@ -134,6 +197,22 @@ def usage_example(example: str):
         ))
     return decorator
 
+def tool_limits(timeout: Optional[float] = None, max_concurrency: Optional[int] = None):
+    """Decorator declaring a deadline in seconds and a per-run concurrency limit for a tool function."""
+    def decorator(func):
+        logger.debug(f"Applying tool limits to function {func.__name__}")
+        func.tool_limits = ToolLimits(timeout=timeout, max_concurrency=max_concurrency)
+        return func
+    return decorator
+
+def cache_result(ttl: int = 3600, scoped: bool = True):
+    """Decorator marking an idempotent tool function whose successful results may be cached for ttl seconds."""
+    def decorator(func):
+        logger.debug(f"Applying result cache to function {func.__name__}")
+        func.tool_cache = ToolCachePolicy(ttl=ttl, scoped=scoped)
+        return func
+    return decorator
+
 def xml_schema(**kwargs):
     """Deprecated decorator - does nothing, kept for compatibility."""
     def decorator(func):
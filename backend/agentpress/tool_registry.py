@@ -1,6 +1,8 @@
-from typing import Dict, Type, Any, List, Optional, Callable
-from agentpress.tool import Tool, SchemaType
+from typing import Dict, Type, Any, List, Optional, Callable, Tuple
+from agentpress.tool import Tool, SchemaType, ToolLimits
+from agentpress.xml_stream_scanner import XMLTagMatcher
 from utils.logger import logger
+import hashlib
 import json
 
 
@@ -17,11 +19,18 @@ class ToolRegistry:
         register_tool: Register a tool with optional function filtering
         get_tool: Get a specific tool by name
         get_openapi_schemas: Get OpenAPI schemas for function calling
+        get_limits: Get the declared execution limits of a function
+        get_fingerprint: Get a stable fingerprint of the registered tools
+        get_xml_tag_matcher: Get a precompiled matcher for legacy XML tool tags
     """
     
     def __init__(self):
         """Initialize a new ToolRegistry instance."""
         self.tools = {}
+        self._fingerprint_identity = None
+        self._fingerprint = None
+        self._xml_tag_matcher_names = None
+        self._xml_tag_matcher = None
         logger.debug("Initialized new ToolRegistry instance")
     
     def register_tool(self, tool_class: Type[Tool], function_names: Optional[List[str]] = None, **kwargs):
@@ -75,6 +84,39 @@ class ToolRegistry:
         logger.debug(f"Retrieved {len(available_functions)} available functions")
         return available_functions
 
+    def get_function(self, function_name: str) -> Optional[Callable]:
+        """Get the implementation of a single tool function.
+
+        Args:
+            function_name: Name of the tool function
+
+        Returns:
+            The bound tool method, or None if no such function is registered
+        """
+        tool_info = self.tools.get(function_name)
+        if not tool_info:
+            return None
+        return getattr(tool_info['instance'], function_name, None)
+
+    def get_limits(self, function_name: str) -> ToolLimits:
+        """Get the execution limits declared with the tool_limits decorator.
+
+        Args:
+            function_name: Name of the tool function
+
+        Returns:
+            The declared ToolLimits, or empty limits if none were declared
+        """
+        function = self.get_function(function_name)
+        return getattr(function, 'tool_limits', None) or ToolLimits()
+
+    def get_concurrency_scopes(self, function_name: str) -> List[Tuple[str, int]]:
+        """Get the shared resource keys and their concurrency limits for a function's tool."""
+        tool_info = self.tools.get(function_name)
+        if not tool_info:
+            return []
+        return tool_info['instance'].get_concurrency_scopes()
+
     def get_tool(self, tool_name: str) -> Dict[str, Any]:
         """Get a specific tool by name.
         
@@ -127,3 +169,53 @@ class ToolRegistry:
         logger.debug(f"Retrieved {len(examples)} usage examples")
         return examples
 
+    def get_fingerprint(self) -> str:
+        """Get a stable fingerprint of the registered tools.
+
+        Functions defined on a tool class are identified by class and function
+        name, since their schemas are fixed by decorators at class definition.
+        Schemas created at runtime (e.g. MCP tools) are hashed by content. The
+        fingerprint is memoized until the registered entries change, including
+        entries written directly into `tools`.
+
+        Returns:
+            Hex digest identifying the registered functions, their order and schemas
+        """
+        identity = tuple(
+            (name, id(tool_info['instance']), id(tool_info['schema']))
+            for name, tool_info in self.tools.items()
+        )
+        if identity == self._fingerprint_identity:
+            return self._fingerprint
+
+        parts = []
+        for tool_name, tool_info in self.tools.items():
+            tool_instance = tool_info['instance']
+            tool_class = type(tool_instance)
+            class_schemas = getattr(getattr(tool_class, tool_name, None), 'tool_schemas', [])
+            if any(schema is tool_info['schema'] for schema in class_schemas):
+                parts.append([tool_name, f"{tool_class.__module__}.{tool_class.__qualname__}"])
+            else:
+                instance_schemas = tool_instance.get_schemas().get(tool_name, [tool_info['schema']])
+                parts.append([tool_name, [[schema.schema_type.value, schema.schema] for schema in instance_schemas]])
+
+        self._fingerprint = hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+        self._fingerprint_identity = identity
+        return self._fingerprint
+
+    def get_xml_tag_matcher(self) -> XMLTagMatcher:
+        """Get a precompiled matcher over the legacy XML tags of all registered functions.
+
+        Legacy tags are the function names with underscores as dashes. The
+        matcher is rebuilt only when the set of registered names changes,
+        including entries written directly into `tools`.
+
+        Returns:
+            XMLTagMatcher shared by all scanners until registration changes
+        """
+        names = tuple(self.tools)
+        if names != self._xml_tag_matcher_names:
+            self._xml_tag_matcher = XMLTagMatcher(name.replace('_', '-') for name in names)
+            self._xml_tag_matcher_names = names
+            logger.debug(f"Compiled XML tag matcher for {len(names)} functions")
+        return self._xml_tag_matcher
@@ -0,0 +1,115 @@
+"""
+Tool result caching for AgentPress.
+
+This module stores the results of idempotent tool calls in Redis so repeated
+calls with the same arguments skip the tool:
+- Opt-in per function with the cache_result decorator
+- Keyed on function name, cache scope and normalized arguments
+- Only successful results within a size limit are stored, with a TTL
+- Hit and miss counters per function
+"""
+
+import hashlib
+import json
+from typing import Any, Dict, Optional
+
+from agentpress.tool import ToolResult, ToolCachePolicy
+from agentpress.tool_registry import ToolRegistry
+from services import redis
+from utils.logger import logger
+
+
+def normalize_arguments(arguments: Any) -> Any:
+    """Normalize tool arguments so equivalent calls produce the same cache key."""
+    if isinstance(arguments, dict):
+        return {str(key): normalize_arguments(value) for key, value in arguments.items()}
+    if isinstance(arguments, (list, tuple)):
+        return [normalize_arguments(value) for value in arguments]
+    if isinstance(arguments, str):
+        return arguments.strip()
+    return arguments
+
+
+class ToolResultCache:
+    """Redis cache for results of tool functions decorated with cache_result.
+
+    Attributes:
+        stats: Counters per function name: hits, misses, stored and skipped (too large)
+    """
+
+    def __init__(self, tool_registry: ToolRegistry, enabled: bool = True, max_bytes: int = 262144):
+        """Initialize the cache.
+
+        Args:
+            tool_registry: Registry providing the cache policy and scope of each function
+            enabled: Whether cached results are read and written at all
+            max_bytes: Largest serialized result that is stored
+        """
+        self.tool_registry = tool_registry
+        self.enabled = enabled
+        self.max_bytes = max_bytes
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    async def get(self, function_name: str, arguments: Dict[str, Any]) -> Optional[ToolResult]:
+        """Get the cached result of a call, or None if the function is not cacheable or on a miss."""
+        key = self._get_key(function_name, arguments)
+        if key is None:
+            return None
+
+        stats = self._get_stats(function_name)
+        try:
+            cached = await redis.get(key)
+        except Exception as e:
+            logger.warning(f"Failed to read cached result of {function_name}: {e}")
+            cached = None
+
+        if cached is None:
+            stats["misses"] += 1
+            return None
+        stats["hits"] += 1
+        data = json.loads(cached)
+        logger.debug(f"Using cached result for {function_name}")
+        return ToolResult(success=data["success"], output=data["output"])
+
+    async def set(self, function_name: str, arguments: Dict[str, Any], result: ToolResult):
+        """Store a successful result of a cacheable function."""
+        if not isinstance(result, ToolResult) or not result.success:
+            return
+        key = self._get_key(function_name, arguments)
+        if key is None:
+            return
+
+        stats = self._get_stats(function_name)
+        value = json.dumps({"success": result.success, "output": result.output}, default=str)
+        if len(value.encode('utf-8')) > self.max_bytes:
+            stats["skipped"] += 1
+            logger.debug(f"Result of {function_name} too large to cache ({len(value)} chars)")
+            return
+        try:
+            await redis.set(key, value, ex=self._get_policy(function_name).ttl)
+            stats["stored"] += 1
+        except Exception as e:
+            logger.warning(f"Failed to cache result of {function_name}: {e}")
+
+    def _get_policy(self, function_name: str) -> Optional[ToolCachePolicy]:
+        function = self.tool_registry.get_function(function_name)
+        return getattr(function, 'tool_cache', None)
+
+    def _get_key(self, function_name: str, arguments: Dict[str, Any]) -> Optional[str]:
+        """Build the Redis key of a call, or None if its function is not cacheable."""
+        if not self.enabled:
+            return None
+        policy = self._get_policy(function_name)
+        if policy is None:
+            return None
+
+        scope = "global"
+        if policy.scoped:
+            tool_info = self.tool_registry.tools.get(function_name)
+            scope = (tool_info and tool_info['instance'].get_cache_scope()) or "global"
+        normalized = json.dumps(normalize_arguments(arguments), sort_keys=True, separators=(',', ':'), default=str)
+        digest = hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+        return f"tool_result:{function_name}:{scope}:{digest}"
+
+    def _get_stats(self, function_name: str) -> Dict[str, int]:
+        return self.stats.setdefault(function_name, {"hits": 0, "misses": 0, "stored": 0, "skipped": 0})
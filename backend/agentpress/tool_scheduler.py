@@ -0,0 +1,201 @@
+"""
+Tool execution scheduling for AgentPress.
+
+This module runs the tool calls of a thread run under the limits declared on
+the tools:
+- Per-function concurrency limits and deadlines from the tool_limits decorator
+- Per-resource concurrency limits (e.g. one sandbox) from Tool.get_concurrency_scopes,
+  shared by every run in the process
+- Prompt cancellation of queued and running calls when the run is stopped
+- Queue wait and execution time metrics per tool function
+"""
+
+import asyncio
+import time
+import weakref
+from contextlib import AsyncExitStack
+from dataclasses import dataclass, asdict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from agentpress.tool import ToolResult
+from agentpress.tool_registry import ToolRegistry
+from utils.logger import logger
+
+# Resource semaphores are shared between the schedulers of all runs in the process;
+# an entry lives as long as a scheduler references it
+_resource_semaphores: "weakref.WeakValueDictionary[str, asyncio.Semaphore]" = weakref.WeakValueDictionary()
+
+
+@dataclass
+class ToolMetrics:
+    """Scheduling counters for one tool function, times in milliseconds."""
+    calls: int = 0
+    timeouts: int = 0
+    cancelled: int = 0
+    queue_wait_ms: float = 0.0
+    max_queue_wait_ms: float = 0.0
+    execution_ms: float = 0.0
+    max_execution_ms: float = 0.0
+
+
+class ToolScheduler:
+    """Schedules tool calls with concurrency limits, deadlines and cancellation.
+
+    Every submitted call runs as its own task. It first waits for a slot on its
+    function's semaphore and then on each of its resources' semaphores sorted by
+    resource key, always in that order, so calls holding one slot never wait on
+    each other in a cycle. Function limits apply per run; resource limits apply
+    to all runs in the process that use the resource.
+
+    Attributes:
+        metrics: ToolMetrics per function name
+    """
+
+    def __init__(
+        self,
+        tool_registry: ToolRegistry,
+        execute: Callable[[Dict[str, Any]], Awaitable[ToolResult]],
+        default_concurrency: int = 0,
+        default_timeout: float = 0,
+        stop_event: Optional[asyncio.Event] = None
+    ):
+        """Initialize the scheduler.
+
+        Args:
+            tool_registry: Registry providing the declared limits of each function
+            execute: Coroutine function executing a single tool call
+            default_concurrency: Concurrent calls per function without a declared limit (0 = unlimited)
+            default_timeout: Deadline in seconds for functions without a declared one (0 = none)
+            stop_event: Event set when the run is stopped; queued and running calls are then cancelled
+        """
+        self.tool_registry = tool_registry
+        self.execute = execute
+        self.default_concurrency = default_concurrency
+        self.default_timeout = default_timeout
+        self.stop_event = stop_event
+        self.metrics: Dict[str, ToolMetrics] = {}
+        self._semaphores: Dict[Tuple[str, str], asyncio.Semaphore] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._cancelled_tasks: Set[asyncio.Task] = set()
+        self._stop_watcher: Optional[asyncio.Task] = None
+
+    def submit(self, tool_call: Dict[str, Any]) -> asyncio.Task:
+        """Schedule a tool call.
+
+        Returns:
+            Task resolving to the call's ToolResult; timeouts and stop cancellations resolve to failed results
+        """
+        task = asyncio.create_task(self._run(tool_call, time.monotonic()))
+        self._tasks.add(task)
+        task.add_done_callback(self._on_task_done)
+        if self.stop_event is not None and self._stop_watcher is None:
+            self._stop_watcher = asyncio.create_task(self._watch_stop())
+        return task
+
+    async def run(self, tool_call: Dict[str, Any]) -> ToolResult:
+        """Schedule a tool call and wait for its result."""
+        return await self.submit(tool_call)
+
+    def cancel_all(self) -> int:
+        """Cancel all queued and running calls; each resolves to a failed result.
+
+        Returns:
+            Number of calls cancelled
+        """
+        pending = [task for task in self._tasks if not task.done()]
+        for task in pending:
+            self._cancelled_tasks.add(task)
+            task.cancel()
+        if pending:
+            logger.info(f"Cancelled {len(pending)} queued or running tool calls")
+        return len(pending)
+
+    def get_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Get the scheduling metrics of each tool function called so far."""
+        return {name: asdict(metrics) for name, metrics in self.metrics.items()}
+
+    async def _run(self, tool_call: Dict[str, Any], submitted_at: float) -> ToolResult:
+        """Wait for slots, then execute the call within its deadline."""
+        function_name = tool_call.get('function_name', 'unknown')
+        metrics = self.metrics.setdefault(function_name, ToolMetrics())
+        metrics.calls += 1
+        if self.stop_event is not None and self.stop_event.is_set():
+            metrics.cancelled += 1
+            return self._cancelled_result(function_name)
+
+        limits = self.tool_registry.get_limits(function_name)
+        timeout = limits.timeout or self.default_timeout or None
+        started_at = None
+        try:
+            async with AsyncExitStack() as stack:
+                for semaphore in self._get_semaphores(function_name, limits.max_concurrency):
+                    await stack.enter_async_context(semaphore)
+                started_at = time.monotonic()
+                if timeout:
+                    return await asyncio.wait_for(self.execute(tool_call), timeout)
+                return await self.execute(tool_call)
+        except asyncio.TimeoutError:
+            metrics.timeouts += 1
+            logger.warning(f"Tool {function_name} timed out after {timeout} seconds")
+            return ToolResult(success=False, output=f"Tool '{function_name}' timed out after {timeout} seconds")
+        except asyncio.CancelledError:
+            if asyncio.current_task() not in self._cancelled_tasks:
+                raise
+            metrics.cancelled += 1
+            return self._cancelled_result(function_name)
+        finally:
+            finished_at = time.monotonic()
+            queue_wait_ms = ((started_at or finished_at) - submitted_at) * 1000
+            metrics.queue_wait_ms += queue_wait_ms
+            metrics.max_queue_wait_ms = max(metrics.max_queue_wait_ms, queue_wait_ms)
+            if started_at is not None:
+                execution_ms = (finished_at - started_at) * 1000
+                metrics.execution_ms += execution_ms
+                metrics.max_execution_ms = max(metrics.max_execution_ms, execution_ms)
+                logger.debug(f"Tool {function_name} waited {queue_wait_ms:.0f}ms, ran {execution_ms:.0f}ms")
+
+    def _get_semaphores(self, function_name: str, max_concurrency: Optional[int]) -> List[asyncio.Semaphore]:
+        """Get the semaphores a call must hold, in acquisition order."""
+        semaphores = []
+        concurrency = max_concurrency or self.default_concurrency
+        if concurrency:
+            semaphores.append(self._get_semaphore(('function', function_name), concurrency))
+        for resource, limit in sorted(self.tool_registry.get_concurrency_scopes(function_name)):
+            semaphores.append(self._get_resource_semaphore(resource, limit))
+        return semaphores
+
+    def _get_resource_semaphore(self, resource: str, limit: int) -> asyncio.Semaphore:
+        key = ('resource', resource)
+        semaphore = self._semaphores.get(key)
+        if semaphore is None:
+            semaphore = _resource_semaphores.get(resource)
+            if semaphore is None:
+                semaphore = asyncio.Semaphore(limit)
+                _resource_semaphores[resource] = semaphore
+            # Holding it here keeps the shared entry alive for the run
+            self._semaphores[key] = semaphore
+        return semaphore
+
+    def _get_semaphore(self, key: Tuple[str, str], limit: int) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(key)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(limit)
+            self._semaphores[key] = semaphore
+        return semaphore
+
+    def _cancelled_result(self, function_name: str) -> ToolResult:
+        return ToolResult(success=False, output=f"Tool '{function_name}' was cancelled because the run was stopped")
+
+    def _on_task_done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        self._cancelled_tasks.discard(task)
+        # The stop watcher only lives while calls are in flight
+        if not self._tasks and self._stop_watcher is not None:
+            self._stop_watcher.cancel()
+            self._stop_watcher = None
+
+    async def _watch_stop(self):
+        await self.stop_event.wait()
+        logger.info("Run stopped, cancelling scheduled tool calls")
+        self._stop_watcher = None
+        self.cancel_all()
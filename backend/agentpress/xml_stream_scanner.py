@@ -0,0 +1,144 @@
+"""
+Incremental XML tool-call scanner for AgentPress.
+
+Streaming responses arrive in small deltas. Instead of rescanning the whole
+response on every delta, the scanner keeps its position and the state of a
+partially received block between calls:
+- Only newly arrived text (plus a few bytes of possible partial tag) is searched
+- Complete <function_calls> blocks are emitted as soon as their closing tag arrives
+- Legacy <tool-name>...</tool-name> blocks are supported, including nesting
+- Consumed text is dropped, so the buffer only holds the unfinished tail
+"""
+
+import re
+from typing import Iterable, List, Optional, Pattern
+
+FUNCTION_CALLS_START = '<function_calls>'
+FUNCTION_CALLS_END = '</function_calls>'
+# Lookahead for the character that terminates a legacy tag name
+TAG_NAME_END = r'(?=[\s>/])'
+
+
+def build_start_pattern(tag_names: Iterable[str]) -> Pattern:
+    """Compile a pattern matching <function_calls> or the start of any legacy tool tag.
+
+    Longer tag names come first, and a legacy tag name must be followed by
+    whitespace, '>' or '/', so a tag that prefixes another (or a tag cut off at
+    the end of a delta) cannot shadow it.
+    """
+    names = sorted(set(tag_names), key=lambda name: (-len(name), name))
+    alternatives = [re.escape(FUNCTION_CALLS_START)] + [re.escape(f'<{name}') + TAG_NAME_END for name in names]
+    return re.compile('|'.join(alternatives))
+
+
+class XMLTagMatcher:
+    """Precompiled matcher for block starts over a fixed set of legacy tag names.
+
+    One compiled alternation finds the earliest <function_calls> or legacy tag
+    start in a single pass, however many tags are registered. Build it once per
+    set of tag names and share it between scanners.
+
+    Attributes:
+        tag_names: The legacy tag names the matcher recognizes
+        pattern: Compiled start pattern from build_start_pattern
+        lookbehind: Characters to keep between deltas so a split start or end tag is still found
+    """
+
+    def __init__(self, tag_names: Iterable[str] = ()):
+        self.tag_names = tuple(tag_names)
+        self.pattern = build_start_pattern(self.tag_names)
+        # Longest token that may be split across deltas: '</function_calls>' or '<longest-tag'
+        self.lookbehind = max([len(FUNCTION_CALLS_END)] + [len(name) + 3 for name in self.tag_names]) - 1
+
+
+class XMLStreamScanner:
+    """Resumable scanner that extracts complete XML tool-call blocks from a stream.
+
+    Attributes:
+        buffer: Text received but not yet consumed by an emitted block
+    """
+
+    def __init__(self, tag_names: Iterable[str] = (), initial: str = "", matcher: Optional[XMLTagMatcher] = None):
+        """Initialize the scanner.
+
+        Args:
+            tag_names: Legacy XML tag names (e.g. 'create-file') to recognize
+            initial: Text already received; it is scanned on the next feed call
+            matcher: Prebuilt XMLTagMatcher, used instead of compiling one from tag_names
+        """
+        matcher = matcher or XMLTagMatcher(tag_names)
+        self._start_pattern = matcher.pattern
+        self._lookbehind = matcher.lookbehind
+        self.buffer = initial
+        self._scan_pos = 0
+        self._block_start: Optional[int] = None
+        self._end_token: Optional[str] = None
+        self._nested_start: Optional[Pattern] = None
+        self._depth = 0
+
+    def feed(self, text: str) -> List[str]:
+        """Append newly received text and return the blocks it completes."""
+        self.buffer += text
+        chunks = []
+        while True:
+            if self._block_start is None and not self._find_start():
+                break
+            chunk = self._find_end()
+            if chunk is None:
+                break
+            chunks.append(chunk)
+        return chunks
+
+    def _find_start(self) -> bool:
+        """Look for the next block start; drop scanned text that cannot be part of one."""
+        match = self._start_pattern.search(self.buffer, self._scan_pos)
+        if match is None:
+            # Keep only what could be the beginning of a tag split across deltas
+            keep_from = max(len(self.buffer) - self._lookbehind, 0)
+            self.buffer = self.buffer[keep_from:]
+            self._scan_pos = 0
+            return False
+
+        self._block_start = match.start()
+        token = match.group(0)
+        if token == FUNCTION_CALLS_START:
+            self._end_token = FUNCTION_CALLS_END
+            self._nested_start = None
+        else:
+            tag_name = token[1:]
+            self._end_token = f'</{tag_name}>'
+            self._nested_start = re.compile(re.escape(token) + TAG_NAME_END)
+        self._depth = 0
+        self._scan_pos = match.end()
+        return True
+
+    def _find_end(self) -> Optional[str]:
+        """Advance inside the current block; return it once its matching end tag has arrived."""
+        buffer = self.buffer
+        while True:
+            end_pos = buffer.find(self._end_token, self._scan_pos)
+            if self._nested_start:
+                nested = self._nested_start.search(buffer, self._scan_pos, end_pos if end_pos != -1 else len(buffer))
+                if nested is not None:
+                    self._depth += 1
+                    self._scan_pos = nested.end()
+                    continue
+
+            if end_pos == -1:
+                # Resume just before the unscanned tail, in case a tag is split across deltas
+                self._scan_pos = max(self._scan_pos, len(buffer) - self._lookbehind)
+                return None
+
+            if self._depth > 0:
+                self._depth -= 1
+                self._scan_pos = end_pos + len(self._end_token)
+                continue
+
+            chunk_end = end_pos + len(self._end_token)
+            chunk = buffer[self._block_start:chunk_end]
+            self.buffer = buffer[chunk_end:]
+            self._scan_pos = 0
+            self._block_start = None
+            self._end_token = None
+            self._nested_start = None
+            return chunk
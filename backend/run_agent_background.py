@@ -9,16 +9,21 @@ from datetime import datetime, timezone
 from typing import Optional
 from services import redis
 from agent.run import run_agent
+from agent import run_registry, run_stream
+from agent.run_control import RunControlListener
+from agent.run_archive import archive_run
 from utils.logger import logger, structlog
 import dramatiq
 import uuid
 from agentpress.thread_manager import ThreadManager
+from agentpress.thread_summarizer import ThreadSummarizer
 from services.supabase import DBConnection
 from services import redis
 from dramatiq.brokers.rabbitmq import RabbitmqBroker
 import os
 from services.langfuse import langfuse
 from utils.retry import retry
+from utils.config import config
 
 import sentry_sdk
 from typing import Dict, Any
@@ -32,6 +37,8 @@ dramatiq.set_broker(rabbitmq_broker)
 _initialized = False
 db = DBConnection()
 instance_id = "single"
+# One control channel subscription shared by all runs in this worker process
+control_listener = RunControlListener()
 
 async def initialize():
     """Initialize the agent API with resources from the main API."""
@@ -120,56 +127,31 @@ async def run_agent_background(
     client = await db.client
     start_time = datetime.now(timezone.utc)
     total_responses = 0
-    pubsub = None
-    stop_checker = None
-    stop_signal_received = False
+    # Set on STOP so the run can cancel tool calls that are queued or running
+    stop_event = asyncio.Event()
+    # Writes responses to the run's Redis stream in order, pipelining queued frames
+    response_writer = run_stream.ResponseStreamWriter(
+        agent_run_id,
+        max_queue_size=config.AGENT_RUN_WRITER_MAX_QUEUE,
+        max_batch_size=config.AGENT_RUN_WRITER_MAX_BATCH
+    )
 
     # Define Redis keys and channels
-    response_list_key = f"agent_run:{agent_run_id}:responses"
-    response_channel = f"agent_run:{agent_run_id}:new_response"
-    instance_control_channel = f"agent_run:{agent_run_id}:control:{instance_id}"
     global_control_channel = f"agent_run:{agent_run_id}:control"
-    instance_active_key = f"active_run:{instance_id}:{agent_run_id}"
-
-    async def check_for_stop_signal():
-        nonlocal stop_signal_received
-        if not pubsub: return
-        try:
-            while not stop_signal_received:
-                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=0.5)
-                if message and message.get("type") == "message":
-                    data = message.get("data")
-                    if isinstance(data, bytes): data = data.decode('utf-8')
-                    if data == "STOP":
-                        logger.info(f"Received STOP signal for agent run {agent_run_id} (Instance: {instance_id})")
-                        stop_signal_received = True
-                        break
-                # Periodically refresh the active run key TTL
-                if total_responses % 50 == 0: # Refresh every 50 responses or so
-                    try: await redis.expire(instance_active_key, redis.REDIS_KEY_TTL)
-                    except Exception as ttl_err: logger.warning(f"Failed to refresh TTL for {instance_active_key}: {ttl_err}")
-                await asyncio.sleep(0.1) # Short sleep to prevent tight loop
-        except asyncio.CancelledError:
-            logger.info(f"Stop signal checker cancelled for {agent_run_id} (Instance: {instance_id})")
-        except Exception as e:
-            logger.error(f"Error in stop signal checker for {agent_run_id}: {e}", exc_info=True)
-            stop_signal_received = True # Stop the run if the checker fails
 
     trace = langfuse.trace(name="agent_run", id=agent_run_id, session_id=thread_id, metadata={"project_id": project_id, "instance_id": instance_id})
+    agent_gen = None
     try:
-        # Setup Pub/Sub listener for control signals
-        pubsub = await redis.create_pubsub()
+        # Register for STOP signals on the process-wide control channel listener
         try:
-            await retry(lambda: pubsub.subscribe(instance_control_channel, global_control_channel))
+            await retry(lambda: control_listener.register(agent_run_id, stop_event))
         except Exception as e:
             logger.error(f"Redis failed to subscribe to control channels: {e}", exc_info=True)
             raise e
 
-        logger.debug(f"Subscribed to control channels: {instance_control_channel}, {global_control_channel}")
-        stop_checker = asyncio.create_task(check_for_stop_signal())
-
-        # Ensure active run key exists and has TTL
-        await redis.set(instance_active_key, "running", ex=redis.REDIS_KEY_TTL)
+        # Register the run as active on this instance, with TTL
+        await run_registry.register_run(instance_id, agent_run_id)
+        await run_stream.set_run_status(agent_run_id, "running", ttl=redis.REDIS_KEY_TTL)
 
 
         # Initialize agent generator
@@ -181,27 +163,29 @@ async def run_agent_background(
             agent_config=agent_config,
             trace=trace,
             is_agent_builder=is_agent_builder,
-            target_agent_id=target_agent_id
+            target_agent_id=target_agent_id,
+            stop_event=stop_event
         )
 
         final_status = "running"
         error_message = None
 
-        pending_redis_operations = []
-
         async for response in agent_gen:
-            if stop_signal_received:
+            if stop_event.is_set():
                 logger.info(f"Agent run {agent_run_id} stopped by signal.")
                 final_status = "stopped"
                 trace.span(name="agent_run_stopped").end(status_message="agent_run_stopped", level="WARNING")
                 break
 
-            # Store response in Redis list and publish notification
-            response_json = json.dumps(response)
-            pending_redis_operations.append(asyncio.create_task(redis.rpush(response_list_key, response_json)))
-            pending_redis_operations.append(asyncio.create_task(redis.publish(response_channel, "new")))
+            # Queue response for the run's Redis stream; waits if Redis falls behind
+            await response_writer.write(response)
             total_responses += 1
 
+            # Periodically refresh the active run registration TTL
+            if total_responses % 50 == 0:
+                try: await run_registry.register_run(instance_id, agent_run_id)
+                except Exception as ttl_err: logger.warning(f"Failed to refresh active run TTL for {agent_run_id}: {ttl_err}")
+
             # Check for agent-signaled completion or error
             if response.get('type') == 'status':
                  status_val = response.get('status')
@@ -219,15 +203,20 @@ async def run_agent_background(
              logger.info(f"Agent run {agent_run_id} completed normally (duration: {duration:.2f}s, responses: {total_responses})")
              completion_message = {"type": "status", "status": "completed", "message": "Agent run completed successfully"}
              trace.span(name="agent_run_completed").end(status_message="agent_run_completed")
-             await redis.rpush(response_list_key, json.dumps(completion_message))
-             await redis.publish(response_channel, "new") # Notify about the completion message
+             await response_writer.write(completion_message)
 
-        # Fetch final responses from Redis for DB update
-        all_responses_json = await redis.lrange(response_list_key, 0, -1)
-        all_responses = [json.loads(r) for r in all_responses_json]
+        # Archive the final responses from Redis and update DB status
+        await response_writer.flush()
+        all_responses = await run_stream.get_all_responses(agent_run_id)
+        archive = await archive_run(thread_id, agent_run_id, final_status, all_responses)
+        await update_agent_run_status(client, agent_run_id, final_status, error=error_message, archive=archive)
 
-        # Update DB status
-        await update_agent_run_status(client, agent_run_id, final_status, error=error_message, responses=all_responses)
+        # Summarize long threads off the critical path once the run has ended
+        if final_status == "completed" and config.THREAD_SUMMARY_ENABLED:
+            try:
+                summarize_thread_background.send(thread_id, model_name)
+            except Exception as e:
+                logger.warning(f"Failed to enqueue summary for thread {thread_id}: {str(e)}")
 
         # Publish final control signal (END_STREAM or ERROR)
         control_signal = "END_STREAM" if final_status == "completed" else "ERROR" if final_status == "failed" else "STOP"
@@ -246,25 +235,25 @@ async def run_agent_background(
         final_status = "failed"
         trace.span(name="agent_run_failed").end(status_message=error_message, level="ERROR")
 
-        # Push error message to Redis list
+        # Push error message to Redis stream
         error_response = {"type": "status", "status": "error", "message": error_message}
         try:
-            await redis.rpush(response_list_key, json.dumps(error_response))
-            await redis.publish(response_channel, "new")
+            await response_writer.write(error_response)
+            await asyncio.wait_for(response_writer.flush(), timeout=30.0)
         except Exception as redis_err:
              logger.error(f"Failed to push error response to Redis for {agent_run_id}: {redis_err}")
 
         # Fetch final responses (including the error)
         all_responses = []
         try:
-             all_responses_json = await redis.lrange(response_list_key, 0, -1)
-             all_responses = [json.loads(r) for r in all_responses_json]
+             all_responses = await run_stream.get_all_responses(agent_run_id)
         except Exception as fetch_err:
              logger.error(f"Failed to fetch responses from Redis after error for {agent_run_id}: {fetch_err}")
              all_responses = [error_response] # Use the error message we tried to push
 
-        # Update DB status
-        await update_agent_run_status(client, agent_run_id, "failed", error=f"{error_message}\n{traceback_str}", responses=all_responses)
+        # Archive the responses and update DB status
+        archive = await archive_run(thread_id, agent_run_id, "failed", all_responses)
+        await update_agent_run_status(client, agent_run_id, "failed", error=f"{error_message}\n{traceback_str}", archive=archive)
 
         # Publish ERROR signal
         try:
@@ -274,51 +263,72 @@ async def run_agent_background(
             logger.warning(f"Failed to publish ERROR signal: {str(e)}")
 
     finally:
-        # Cleanup stop checker task
-        if stop_checker and not stop_checker.done():
-            stop_checker.cancel()
-            try: await stop_checker
-            except asyncio.CancelledError: pass
-            except Exception as e: logger.warning(f"Error during stop_checker cancellation: {e}")
-
-        # Close pubsub connection
-        if pubsub:
+        # Stop dispatching control signals to this run
+        control_listener.unregister(agent_run_id, stop_event)
+
+        # Close the agent generator so the run writes out its queued messages
+        if agent_gen is not None:
             try:
-                await pubsub.unsubscribe()
-                await pubsub.close()
-                logger.debug(f"Closed pubsub connection for {agent_run_id}")
+                await agent_gen.aclose()
             except Exception as e:
-                logger.warning(f"Error closing pubsub for {agent_run_id}: {str(e)}")
+                logger.warning(f"Error closing agent generator for {agent_run_id}: {str(e)}")
+
+        # Write any queued responses and stop the writer, with timeout
+        await response_writer.close(timeout=30.0)
+        writer_metrics = response_writer.get_metrics()
+        logger.info(f"Response stream writer for {agent_run_id}: {writer_metrics}")
+        trace.event(name="agent_run_stream_writer", level="DEFAULT", status_message=(f"Wrote {writer_metrics['written']} responses in {writer_metrics['flushes']} flushes"), metadata=writer_metrics)
 
-        # Set TTL on the response list in Redis
+        # Set TTL on the response stream in Redis
         await _cleanup_redis_response_list(agent_run_id)
 
-        # Remove the instance-specific active run key
-        await _cleanup_redis_instance_key(agent_run_id)
+        # Remove the run from this instance's active run registry
+        await _cleanup_redis_instance_key(agent_run_id, instance_id)
 
         # Clean up the run lock
         await _cleanup_redis_run_lock(agent_run_id)
 
-        # Wait for all pending redis operations to complete, with timeout
-        try:
-            await asyncio.wait_for(asyncio.gather(*pending_redis_operations), timeout=30.0)
-        except asyncio.TimeoutError:
-            logger.warning(f"Timeout waiting for pending Redis operations for {agent_run_id}")
-
         logger.info(f"Agent run background task fully completed for: {agent_run_id} (Instance: {instance_id}) with final status: {final_status}")
 
-async def _cleanup_redis_instance_key(agent_run_id: str):
-    """Clean up the instance-specific Redis key for an agent run."""
+@dramatiq.actor
+async def summarize_thread_background(thread_id: str, model_name: str):
+    """Write a rolling summary for a thread if it has grown past the trigger share of the budget."""
+    structlog.contextvars.clear_contextvars()
+    structlog.contextvars.bind_contextvars(thread_id=thread_id)
+
+    try:
+        await initialize()
+    except Exception as e:
+        logger.critical(f"Failed to initialize Redis connection: {e}")
+        raise e
+
+    # Only one summary per thread at a time
+    summary_lock_key = f"thread_summary_lock:{thread_id}"
+    if not await redis.set(summary_lock_key, instance_id, nx=True, ex=redis.REDIS_KEY_TTL):
+        logger.info(f"Summary for thread {thread_id} is already in progress, skipping")
+        return
+
+    try:
+        await ThreadSummarizer().summarize_if_needed(thread_id, model_name)
+    except Exception as e:
+        logger.error(f"Error summarizing thread {thread_id}: {str(e)}", exc_info=True)
+    finally:
+        try:
+            await redis.delete(summary_lock_key)
+        except Exception as e:
+            logger.warning(f"Failed to release summary lock for thread {thread_id}: {str(e)}")
+
+async def _cleanup_redis_instance_key(agent_run_id: str, instance_id: str):
+    """Remove an agent run's active entry for this instance from the Redis registry."""
     if not instance_id:
         logger.warning("Instance ID not set, cannot clean up instance key.")
         return
-    key = f"active_run:{instance_id}:{agent_run_id}"
-    logger.debug(f"Cleaning up Redis instance key: {key}")
+    logger.debug(f"Unregistering active agent run {agent_run_id} for instance {instance_id}")
     try:
-        await redis.delete(key)
-        logger.debug(f"Successfully cleaned up Redis key: {key}")
+        await run_registry.unregister_run(instance_id, agent_run_id)
+        logger.debug(f"Successfully unregistered active agent run {agent_run_id}")
     except Exception as e:
-        logger.warning(f"Failed to clean up Redis key {key}: {str(e)}")
+        logger.warning(f"Failed to unregister active agent run {agent_run_id}: {str(e)}")
 
 async def _cleanup_redis_run_lock(agent_run_id: str):
     """Clean up the run lock Redis key for an agent run."""
@@ -330,27 +340,26 @@ async def _cleanup_redis_run_lock(agent_run_id: str):
     except Exception as e:
         logger.warning(f"Failed to clean up Redis run lock key {run_lock_key}: {str(e)}")
 
-# TTL for Redis response lists (24 hours)
+# TTL for Redis response streams (24 hours)
 REDIS_RESPONSE_LIST_TTL = 3600 * 24
 
 async def _cleanup_redis_response_list(agent_run_id: str):
-    """Set TTL on the Redis response list."""
-    response_list_key = f"agent_run:{agent_run_id}:responses"
+    """Set TTL on the Redis response stream (and the list of runs started before streams)."""
     try:
-        await redis.expire(response_list_key, REDIS_RESPONSE_LIST_TTL)
-        logger.debug(f"Set TTL ({REDIS_RESPONSE_LIST_TTL}s) on response list: {response_list_key}")
+        await run_stream.expire_responses(agent_run_id, REDIS_RESPONSE_LIST_TTL)
+        logger.debug(f"Set TTL ({REDIS_RESPONSE_LIST_TTL}s) on responses of agent run: {agent_run_id}")
     except Exception as e:
-        logger.warning(f"Failed to set TTL on response list {response_list_key}: {str(e)}")
+        logger.warning(f"Failed to set TTL on responses of agent run {agent_run_id}: {str(e)}")
 
 async def update_agent_run_status(
     client,
     agent_run_id: str,
     status: str,
     error: Optional[str] = None,
-    responses: Optional[list[any]] = None # Expects parsed list of dicts
+    archive: Optional[Dict[str, Any]] = None # {"path": ..., "summary": ...} from archive_run
 ) -> bool:
     """
-    Centralized function to update agent run status.
+    Centralized function to update agent run status in a single round-trip.
     Returns True if update was successful.
     """
     try:
@@ -362,9 +371,15 @@ async def update_agent_run_status(
         if error:
             update_data["error"] = error
 
-        if responses:
-            # Ensure responses are stored correctly as JSONB
-            update_data["responses"] = responses
+        if archive:
+            update_data["archive_path"] = archive["path"]
+            update_data["archive_summary"] = archive["summary"]
+
+        # Mirror the status for stream reconnects, which read it from Redis
+        try:
+            await run_stream.set_run_status(agent_run_id, status, ttl=REDIS_RESPONSE_LIST_TTL)
+        except Exception as e:
+            logger.warning(f"Failed to mirror status of agent run {agent_run_id} to Redis: {str(e)}")
 
         # Retry up to 3 times
         for retry in range(3):
@@ -373,13 +388,6 @@ async def update_agent_run_status(
 
                 if hasattr(update_result, 'data') and update_result.data:
                     logger.info(f"Successfully updated agent run {agent_run_id} status to '{status}' (retry {retry})")
-
-                    # Verify the update
-                    verify_result = await client.table('agent_runs').select('status', 'completed_at').eq("id", agent_run_id).execute()
-                    if verify_result.data:
-                        actual_status = verify_result.data[0].get('status')
-                        completed_at = verify_result.data[0].get('completed_at')
-                        logger.info(f"Verified agent run update: status={actual_status}, completed_at={completed_at}")
                     return True
                 else:
                     logger.warning(f"Database update returned no data for agent run {agent_run_id} on retry {retry}: {update_result}")
@@ -1,10 +1,11 @@
-from typing import Optional
+from typing import List, Optional, Tuple
 
 from agentpress.thread_manager import ThreadManager
 from agentpress.tool import Tool
 from daytona_sdk import AsyncSandbox
 from sandbox.sandbox import get_or_start_sandbox
 from utils.logger import logger
+from utils.config import config
 from utils.files_utils import clean_path
 
 class SandboxToolsBase(Tool):
@@ -22,6 +23,14 @@ class SandboxToolsBase(Tool):
         self._sandbox_id = None
         self._sandbox_pass = None
 
+    def get_concurrency_scopes(self) -> List[Tuple[str, int]]:
+        """All tools of a project share its sandbox."""
+        return [(f"sandbox:{self.project_id}", config.SANDBOX_TOOL_CONCURRENCY)]
+
+    def get_cache_scope(self) -> Optional[str]:
+        """Results may refer to files in the project's sandbox."""
+        return f"project:{self.project_id}"
+
     async def _ensure_sandbox(self) -> AsyncSandbox:
         """Ensure we have a valid sandbox instance, retrieving it from the project if needed."""
         if self._sandbox is None:
@@ -210,7 +210,14 @@ def prepare_params(
         cache_control_count = 0
         max_cache_control_blocks = 3
 
-        for message in messages:
+        # With cache-stable compression the prefix only changes on compaction, so cache the
+        # system prompt plus rolling breakpoints on the last two messages instead; the next
+        # turn then reads everything up to this turn's breakpoint from the cache
+        cache_targets = messages
+        if config.CONTEXT_CACHE_STABLE_COMPRESSION and len(messages) > max_cache_control_blocks:
+            cache_targets = [messages[0]] + messages[-(max_cache_control_blocks - 1):]
+
+        for message in cache_targets:
             if cache_control_count >= max_cache_control_blocks:
                 break
                 
@@ -3,7 +3,7 @@ import os
 from dotenv import load_dotenv
 import asyncio
 from utils.logger import logger
-from typing import List, Any
+from typing import AsyncIterator, Dict, List, Any, Optional
 from utils.retry import retry
 
 # Redis client and connection pool
@@ -166,12 +166,31 @@ async def lrange(key: str, start: int, end: int) -> List[str]:
     return await redis_client.lrange(key, start, end)
 
 
+# Stream operations
+async def xread(streams: Dict[str, str], count: Optional[int] = None, block: Optional[int] = None) -> List[Any]:
+    """Read entries after the given IDs from one or more streams, blocking up to block ms."""
+    redis_client = await get_client()
+    return await redis_client.xread(streams, count=count, block=block)
+
+
+async def xrange(key: str, min: str = "-", max: str = "+", count: Optional[int] = None) -> List[Any]:
+    """Get a range of entries from a stream."""
+    redis_client = await get_client()
+    return await redis_client.xrange(key, min=min, max=max, count=count)
+
+
 # Key management
+async def exists(*keys: str) -> int:
+    redis_client = await get_client()
+    return await redis_client.exists(*keys)
+
 
 
-async def keys(pattern: str) -> List[str]:
+async def scan_iter(pattern: str, count: int = 1000) -> AsyncIterator[str]:
+    """Iterate over keys matching a pattern with SCAN, without blocking the server like KEYS."""
     redis_client = await get_client()
-    return await redis_client.keys(pattern)
+    async for key in redis_client.scan_iter(match=pattern, count=count):
+        yield key
 
 
 async def expire(key: str, seconds: int):
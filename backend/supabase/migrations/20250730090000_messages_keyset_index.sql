@@ -0,0 +1,12 @@
+-- Migration: Composite index for keyset pagination of thread messages
+-- ThreadManager pages LLM messages by (created_at, message_id) instead of OFFSET
+
+BEGIN;
+
+CREATE INDEX IF NOT EXISTS idx_messages_thread_llm_keyset
+    ON messages(thread_id, created_at, message_id)
+    WHERE is_llm_message = TRUE;
+
+COMMENT ON INDEX idx_messages_thread_llm_keyset IS 'Keyset pagination over (created_at, message_id) for the LLM messages of a thread.';
+
+COMMIT;
@@ -0,0 +1,18 @@
+-- Migration: Archive agent run transcripts in storage
+-- Finished runs upload a compressed transcript of their final messages and keep
+-- only its path and a small summary on the run row
+
+BEGIN;
+
+ALTER TABLE agent_runs ADD COLUMN IF NOT EXISTS archive_path TEXT;
+ALTER TABLE agent_runs ADD COLUMN IF NOT EXISTS archive_summary JSONB;
+
+COMMENT ON COLUMN agent_runs.archive_path IS 'Path of the gzip-compressed run transcript in the agent-run-archives bucket';
+COMMENT ON COLUMN agent_runs.archive_summary IS 'Summary of the archived transcript (response and message counts, compressed size)';
+
+-- Private bucket for run archives, written by the backend with the service role
+INSERT INTO storage.buckets (id, name, public)
+VALUES ('agent-run-archives', 'agent-run-archives', false)
+ON CONFLICT (id) DO NOTHING;
+
+COMMIT;
@@ -0,0 +1,54 @@
+-- Migration: Precomputed tool summary on agents
+-- Lets the agent list filter and sort by tools in SQL instead of loading every
+-- agent's current version. The columns are kept in sync by the backend whenever
+-- an agent's current version changes
+
+BEGIN;
+
+ALTER TABLE agents ADD COLUMN IF NOT EXISTS mcp_tools_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE agents ADD COLUMN IF NOT EXISTS agentpress_tools_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE agents ADD COLUMN IF NOT EXISTS tools_count INTEGER GENERATED ALWAYS AS (mcp_tools_count + agentpress_tools_count) STORED;
+ALTER TABLE agents ADD COLUMN IF NOT EXISTS tool_names TEXT[] NOT NULL DEFAULT '{}';
+
+CREATE INDEX IF NOT EXISTS idx_agents_account_tools_count ON agents(account_id, tools_count);
+CREATE INDEX IF NOT EXISTS idx_agents_tool_names ON agents USING GIN (tool_names);
+
+COMMENT ON COLUMN agents.tools_count IS 'Configured MCPs plus enabled AgentPress tools of the current version';
+COMMENT ON COLUMN agents.tool_names IS 'Tools of the current version as mcp:{name} and agentpress:{tool} entries';
+
+-- Backfill from each agent's current version
+WITH version_tools AS (
+    SELECT
+        a.agent_id,
+        CASE WHEN jsonb_typeof(v.config->'tools'->'mcp') = 'array'
+             THEN v.config->'tools'->'mcp' ELSE '[]'::jsonb END AS mcp,
+        CASE WHEN jsonb_typeof(v.config->'tools'->'agentpress') = 'object'
+             THEN v.config->'tools'->'agentpress' ELSE '{}'::jsonb END AS agentpress
+    FROM agents a
+    JOIN agent_versions v ON v.version_id = a.current_version_id
+),
+summary AS (
+    SELECT
+        vt.agent_id,
+        jsonb_array_length(vt.mcp) AS mcp_tools_count,
+        (
+            SELECT COUNT(*) FROM jsonb_each(vt.agentpress) t
+            WHERE t.value = 'true'::jsonb OR t.value->'enabled' = 'true'::jsonb
+        ) AS agentpress_tools_count,
+        ARRAY(
+            SELECT 'mcp:' || (m->>'name') FROM jsonb_array_elements(vt.mcp) m
+            WHERE jsonb_typeof(m) = 'object' AND m ? 'name'
+            UNION ALL
+            SELECT 'agentpress:' || t.key FROM jsonb_each(vt.agentpress) t
+            WHERE t.value = 'true'::jsonb OR t.value->'enabled' = 'true'::jsonb
+        ) AS tool_names
+    FROM version_tools vt
+)
+UPDATE agents a
+SET mcp_tools_count = s.mcp_tools_count,
+    agentpress_tools_count = s.agentpress_tools_count,
+    tool_names = s.tool_names
+FROM summary s
+WHERE a.agent_id = s.agent_id;
+
+COMMIT;
@@ -199,7 +199,56 @@ class Configuration:
     REDIS_PORT: int = 6379
     REDIS_PASSWORD: Optional[str] = None
     REDIS_SSL: bool = True
-    
+
+    # AgentPress thread message cache
+    THREAD_MESSAGE_CACHE_REDIS: bool = False
+
+    # AgentPress write-behind message writer
+    MESSAGE_WRITER_BATCH_SIZE: int = 20
+    MESSAGE_WRITER_FLUSH_INTERVAL_MS: int = 200
+
+    # Merge streamed assistant content deltas into fewer chunks (0 = no limit; both 0 = one chunk per delta)
+    STREAM_CHUNK_COALESCE_MS: int = 0
+    STREAM_CHUNK_COALESCE_BYTES: int = 0
+
+    # Tool scheduling defaults for functions without declared limits (0 = unlimited / no deadline)
+    TOOL_DEFAULT_CONCURRENCY: int = 0
+    TOOL_DEFAULT_TIMEOUT_SECONDS: int = 0
+    # Concurrent tool calls against one sandbox
+    SANDBOX_TOOL_CONCURRENCY: int = 4
+
+    # Redis cache for results of idempotent tool functions
+    TOOL_RESULT_CACHE_ENABLED: bool = True
+    TOOL_RESULT_CACHE_MAX_BYTES: int = 262144
+    # TTL for results of MCP tools the server marks read-only
+    MCP_READ_ONLY_CACHE_TTL: int = 300
+
+    # Agent run responses in Redis Streams: blocking read timeout
+    AGENT_RUN_STREAM_BLOCK_MS: int = 5000
+    # Response batches queued per SSE viewer before it is marked as lagging and re-reads the stream
+    AGENT_RUN_VIEWER_QUEUE_SIZE: int = 256
+    # Per-run stream writer: queued responses before the worker waits, responses per pipeline
+    AGENT_RUN_WRITER_MAX_QUEUE: int = 1000
+    AGENT_RUN_WRITER_MAX_BATCH: int = 200
+    # Compressed transcript archive uploaded to storage when a run ends
+    AGENT_RUN_ARCHIVE_ENABLED: bool = True
+    AGENT_RUN_ARCHIVE_BUCKET: str = "agent-run-archives"
+
+    # Render XML tool schemas without indentation to save prompt tokens
+    XML_TOOL_SCHEMAS_COMPACT: bool = False
+
+    # Prompt-cache-stable context compression: compressed forms are frozen and
+    # compaction shrinks the context to this share of the model budget in one step
+    CONTEXT_CACHE_STABLE_COMPRESSION: bool = False
+    CONTEXT_COMPACTION_TARGET_PERCENT: int = 60
+
+    # Background rolling summarization of long threads
+    THREAD_SUMMARY_ENABLED: bool = False
+    THREAD_SUMMARY_TRIGGER_PERCENT: int = 50
+    THREAD_SUMMARY_KEEP_PERCENT: int = 20
+    THREAD_SUMMARY_MODEL: str = "openai/gpt-4o-mini"
+    THREAD_SUMMARY_MAX_TOKENS: int = 4000
+
     # Daytona sandbox configuration
     DAYTONA_API_KEY: str
     DAYTONA_SERVER_URL: str
@@ -1,5 +1,5 @@
 """
-Utility functions for handling image operations.
+Utility functions for uploading images and other files to storage.
 """
 
 import base64
@@ -48,4 +48,31 @@ async def upload_base64_image(base64_data: str, bucket_name: str = "browser-scre
         
     except Exception as e:
         logger.error(f"Error uploading base64 image: {e}")
-        raise RuntimeError(f"Failed to upload image: {str(e)}") 
\ No newline at end of file
+        raise RuntimeError(f"Failed to upload image: {str(e)}")
+
+async def upload_bytes(data: bytes, path: str, bucket_name: str, content_type: str = "application/octet-stream") -> str:
+    """Upload raw bytes to a path in Supabase storage, replacing any existing object.
+    
+    Args:
+        data (bytes): File contents
+        path (str): Object path inside the bucket
+        bucket_name (str): Name of the storage bucket to upload to
+        content_type (str): MIME type of the contents
+        
+    Returns:
+        str: Path of the uploaded object
+    """
+    try:
+        db = DBConnection()
+        client = await db.client
+        await client.storage.from_(bucket_name).upload(
+            path,
+            data,
+            {"content-type": content_type, "upsert": "true"}
+        )
+        logger.debug(f"Uploaded {len(data)} bytes to {bucket_name}/{path}")
+        return path
+        
+    except Exception as e:
+        logger.error(f"Error uploading {bucket_name}/{path}: {e}")
+        raise RuntimeError(f"Failed to upload file: {str(e)}")
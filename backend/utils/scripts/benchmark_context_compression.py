@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Context Compression Benchmark
+
+Compares the single-pass compression planner (ContextManager.compress_messages)
+with the previous recursive strategy (ContextManager.compress_messages_recursive)
+on synthetic threads. Each run uses a fresh ContextManager so token counts start
+from a cold cache.
+
+Usage:
+    python benchmark_context_compression.py                      # 500 and 2000 message threads
+    python benchmark_context_compression.py --sizes 500 2000 5000
+    python benchmark_context_compression.py --model gpt-4o --repeat 3
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+# Add the backend directory to the path so we can import modules
+backend_dir = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from agentpress.context_manager import ContextManager
+
+
+def build_thread(message_count: int, seed: int = 42) -> list:
+    """Build a synthetic XML-tool-calling thread with a mix of small and large messages."""
+    rng = random.Random(seed)
+    words = ["alpha", "beta", "gamma", "delta", "file", "output", "result", "error", "value", "search"]
+
+    def text(word_count: int) -> str:
+        return " ".join(rng.choice(words) for _ in range(word_count))
+
+    messages = [{"role": "system", "content": "You are a helpful agent. " + text(2000)}]
+    for i in range(message_count):
+        message_id = f"00000000-0000-0000-0000-{i:012d}"
+        position = i % 3
+        if position == 0:
+            messages.append({"role": "user", "content": text(rng.randint(10, 200)), "message_id": message_id})
+        elif position == 1:
+            messages.append({"role": "assistant", "content": text(rng.randint(50, 800)), "message_id": message_id})
+        else:
+            result = {
+                "tool_execution": {
+                    "function_name": "execute_command",
+                    "arguments": {"command": "ls -la"},
+                    "result": {"success": True, "output": text(rng.choice([100, 500, 4000, 12000]))},
+                }
+            }
+            messages.append({"role": "user", "content": json.dumps(result), "message_id": message_id})
+    return messages
+
+
+def time_strategy(strategy: str, message_count: int, model: str, repeat: int) -> dict:
+    """Run one compression strategy on a fresh thread and return timing and size figures."""
+    durations = []
+    output = None
+    for _ in range(repeat):
+        context_manager = ContextManager()
+        messages = build_thread(message_count)
+        started = time.perf_counter()
+        output = getattr(context_manager, strategy)(messages, model)
+        durations.append(time.perf_counter() - started)
+        tokenizations = context_manager.token_cache.stats["misses"]
+
+    counter = ContextManager()
+    return {
+        "seconds": min(durations),
+        "messages": len(output),
+        "tokens": counter.count_tokens(output, model),
+        "tokenizations": tokenizations,
+        "output": output,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark context compression strategies",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 2000], help="Thread sizes in messages")
+    parser.add_argument("--model", default="gpt-4o", help="Model name used for token counting and budget")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per strategy; the fastest is reported")
+    args = parser.parse_args()
+
+    budget = ContextManager().get_model_max_tokens(args.model)
+    print(f"Model {args.model}, budget {budget} tokens")
+    print(f"{'messages':>8}  {'strategy':<28} {'seconds':>9} {'tokenized':>9} {'out msgs':>8} {'out tokens':>10}")
+
+    for size in args.sizes:
+        planner = time_strategy("compress_messages", size, args.model, args.repeat)
+        recursive = time_strategy("compress_messages_recursive", size, args.model, args.repeat)
+        for name, figures in (("planner", planner), ("recursive", recursive)):
+            print(f"{size:>8}  {name:<28} {figures['seconds']:>9.3f} {figures['tokenizations']:>9} {figures['messages']:>8} {figures['tokens']:>10}")
+
+        # Identical inputs must give identical plans
+        again = time_strategy("compress_messages", size, args.model, 1)
+        deterministic = json.dumps(planner["output"], sort_keys=True) == json.dumps(again["output"], sort_keys=True)
+        print(f"{size:>8}  planner deterministic: {deterministic}, speedup: {recursive['seconds'] / max(planner['seconds'], 1e-9):.1f}x")
+
+
+if __name__ == "__main__":
+    main()